@@ -100,44 +100,230 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Search functionality (if search input exists)
     if (searchInput && searchResults) {
-        let searchData = [];
+        let searchIndex = null;
+        let indexRequest = null;
+        let trigramRequest = null;
         let searchTimeout;
+        let searchGeneration = 0;
         let currentHighlight = -1;
+        const shardCache = new Map();
+        const bodyCache = new Map();
+
+        // Load search manifest (documents and term shard names) the first time search is used
+        function loadSearchIndex() {
+            if (!indexRequest) {
+                indexRequest = fetch('/search/index.json')
+                    .then(response => response.json())
+                    .then(data => {
+                        searchIndex = data;
+                    })
+                    .catch(err => {
+                        indexRequest = null;
+                        console.error('Search index not found:', err);
+                    });
+            }
+            return indexRequest;
+        }
+
+        if (searchToggle) {
+            searchToggle.addEventListener('click', loadSearchIndex);
+        }
+        searchInput.addEventListener('focus', loadSearchIndex);
+
+        // Same tokenizer as core/blog/search.py
+        function tokenize(text) {
+            return text.toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+        }
+
+        // Same shard naming as core/blog/search.py
+        function shardName(term) {
+            const prefix = Array.from(term).slice(0, searchIndex.shard_prefix).join('');
+            if (/^[a-z0-9]+$/.test(prefix)) return prefix;
+            const bytes = Array.from(new TextEncoder().encode(prefix));
+            return '_' + bytes.map(b => b.toString(16).padStart(2, '0')).join('');
+        }
+
+        // Fetch each term shard once
+        function loadShard(name) {
+            if (!shardCache.has(name)) {
+                const request = searchIndex.shards.includes(name)
+                    ? fetch(`/search/terms/${name}.json`).then(response => response.json()).catch(() => ({}))
+                    : Promise.resolve({});
+                shardCache.set(name, request);
+            }
+            return shardCache.get(name);
+        }
+
+        // Fetch each body shard (plain text of body_shard_size documents) once
+        function loadBody(doc) {
+            const name = Math.floor(doc / searchIndex.body_shard_size);
+            if (!bodyCache.has(name)) {
+                bodyCache.set(name, fetch(`/search/bodies/${name}.json`).then(response => response.json()).catch(() => []));
+            }
+            return bodyCache.get(name).then(bodies => bodies[doc % searchIndex.body_shard_size] || '');
+        }
+
+        function escapeHtml(text) {
+            return text.replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' })[c]);
+        }
+
+        // Text around the first query term in a document body
+        function snippet(text, terms) {
+            const lower = text.toLowerCase();
+            const positions = terms.map(term => lower.indexOf(term)).filter(pos => pos >= 0);
+            if (positions.length === 0) return '';
+            const start = Math.max(0, Math.min(...positions) - 60);
+            const end = Math.min(text.length, start + 160);
+            return (start > 0 ? '...' : '') + text.slice(start, end).trim() + (end < text.length ? '...' : '');
+        }
+
+        // Same trigrams as core/blog/search.py: terms padded with two leading and one trailing space
+        function trigrams(text) {
+            const grams = new Set();
+            tokenize(text).forEach(term => {
+                // built as an array so JS minification cannot collapse the padding
+                const chars = [' ', ' ', ...Array.from(term), ' '];
+                for (let i = 0; i + 3 <= chars.length; i++) {
+                    grams.add(chars.slice(i, i + 3).join(''));
+                }
+            });
+            return grams;
+        }
+
+        // Fetch the title/heading trigram index once, if the build emitted one
+        function loadTrigrams() {
+            if (!trigramRequest) {
+                trigramRequest = searchIndex.trigrams
+                    ? fetch('/search/trigrams.json').then(response => response.json()).catch(() => null)
+                    : Promise.resolve(null);
+            }
+            return trigramRequest;
+        }
+
+        // Typo-tolerant matches: rank title/heading entries by the share of query trigrams they contain
+        // (same ranking and threshold as core/blog/search_query.py)
+        async function fuzzyDocuments(query) {
+            const index = await loadTrigrams();
+            const grams = trigrams(query);
+            if (!index || grams.size === 0) return [];
+
+            // postings are delta-encoded entry ids
+            const overlap = new Map();
+            grams.forEach(gram => {
+                if (!Object.prototype.hasOwnProperty.call(index.grams, gram)) return;
+                let entry = 0;
+                index.grams[gram].forEach(delta => {
+                    entry += delta;
+                    overlap.set(entry, (overlap.get(entry) || 0) + 1);
+                });
+            });
+
+            const best = new Map();
+            overlap.forEach((shared, entry) => {
+                const similarity = shared / grams.size;
+                if (similarity < 0.5) return;
+                const doc = index.entries[entry][0];
+                const current = best.get(doc);
+                if (!current || similarity > current.similarity ||
+                    (similarity === current.similarity && index.sizes[entry] < index.sizes[current.entry])) {
+                    best.set(doc, { similarity, entry });
+                }
+            });
 
-        // Load search data
-        fetch('/search.json')
-            .then(response => response.json())
-            .then(data => {
-                searchData = data;
-            })
-            .catch(err => console.error('Search data not found:', err));
+            return Array.from(best.entries())
+                .sort((a, b) => b[1].similarity - a[1].similarity ||
+                    index.sizes[a[1].entry] - index.sizes[b[1].entry] || a[1].entry - b[1].entry)
+                .map(([doc, match]) => ({ doc, anchor: index.entries[match.entry][2] }));
+        }
+
+        // Rank documents by summed BM25 weights; the last term also matches as a prefix
+        async function rankDocuments(query) {
+            const terms = tokenize(query);
+            const shards = await Promise.all(terms.map(term => loadShard(shardName(term))));
+            const scores = new Map();
+
+            terms.forEach((term, i) => {
+                const shard = shards[i];
+                const asPrefix = i === terms.length - 1 && Array.from(term).length >= searchIndex.shard_prefix;
+                const matched = asPrefix
+                    ? Object.keys(shard).filter(t => t.startsWith(term))
+                    : Object.prototype.hasOwnProperty.call(shard, term) ? [term] : [];
+
+                // postings are flat [doc, tf, weight] triples
+                const best = new Map();
+                matched.forEach(t => {
+                    const postings = shard[t];
+                    for (let j = 0; j < postings.length; j += 3) {
+                        best.set(postings[j], Math.max(best.get(postings[j]) || 0, postings[j + 2]));
+                    }
+                });
+                best.forEach((weight, doc) => scores.set(doc, (scores.get(doc) || 0) + weight));
+            });
+
+            const ranked = Array.from(scores.entries())
+                .sort((a, b) => b[1] - a[1] || a[0] - b[0])
+                .slice(0, 8)
+                .map(([doc]) => ({ doc, anchor: '' }));
+
+            // fill remaining slots with fuzzy title and heading matches
+            if (ranked.length < 8) {
+                const found = new Set(ranked.map(result => result.doc));
+                const fuzzy = await fuzzyDocuments(query);
+                fuzzy.filter(result => !found.has(result.doc))
+                    .slice(0, 8 - ranked.length)
+                    .forEach(result => ranked.push(result));
+            }
+            return ranked;
+        }
 
         // Debounced search function
-        function performSearch() {
+        async function performSearch() {
             const query = searchInput.value.toLowerCase().trim();
+            const generation = ++searchGeneration;
+
+            if (query.length >= 2) {
+                await loadSearchIndex();
+            }
 
-            if (query.length < 2) {
+            if (query.length < 2 || !searchIndex) {
                 searchResults.innerHTML = '';
                 searchResults.style.display = 'none';
                 currentHighlight = -1;
                 return;
             }
 
-            const results = searchData.filter(item =>
-                item.title.toLowerCase().includes(query) ||
-                item.content.toLowerCase().includes(query)
-            ).slice(0, 8);
+            const results = await rankDocuments(query);
+
+            // a newer query started while shards were loading
+            if (generation !== searchGeneration) return;
 
             if (results.length > 0) {
-                searchResults.innerHTML = results.map((result, index) => `
-                    <div class="search-result" data-index="${index}">
+                searchResults.innerHTML = results.map(({ doc, anchor }, index) => {
+                    const result = searchIndex.docs[doc];
+                    const url = anchor ? `${result.url}#${anchor}` : result.url;
+                    return `
+                    <div class="search-result" data-index="${index}" data-doc="${doc}">
                         <span class="search-result-type">${result.type}</span>
-                        <a href="${result.url}" class="search-result-link">${result.title}</a>
+                        <a href="${url}" class="search-result-link">${result.title}</a>
                         ${result.date ? `<small>${result.date}</small>` : ''}
+                        <p class="search-result-summary">${escapeHtml(result.summary)}</p>
                     </div>
-                `).join('');
+                `;
+                }).join('');
                 searchResults.style.display = 'block';
                 currentHighlight = -1;
+
+                // replace summaries with text around the match once bodies load
+                const terms = tokenize(query);
+                results.forEach(({ doc }, index) => {
+                    loadBody(doc).then(text => {
+                        const context = snippet(text, terms);
+                        const item = searchResults.querySelector(`[data-index="${index}"][data-doc="${doc}"] .search-result-summary`);
+                        if (context && item && generation === searchGeneration) {
+                            item.textContent = context;
+                        }
+                    });
+                });
             } else {
                 searchResults.innerHTML = '<div class="search-result search-no-results">No results found</div>';
                 searchResults.style.display = 'block';
@@ -3,22 +3,28 @@ Core modules for the blog generator
 """
 
 from .assets import AssetProcessor
+from .compress import OutputCompressor
 from .content import Page, Post
 from .generator import BlogGenerator
+from .manifest import BuildManifest
 from .metadata import MetadataGenerator
 from .robots import RobotsGenerator
 from .rss import RSSGenerator
 from .search import SearchIndexer
+from .search_query import SearchIndex
 from .sitemap import SitemapGenerator
 
 __all__ = [
     "Post",
     "Page",
     "BlogGenerator",
+    "BuildManifest",
     "AssetProcessor",
     "RSSGenerator",
     "SearchIndexer",
+    "SearchIndex",
     "SitemapGenerator",
     "RobotsGenerator",
     "MetadataGenerator",
+    "OutputCompressor",
 ]
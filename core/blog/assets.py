@@ -6,13 +6,41 @@ import hashlib
 import json
 import re
 import shutil
+import struct
 import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
+import PIL
 import sass
 from PIL import Image
 
+from core.utils.cache import DiskCache, get_cache_dir
+from core.utils.workers import resolve_workers
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg")
+
+# formats converted to WebP; everything else is copied as-is
+WEBP_SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# bump when conversion output changes so stale cache entries are not reused
+IMAGE_CACHE_VERSION = 2
+
+# Pillow format name to output file extension
+IMAGE_FORMAT_EXTENSIONS = {"WEBP": ".webp", "AVIF": ".avif"}
+
+
+@dataclass
+class ImageJob:
+    """One image conversion: a source encoded to a format, optionally resized"""
+
+    source: Path
+    fmt: str = "WEBP"
+    width: Optional[int] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+
 
 class AssetProcessor:
     """Handles processing of static assets (CSS, JS, images)"""
@@ -22,6 +50,7 @@ class AssetProcessor:
         self.asset_manifest = {}  # maps original names to hashed names
         self.image_dimensions = {}  # store image width/height for SEO
         self.build_timestamp = str(int(time.time()))  # unique build identifier
+        self.image_cache = DiskCache(config, "images")
 
     def process_all(self):
         """Process all static assets"""
@@ -48,9 +77,33 @@ class AssetProcessor:
 
         # Save asset manifest
         self._save_asset_manifest(output_assets)
+        self._report_manifest_changes()
 
         print("Processed all assets")
 
+    def source_files(self) -> List[Path]:
+        """List every source file that asset processing reads"""
+        sources = [Path(self.config["build"]["static_dir"])]
+        sources.append(Path(self.config["build"]["template_dir"]) / "static")
+
+        files = []
+        for source_dir in sources:
+            if source_dir.exists():
+                files.extend(f for f in source_dir.rglob("*") if f.is_file())
+        return sorted(files)
+
+    def load_manifest(self):
+        """load asset manifest and image dimensions from a previous build"""
+        output_assets = Path(self.config["build"]["output_dir"]) / "_sync"
+
+        with open(output_assets / "manifest.json", "r", encoding="utf-8") as f:
+            self.asset_manifest = json.load(f)
+
+        dimensions_file = output_assets / "image-dimensions.json"
+        if dimensions_file.exists():
+            with open(dimensions_file, "r", encoding="utf-8") as f:
+                self.image_dimensions = json.load(f)
+
     def _process_scss(self, static_dir: Path, output_assets: Path):
         """Compile SCSS to CSS"""
         scss_file = static_dir / "scss" / "main.scss"
@@ -111,128 +164,218 @@ class AssetProcessor:
         """convert images to WebP with compression"""
         images_dir = static_dir / "images"
         if images_dir.exists():
-            for img_file in images_dir.rglob("*"):
-                if img_file.is_file() and img_file.suffix.lower() in [
-                    ".jpg",
-                    ".jpeg",
-                    ".png",
-                    ".gif",
-                    ".webp",
-                    ".svg",
-                ]:
-                    relative_path = img_file.relative_to(images_dir)
-                    original_name = str(relative_path).replace("\\", "/")
-
-                    # convert to WebP for better compression
-                    if img_file.suffix.lower() in [".jpg", ".jpeg", ".png"]:
-                        # change extension to .webp (keep same filename)
-                        webp_name = str(Path(original_name).with_suffix(".webp"))
-
-                        # read and convert to webp (returns content, width, height)
-                        img_content, width, height = self._convert_to_webp(img_file)
-
-                        # update manifest: original name → webp name (no hash)
-                        self.asset_manifest[f"images/{original_name}"] = (
-                            f"images/{webp_name}"
-                        )
-
-                        # store dimensions for SEO
-                        self.image_dimensions[f"images/{webp_name}"] = {
-                            "width": width,
-                            "height": height,
-                        }
-
-                        output_img = output_assets / "images" / webp_name
-                        output_img.parent.mkdir(parents=True, exist_ok=True)
-
-                        # save webp content
-                        output_img.write_bytes(img_content)
-                    else:
-                        # copy other formats as-is (svg, gif, existing webp)
-                        self.asset_manifest[f"images/{original_name}"] = (
-                            f"images/{original_name}"
-                        )
-
-                        # try to get dimensions for non-svg images
-                        if img_file.suffix.lower() != ".svg":
-                            try:
-                                with Image.open(img_file) as img:
-                                    self.image_dimensions[f"images/{original_name}"] = {
-                                        "width": img.size[0],
-                                        "height": img.size[1],
-                                    }
-                            except Exception:
-                                pass
-
-                        output_img = output_assets / "images" / original_name
-                        output_img.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy2(img_file, output_img)
-
+            self._process_image_dir(images_dir, output_assets, "images")
             print("Processed images (converted to WebP)")
 
     def _process_icons(self, static_dir: Path, output_assets: Path):
         """convert icons to WebP with compression"""
         icons_dir = static_dir / "icons"
         if icons_dir.exists():
-            for icon_file in icons_dir.rglob("*"):
-                if icon_file.is_file() and icon_file.suffix.lower() in [
-                    ".jpg",
-                    ".jpeg",
-                    ".png",
-                    ".gif",
-                    ".webp",
-                    ".svg",
-                ]:
-                    relative_path = icon_file.relative_to(icons_dir)
-                    original_name = str(relative_path).replace("\\", "/")
-
-                    # convert to WebP for better compression
-                    if icon_file.suffix.lower() in [".jpg", ".jpeg", ".png"]:
-                        # change extension to .webp (keep same filename)
-                        webp_name = str(Path(original_name).with_suffix(".webp"))
-
-                        # read and convert to webp (returns content, width, height)
-                        icon_content, width, height = self._convert_to_webp(icon_file)
-
-                        # update manifest: original name → webp name (no hash)
-                        self.asset_manifest[f"icons/{original_name}"] = (
-                            f"icons/{webp_name}"
-                        )
-
-                        # store dimensions for SEO
-                        self.image_dimensions[f"icons/{webp_name}"] = {
-                            "width": width,
-                            "height": height,
-                        }
-
-                        output_icon = output_assets / "icons" / webp_name
-                        output_icon.parent.mkdir(parents=True, exist_ok=True)
-
-                        # save webp content
-                        output_icon.write_bytes(icon_content)
-                    else:
-                        # copy other formats as-is (svg, gif, existing webp)
-                        self.asset_manifest[f"icons/{original_name}"] = (
-                            f"icons/{original_name}"
-                        )
-
-                        # try to get dimensions for non-svg icons
-                        if icon_file.suffix.lower() != ".svg":
-                            try:
-                                with Image.open(icon_file) as img:
-                                    self.image_dimensions[f"icons/{original_name}"] = {
-                                        "width": img.size[0],
-                                        "height": img.size[1],
-                                    }
-                            except Exception:
-                                pass
-
-                        output_icon = output_assets / "icons" / original_name
-                        output_icon.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy2(icon_file, output_icon)
-
+            self._process_image_dir(icons_dir, output_assets, "icons")
             print("Processed icons (converted to WebP)")
 
+    def _process_image_dir(self, source_dir: Path, output_assets: Path, kind: str):
+        """convert or copy every image in a directory into output_assets/<kind>"""
+        files = [
+            f
+            for f in source_dir.rglob("*")
+            if f.is_file() and f.suffix.lower() in IMAGE_EXTENSIONS
+        ]
+        # sorted so the manifest is the same regardless of filesystem order
+        files.sort(key=lambda f: f.relative_to(source_dir).as_posix())
+
+        to_convert = [f for f in files if f.suffix.lower() in WEBP_SOURCE_EXTENSIONS]
+        jobs = [self._image_job(f) for f in to_convert]
+        # failed conversions are copied as-is like formats that are never converted
+        converted = {
+            f: result
+            for f, result in zip(to_convert, self._convert_images(jobs))
+            if result is not None
+        }
+
+        for img_file in files:
+            relative_path = img_file.relative_to(source_dir)
+            original_name = str(relative_path).replace("\\", "/")
+
+            # convert to WebP for better compression
+            if img_file in converted:
+                # change extension to .webp (keep same filename)
+                webp_name = str(Path(original_name).with_suffix(".webp"))
+                img_content, width, height = converted[img_file]
+
+                # update manifest: original name → webp name (no hash)
+                self.asset_manifest[f"{kind}/{original_name}"] = f"{kind}/{webp_name}"
+
+                # store dimensions for SEO
+                self.image_dimensions[f"{kind}/{webp_name}"] = {
+                    "width": width,
+                    "height": height,
+                }
+
+                output_img = output_assets / kind / webp_name
+                output_img.parent.mkdir(parents=True, exist_ok=True)
+
+                # save webp content
+                output_img.write_bytes(img_content)
+            else:
+                # copy other formats as-is (svg, gif, existing webp)
+                self.asset_manifest[f"{kind}/{original_name}"] = (
+                    f"{kind}/{original_name}"
+                )
+
+                # try to get dimensions for non-svg images
+                if img_file.suffix.lower() != ".svg":
+                    try:
+                        with Image.open(img_file) as img:
+                            self.image_dimensions[f"{kind}/{original_name}"] = {
+                                "width": img.size[0],
+                                "height": img.size[1],
+                            }
+                    except Exception:
+                        pass
+
+                output_img = output_assets / kind / original_name
+                output_img.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(img_file, output_img)
+
+        # icons are shown at fixed small sizes, only content images get variants
+        if kind == "images":
+            self._process_variants(source_dir, output_assets, kind, converted)
+
+    def _process_variants(
+        self,
+        source_dir: Path,
+        output_assets: Path,
+        kind: str,
+        converted: Dict[Path, Tuple[bytes, int, int]],
+    ):
+        """write resized (and optionally AVIF) variants of converted images"""
+        assets_config = self.config.get("assets", {})
+        widths = sorted(set(assets_config.get("responsive_widths") or []))
+        formats = ["WEBP", "AVIF"] if assets_config.get("avif", False) else ["WEBP"]
+
+        jobs = []
+        for img_file, (_, width, _) in converted.items():
+            for fmt in formats:
+                # never upscale; the full-size WebP is the primary conversion
+                jobs.extend(
+                    self._image_job(img_file, fmt, w) for w in widths if w < width
+                )
+                if fmt != "WEBP":
+                    jobs.append(self._image_job(img_file, fmt))
+
+        if not jobs:
+            return
+
+        written = 0
+        for job, result in zip(jobs, self._convert_images(jobs)):
+            # a failed variant is left out rather than served in the wrong format
+            if result is None:
+                continue
+            content, width, height = result
+            original_name = job.source.relative_to(source_dir).as_posix()
+            stem = Path(original_name).with_suffix("").as_posix()
+            suffix = f"-{job.width}w" if job.width else ""
+            variant_name = f"{stem}{suffix}{IMAGE_FORMAT_EXTENSIONS[job.fmt]}"
+            primary = f"{kind}/{Path(original_name).with_suffix('.webp').as_posix()}"
+
+            self.asset_manifest[f"{kind}/{variant_name}"] = f"{kind}/{variant_name}"
+            self.image_dimensions[f"{kind}/{variant_name}"] = {
+                "width": width,
+                "height": height,
+            }
+            self.image_dimensions[primary].setdefault("variants", []).append(
+                f"{kind}/{variant_name}"
+            )
+
+            output_img = output_assets / kind / variant_name
+            output_img.parent.mkdir(parents=True, exist_ok=True)
+            output_img.write_bytes(content)
+            written += 1
+
+        print(f"Generated {written} responsive image variant(s)")
+
+    def _get_image_workers(self) -> int:
+        """worker processes for image conversion (assets.image_workers, then build.workers)"""
+        return resolve_workers(
+            self.config, self.config.get("assets", {}).get("image_workers")
+        )
+
+    def _image_job(
+        self, source: Path, fmt: str = "WEBP", width: Optional[int] = None
+    ) -> ImageJob:
+        """Build a conversion job with the encoder settings for its format"""
+        if fmt == "AVIF":
+            options = {"quality": self.config.get("assets", {}).get("avif_quality", 60)}
+        else:
+            quality, method = self._webp_settings()
+            options = {"quality": quality, "method": method}
+        return ImageJob(source, fmt, width, options)
+
+    def _convert_images(
+        self, jobs: List[ImageJob]
+    ) -> List[Optional[Tuple[bytes, int, int]]]:
+        """run conversion jobs, reusing cached conversions, keeping job order
+
+        failed conversions are None
+        """
+        results: List[Optional[Tuple[bytes, int, int]]] = [None] * len(jobs)
+        pending = []
+
+        for index, job in enumerate(jobs):
+            key = self._image_cache_key(job) if self.image_cache.enabled else None
+            entry = self.image_cache.get_bytes(key) if key else None
+            if entry is not None:
+                results[index] = _decode_image_entry(entry)
+            else:
+                pending.append((index, key))
+
+        pending_jobs = [jobs[index] for index, _ in pending]
+        workers = min(self._get_image_workers(), len(pending_jobs))
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                converted = list(executor.map(convert_image, pending_jobs))
+        else:
+            converted = [self._convert_job(job) for job in pending_jobs]
+
+        for (index, key), result in zip(pending, converted):
+            results[index] = result
+            # failed conversions are not cached, so they are retried next build
+            if key and result is not None:
+                self.image_cache.set_bytes(key, _encode_image_entry(*result))
+
+        return results
+
+    def _convert_job(self, job: ImageJob) -> Optional[Tuple[bytes, int, int]]:
+        """run one conversion job in this process"""
+        if job.fmt == "WEBP" and job.width is None:
+            return self._convert_to_webp(job.source)
+        return convert_image(job)
+
+    def _image_cache_key(self, job: ImageJob) -> Optional[str]:
+        """cache key from source bytes, target size and encoder settings (not the path)"""
+        try:
+            source = job.source.read_bytes()
+        except OSError:
+            return None
+
+        return DiskCache.make_key(
+            IMAGE_CACHE_VERSION,
+            source,
+            job.fmt,
+            job.width or 0,
+            json.dumps(job.options, sort_keys=True),
+            PIL.__version__,
+        )
+
+    def _webp_settings(self) -> Tuple[int, int]:
+        """WebP encoder quality and method from config"""
+        assets_config = self.config.get("assets", {})
+        return assets_config.get("webp_quality", 85), assets_config.get(
+            "webp_method", 6
+        )
+
     def _process_fonts(self, static_dir: Path, output_assets: Path):
         """copy font files to output"""
         fonts_dir = static_dir / "fonts"
@@ -272,44 +415,9 @@ class AssetProcessor:
 
             print("Copied template static files")
 
-    def _convert_to_webp(self, input_path: Path) -> tuple:
-        """convert image to WebP format and return (bytes, width, height)"""
-        try:
-            with Image.open(input_path) as img:
-                width, height = img.size
-
-                # convert RGBA to RGB for JPG sources
-                if img.mode in ("RGBA", "LA"):
-                    # create white background
-                    background = Image.new("RGB", img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1])
-                    img = background
-                elif img.mode == "P":
-                    img = img.convert("RGB")
-
-                # save to WebP with high quality
-                from io import BytesIO
-
-                output = BytesIO()
-                assets_config = self.config.get("assets", {})
-                quality = assets_config.get("webp_quality", 85)
-
-                img.save(
-                    output,
-                    format="WEBP",
-                    quality=quality,
-                    method=6,  # best compression
-                )
-
-                return output.getvalue(), width, height
-        except Exception as e:
-            print(f"Error converting image {input_path} to WebP: {e}")
-            # fallback: return original file and try to get dimensions
-            try:
-                with Image.open(input_path) as img:
-                    return input_path.read_bytes(), img.size[0], img.size[1]
-            except Exception:
-                return input_path.read_bytes(), 0, 0
+    def _convert_to_webp(self, input_path: Path) -> Optional[Tuple[bytes, int, int]]:
+        """convert image to WebP format and return (bytes, width, height), None on failure"""
+        return convert_image(self._image_job(input_path))
 
     def _minify_css(self, css_content: str) -> str:
         """Basic CSS minification"""
@@ -342,15 +450,17 @@ class AssetProcessor:
         return js_content.strip()
 
     def _generate_hash(self, content, length: int = 8) -> str:
-        """Generate hash from content + build timestamp for cache busting"""
+        """Generate hash from content (plus build timestamp unless stable_hash is set)"""
         if isinstance(content, str):
             content_bytes = content.encode()
         else:
             content_bytes = content
 
-        # Combine content with build timestamp for unique hash every build
-        combined_content = content_bytes + self.build_timestamp.encode()
-        return hashlib.md5(combined_content).hexdigest()[:length]
+        # stable hashes keep URLs unchanged across builds while the bytes are identical
+        if not self.config.get("assets", {}).get("stable_hash", True):
+            # Combine content with build timestamp for unique hash every build
+            content_bytes = content_bytes + self.build_timestamp.encode()
+        return hashlib.md5(content_bytes).hexdigest()[:length]
 
     def _get_hashed_filename(self, original_name: str, content) -> str:
         """Generate hashed filename"""
@@ -369,11 +479,106 @@ class AssetProcessor:
         """save asset manifest and image dimensions to JSON files"""
         manifest_file = output_assets / "manifest.json"
         with open(manifest_file, "w", encoding="utf-8") as f:
-            json.dump(self.asset_manifest, f, indent=2)
+            json.dump(self.asset_manifest, f, indent=2, sort_keys=True)
 
         # save image dimensions for SEO
         dimensions_file = output_assets / "image-dimensions.json"
         with open(dimensions_file, "w", encoding="utf-8") as f:
-            json.dump(self.image_dimensions, f, indent=2)
+            json.dump(self.image_dimensions, f, indent=2, sort_keys=True)
 
         print("Generated asset manifest and image dimensions")
+
+    def _report_manifest_changes(self) -> Dict[str, List[str]]:
+        """compare the asset manifest with the previous build's and print what changed"""
+        if not self.config.get("cache", {}).get("enabled", False):
+            return {}
+
+        previous_file = get_cache_dir(self.config) / "asset-manifest.json"
+        previous = None
+        if previous_file.exists():
+            try:
+                with open(previous_file, "r", encoding="utf-8") as f:
+                    previous = json.load(f)
+            except (OSError, ValueError):
+                previous = None
+
+        previous_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(previous_file, "w", encoding="utf-8") as f:
+            json.dump(self.asset_manifest, f, indent=2, sort_keys=True)
+
+        if previous is None:
+            return {}
+
+        changes = {
+            "added": sorted(k for k in self.asset_manifest if k not in previous),
+            "removed": sorted(k for k in previous if k not in self.asset_manifest),
+            "changed": sorted(
+                k
+                for k, v in self.asset_manifest.items()
+                if k in previous and previous[k] != v
+            ),
+        }
+        unchanged = (
+            len(self.asset_manifest) - len(changes["added"]) - len(changes["changed"])
+        )
+
+        print(
+            f"Asset URLs: {unchanged} unchanged, {len(changes['changed'])} changed, "
+            f"{len(changes['added'])} added, {len(changes['removed'])} removed"
+        )
+        for key in changes["changed"]:
+            print(f"  changed: {previous[key]} -> {self.asset_manifest[key]}")
+        for key in changes["added"]:
+            print(f"  added: {self.asset_manifest[key]}")
+        for key in changes["removed"]:
+            print(f"  removed: {previous[key]}")
+
+        return changes
+
+
+def _encode_image_entry(content: bytes, width: int, height: int) -> bytes:
+    """pack converted bytes and dimensions into one cache entry"""
+    return struct.pack(">II", width, height) + content
+
+
+def _decode_image_entry(entry: bytes) -> Tuple[bytes, int, int]:
+    """unpack a cache entry written by _encode_image_entry"""
+    width, height = struct.unpack(">II", entry[:8])
+    return entry[8:], width, height
+
+
+def convert_image(job: ImageJob) -> Optional[Tuple[bytes, int, int]]:
+    """convert an image for a job and return (bytes, width, height), None on failure
+
+    module level so it can run in worker processes
+    """
+    input_path = job.source
+    try:
+        with Image.open(input_path) as img:
+            width, height = img.size
+
+            # convert RGBA to RGB for JPG sources
+            if img.mode in ("RGBA", "LA"):
+                # create white background
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            elif img.mode == "P":
+                img = img.convert("RGB")
+
+            # downscale responsive variants, keeping the aspect ratio
+            if job.width and job.width < width:
+                height = max(1, round(height * job.width / width))
+                width = job.width
+                img = img.resize((width, height), Image.LANCZOS)
+
+            # encode to the job's format (WebP or AVIF)
+            from io import BytesIO
+
+            output = BytesIO()
+            img.save(output, format=job.fmt, **job.options)
+
+            return output.getvalue(), width, height
+    except Exception as e:
+        print(f"Error converting image {input_path} to {job.fmt}: {e}")
+        return None
@@ -0,0 +1,233 @@
+"""
+precompressed copies of text outputs
+writes .gz (and .br when the brotli package is installed) at maximum
+compression next to each html, css, js, json, xml and txt output, so servers
+that negotiate Accept-Encoding send them without compressing per request
+"""
+
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.utils.cache import DiskCache, get_cache_dir
+from core.utils.workers import resolve_workers
+
+try:
+    import brotli
+except ImportError:
+    # optional, only gzip copies are written without it
+    brotli = None
+
+COMPRESS_VERSION = 1
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".json", ".xml", ".txt", ".svg")
+
+# smaller files fit in one packet either way
+MIN_SIZE = 256
+
+# encoders slow enough that clean builds reuse cached results
+CACHED_SUFFIXES = (".br",)
+
+# (source path, relative path, source stat, suffixes to write)
+CompressJob = Tuple[str, str, os.stat_result, List[str]]
+
+
+def gzip_bytes(data: bytes) -> bytes:
+    """gzip at level 9 with a fixed mtime, so the bytes only follow the content"""
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data: bytes) -> bytes:
+    """brotli at quality 11"""
+    return brotli.compress(data, quality=11)
+
+
+class OutputCompressor:
+    """writes compressed siblings of changed text outputs in parallel"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        compress_config = config.get("compress", {})
+        self.enabled = compress_config.get("enabled", False)
+        self.min_size = compress_config.get("min_size", MIN_SIZE)
+        self.extensions = tuple(
+            compress_config.get("extensions", COMPRESSIBLE_EXTENSIONS)
+        )
+        self.workers = resolve_workers(config, compress_config.get("workers"))
+        self.encoders = {".gz": gzip_bytes}
+        if compress_config.get("brotli", True) and brotli is not None:
+            self.encoders[".br"] = brotli_bytes
+
+        self.output_dir = Path(config["build"]["output_dir"])
+        # siblings written by the last run, so orphans can be removed
+        self.record_path = get_cache_dir(config) / "compressed.json"
+        self.cache = DiskCache(config, "compressed")
+
+    def generate(self) -> List[str]:
+        """compress changed outputs and remove copies of removed ones
+
+        returns the written siblings relative to the output directory
+        """
+        previous = self._load_record()
+        if not self.enabled and not previous:
+            return []
+
+        current: Dict[str, int] = {}
+        written: List[str] = []
+        if self.enabled:
+            # stats are cheap; only outputs with missing or outdated copies
+            # go to the pool
+            pending = []
+            for source, rel in self._sources():
+                job = self._check(source, rel, current)
+                if job is not None:
+                    pending.append(job)
+
+            if pending:
+                # zlib and brotli release the GIL while compressing
+                workers = max(1, min(self.workers, len(pending)))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    for siblings in pool.map(self._compress, pending):
+                        current.update(siblings)
+                        written.extend(siblings)
+
+        orphans = {rel: mtime for rel, mtime in previous.items() if rel not in current}
+        removed = self._remove_orphans(orphans)
+        self._save_record(current)
+
+        if self.enabled:
+            encodings = "/".join(suffix.lstrip(".") for suffix in self.encoders)
+            print(
+                f"Compressed {len(written)} file(s) ({encodings}), "
+                f"{len(current) - len(written)} unchanged, {removed} removed"
+            )
+        return sorted(written)
+
+    def _sources(self) -> List[Tuple[str, str]]:
+        """text outputs that get compressed copies, with their relative paths"""
+        root = str(self.output_dir)
+        sources = []
+        for directory, _, filenames in os.walk(root):
+            prefix = os.path.relpath(directory, root).replace(os.sep, "/") + "/"
+            if prefix == "./":
+                prefix = ""
+            sources.extend(
+                (os.path.join(directory, name), prefix + name)
+                for name in filenames
+                if name.endswith(self.extensions)
+            )
+        return sorted(sources)
+
+    def _check(
+        self, source: str, rel: str, current: Dict[str, int]
+    ) -> Optional[CompressJob]:
+        """record the up to date copies of one output, returns the work left
+
+        copies get the mtime of their source, so an unchanged output is
+        recognized from stats alone, without reading it
+        """
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        if stat.st_size < self.min_size:
+            return None
+
+        missing = []
+        for suffix in self.encoders:
+            try:
+                if os.stat(source + suffix).st_mtime_ns == stat.st_mtime_ns:
+                    current[rel + suffix] = stat.st_mtime_ns
+                    continue
+            except OSError:
+                pass
+            missing.append(suffix)
+        return (source, rel, stat, missing) if missing else None
+
+    def _compress(self, job: CompressJob) -> Dict[str, int]:
+        """write the missing copies of one output, returns them with their mtimes"""
+        source, rel, stat, suffixes = job
+        try:
+            with open(source, "rb") as f:
+                data = f.read()
+        except OSError:
+            return {}
+
+        written = {}
+        for suffix in suffixes:
+            compressed = self._encode(suffix, data)
+            if len(compressed) >= len(data):
+                # not worth a copy; a stale one is removed as an orphan
+                continue
+
+            with open(source + suffix, "wb") as f:
+                f.write(compressed)
+            os.utime(source + suffix, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            written[rel + suffix] = stat.st_mtime_ns
+        return written
+
+    def _encode(self, suffix: str, data: bytes) -> bytes:
+        """compress with one encoder; brotli results are kept across clean builds
+
+        gzip is quicker to redo than to look up, brotli at quality 11 is not
+        """
+        if suffix not in CACHED_SUFFIXES:
+            return self.encoders[suffix](data)
+        key = DiskCache.make_key(COMPRESS_VERSION, suffix, data)
+        compressed = self.cache.get_bytes(key)
+        if compressed is None:
+            compressed = self.encoders[suffix](data)
+            self.cache.set_bytes(key, compressed)
+        return compressed
+
+    def _remove_orphans(self, orphans: Dict[str, int]) -> int:
+        """delete siblings whose output was removed or no longer compresses
+
+        a file rewritten since (sitemap-N.xml.gz when sitemap.gzip is turned
+        on) is no longer a copy made here and is kept
+        """
+        removed = 0
+        for rel, mtime in sorted(orphans.items()):
+            path = self.output_dir / rel
+            try:
+                if path.stat().st_mtime_ns != mtime:
+                    continue
+            except OSError:
+                continue
+            path.unlink()
+            removed += 1
+
+            # remove directories left empty by the deleted page
+            parent = path.parent
+            while parent != self.output_dir and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        return removed
+
+    def _load_record(self) -> Dict[str, int]:
+        """siblings and their mtimes from the previous run into this output dir"""
+        try:
+            with open(self.record_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (
+            data.get("version") != COMPRESS_VERSION
+            or data.get("output_dir") != self.output_dir.as_posix()
+        ):
+            return {}
+        return data.get("files", {})
+
+    def _save_record(self, files: Dict[str, int]):
+        """save the siblings written by this run"""
+        self.record_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": COMPRESS_VERSION,
+            "output_dir": self.output_dir.as_posix(),
+            "files": files,
+        }
+        with open(self.record_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data))
@@ -4,8 +4,8 @@ Content models for blog posts and pages
 
 import datetime
 import re
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass
@@ -19,6 +19,7 @@ class Post:
     file_path: str
     slug: str
     category: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
     author: Optional[str] = None
     description: Optional[str] = None
     excerpt: Optional[str] = None
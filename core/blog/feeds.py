@@ -0,0 +1,519 @@
+"""
+Streaming feed writer
+Writes RSS 2.0, Atom and JSON Feed documents in a single pass over posts.
+Entries are rendered to text fragments and streamed to every open feed, so
+no document tree is built and memory stays flat as the feed grows.
+Category and tag feeds are grouped in the same pass and share the fragments
+of posts they have in common.
+Older entries move to RFC 5005 archive pages of a fixed size, numbered from
+the oldest post, so a full page never changes once written.
+"""
+
+import datetime
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from xml.sax.saxutils import escape, quoteattr
+
+from core.utils.cache import DiskCache
+
+from .content import Post
+from .manifest import config_fingerprint, fingerprint
+from .search import summarize
+
+# output file for each supported format
+FEED_FORMATS = {"rss": "rss.xml", "atom": "atom.xml", "json": "feed.json"}
+
+# bump when the archive page layout changes to rewrite cached pages
+FEED_ARCHIVE_VERSION = 1
+
+FEED_HISTORY_NS = "http://purl.org/syndication/history/1.0"
+
+# characters that are not allowed anywhere in an XML 1.0 document
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_SLUG_RE = re.compile(r"[^\w-]+")
+
+
+def xml_text(value: str) -> str:
+    """Escape a string for XML character data"""
+    return escape(_INVALID_XML_RE.sub("", value))
+
+
+def xml_attr(value: str) -> str:
+    """Escape and quote a string for an XML attribute"""
+    return quoteattr(_INVALID_XML_RE.sub("", value))
+
+
+def tag_slug(tag: str) -> str:
+    """URL path segment of a tag feed"""
+    return _SLUG_RE.sub("-", tag.strip().lower()).strip("-")
+
+
+def tag_paths(tags: Iterable[str]) -> Dict[str, str]:
+    """Feed directory of every tag, keyed by its lowercased name
+
+    Tags that differ only in case share a feed. When different tags slugify
+    alike ("C++" and "C"), the one spelled like the slug keeps it and the
+    others get a suffix from a hash of their name, as do tags without a single
+    word character, so no feed overwrites another.
+    """
+    claims: Dict[str, List[str]] = {}
+    for name in sorted({tag.strip().lower() for tag in tags}):
+        claims.setdefault(tag_slug(name), []).append(name)
+
+    paths = {}
+    for slug, names in sorted(claims.items()):
+        names.sort(key=lambda name: (name != slug, name))
+        for n, name in enumerate(names):
+            if slug and n == 0:
+                paths[name] = f"tags/{slug}"
+            else:
+                paths[name] = f"tags/{slug or 'tag'}-{fingerprint(name)[:8]}"
+        if len(names) > 1:
+            print(
+                f"Tags {', '.join(repr(name) for name in names)} share the feed "
+                f"slug '{slug}', later ones get a suffix"
+            )
+    return paths
+
+
+def _aware(date: datetime.datetime) -> datetime.datetime:
+    """Treat naive dates as UTC, as the content loader does"""
+    if date.tzinfo is None:
+        return date.replace(tzinfo=datetime.timezone.utc)
+    return date
+
+
+@dataclass
+class FeedEntry:
+    """Format-independent fields of one feed entry"""
+
+    title: str
+    url: str
+    date: datetime.datetime
+    author: str
+    summary: str
+    content: Optional[str] = None
+    categories: List[str] = field(default_factory=list)
+
+
+@dataclass
+class FeedChannel:
+    """One feed document: where it is published and the posts it lists"""
+
+    path: str  # directory under the site root, "" for the site-wide feed
+    title: str
+    description: str
+    posts: List[int] = field(default_factory=list)  # indexes into the post list
+
+    def url(self, base_url: str, name: str = "") -> str:
+        """Absolute URL of the channel's home page or of one of its files"""
+        directory = f"{self.path}/" if self.path else ""
+        return f"{base_url}/{directory}{name}"
+
+
+@dataclass
+class FeedPage:
+    """The subscription document (number 0) or an archive page of a channel"""
+
+    number: int
+    posts: List[int]
+    prev_archive: Optional[int] = None  # next older archive page, if any
+
+    def file_name(self, fmt: str) -> str:
+        """Output file of the page relative to its channel directory"""
+        name = FEED_FORMATS[fmt]
+        if not self.number:
+            return name
+        stem, suffix = name.rsplit(".", 1)
+        return f"archive/{stem}-{self.number}.{suffix}"
+
+
+class FeedWriter:
+    """Streams posts into RSS 2.0, Atom and JSON Feed documents"""
+
+    def __init__(
+        self, config: Dict[str, Any], source_fingerprint: Optional[Callable] = None
+    ):
+        self.config = config
+        # fingerprints of archived posts key the archive page cache
+        self.source_fingerprint = source_fingerprint or fingerprint
+        site_config = config["site"]
+        rss_config = config.get("rss", {})
+
+        self.base_url = site_config["url"].rstrip("/")
+        self.title = rss_config.get("title", site_config["title"])
+        self.description = rss_config.get("description", site_config["description"])
+        self.language = site_config.get("language", "en")
+        self.author = site_config["author"]
+        self.full_content = rss_config.get("full_content", False)
+        self.summary_length = rss_config.get("summary_length", 300)
+        self.category_feeds = rss_config.get("category_feeds", True)
+        self.tag_feeds = rss_config.get("tag_feeds", True)
+        self.max_items = rss_config.get("max_items", 20)
+        self.archive = rss_config.get("archive", False)
+        # every post past the subscription document must land on a full page
+        self.archive_size = min(rss_config.get("archive_size", 50), self.max_items)
+        self.cache = DiskCache(config, "feeds")
+        self.archive_pages = 0
+        self.archive_skipped = 0
+        self.formats = [
+            f for f in rss_config.get("formats", ["rss"]) if f in FEED_FORMATS
+        ]
+
+    def entry(self, post: Post) -> FeedEntry:
+        """Collect the fields every format needs from a post"""
+        return FeedEntry(
+            title=post.title,
+            url=f"{self.base_url}{post.url}",
+            date=_aware(post.date),
+            author=post.author or self.author,
+            summary=post.description or summarize(post.content, self.summary_length),
+            content=post.content if self.full_content else None,
+            categories=[c for c in [post.category, *post.tags] if c],
+        )
+
+    def site_channel(self, posts: List[Post]) -> FeedChannel:
+        """The site-wide feed listing every post"""
+        return FeedChannel("", self.title, self.description, list(range(len(posts))))
+
+    def channels(self, posts: List[Post]) -> List[FeedChannel]:
+        """Group posts into the site-wide, category and tag feeds in one pass"""
+        site = FeedChannel("", self.title, self.description)
+        groups: Dict[str, FeedChannel] = {}
+        tags = (
+            tag_paths(tag for post in posts for tag in post.tags)
+            if self.tag_feeds
+            else {}
+        )
+
+        for i, post in enumerate(posts):
+            targets = [site]
+            if self.category_feeds and post.category:
+                targets.append(
+                    groups.setdefault(
+                        post.category,
+                        FeedChannel(
+                            post.category,
+                            f"{self.title}: {post.category}",
+                            f"Posts in {post.category}",
+                        ),
+                    )
+                )
+            if self.tag_feeds:
+                for tag in post.tags:
+                    path = tags[tag.strip().lower()]
+                    targets.append(
+                        groups.setdefault(
+                            path,
+                            FeedChannel(
+                                path, f"{self.title}: #{tag}", f"Posts tagged {tag}"
+                            ),
+                        )
+                    )
+
+            for channel in targets:
+                if not channel.posts or channel.posts[-1] != i:
+                    channel.posts.append(i)
+
+        return [site, *(groups[path] for path in sorted(groups))]
+
+    def pages(self, channel: FeedChannel) -> List[FeedPage]:
+        """Split a channel into its subscription document and archive pages"""
+        subscription = FeedPage(0, channel.posts[: self.max_items])
+        if not self.archive:
+            return [subscription]
+
+        # pages are filled from the oldest post; a partial last page is left
+        # out because those posts are still in the subscription document
+        oldest_first = channel.posts[::-1]
+        full = []
+        for start in range(
+            0, len(oldest_first) - self.archive_size + 1, self.archive_size
+        ):
+            end = start + self.archive_size
+            full.append(oldest_first[start:end])
+
+        subscription.prev_archive = len(full) or None
+        archive = [
+            FeedPage(number, chunk[::-1], prev_archive=number - 1 or None)
+            for number, chunk in enumerate(full, 1)
+        ]
+        return [subscription, *archive]
+
+    def write(self, posts: List[Post], output_dir: Path) -> List[str]:
+        """Write the site-wide feed in every configured format; returns the file names"""
+        self.write_channels(posts, [self.site_channel(posts)], output_dir)
+        return [FEED_FORMATS[fmt] for fmt in self.formats]
+
+    def write_channels(
+        self, posts: List[Post], channels: List[FeedChannel], output_dir: Path
+    ):
+        """Stream every page of every channel, rendering each entry only once"""
+        if not self.formats:
+            return
+
+        output_dir = Path(output_dir)
+        pages = [
+            (channel, page) for channel in channels for page in self.pages(channel)
+        ]
+        # fragments are dropped once the last page listing the post is written
+        uses = Counter(i for _, page in pages for i in page.posts)
+        fragments: Dict[int, Dict[str, str]] = {}
+        config_key = config_fingerprint(self.config)
+        # a post can sit on archive pages of several channels
+        archived = {i for _, page in pages if page.number for i in page.posts}
+        sources = {i: self.source_fingerprint(posts[i]) for i in archived}
+
+        for channel, page in pages:
+            channel_dir = output_dir / channel.path
+            files = [channel_dir / page.file_name(fmt) for fmt in self.formats]
+
+            if page.number:
+                self.archive_pages += 1
+                # full archive pages only change when one of their posts does
+                key = DiskCache.make_key(
+                    FEED_ARCHIVE_VERSION,
+                    channel.path,
+                    page.number,
+                    ",".join(self.formats),
+                    config_key,
+                    *(sources[i] for i in page.posts),
+                )
+                if self.cache.get_json(key) and all(f.exists() for f in files):
+                    self.archive_skipped += 1
+                    for i in page.posts:
+                        uses[i] -= 1
+                        if not uses[i]:
+                            fragments.pop(i, None)
+                    continue
+
+            self._write_page(posts, channel, page, files, fragments, uses)
+            if page.number:
+                self.cache.set_json(key, True)
+
+        current = {
+            output_dir / channel.path / page.file_name(fmt)
+            for channel, page in pages
+            for fmt in self.formats
+        }
+        for channel in channels:
+            self._remove_stale_archives(output_dir / channel.path, current)
+
+    def _write_page(
+        self,
+        posts: List[Post],
+        channel: FeedChannel,
+        page: FeedPage,
+        paths: List[Path],
+        fragments: Dict[int, Dict[str, str]],
+        uses: Counter,
+    ):
+        """Stream one page to every format"""
+        paths[0].parent.mkdir(parents=True, exist_ok=True)
+        updated = (
+            _aware(posts[page.posts[0]].date)
+            if page.posts
+            else datetime.datetime.now(datetime.timezone.utc)
+        )
+
+        files = {
+            fmt: open(path, "w", encoding="utf-8")
+            for fmt, path in zip(self.formats, paths)
+        }
+        try:
+            for fmt, f in files.items():
+                f.write(getattr(self, f"{fmt}_header")(channel, page, updated))
+
+            for n, i in enumerate(page.posts):
+                if i not in fragments:
+                    entry = self.entry(posts[i])
+                    fragments[i] = {
+                        fmt: getattr(self, f"{fmt}_item")(entry) for fmt in self.formats
+                    }
+                for fmt, f in files.items():
+                    if fmt == "json" and n:
+                        f.write(",\n")
+                    f.write(fragments[i][fmt])
+
+                uses[i] -= 1
+                if not uses[i]:
+                    del fragments[i]
+
+            for fmt, f in files.items():
+                f.write(getattr(self, f"{fmt}_footer")())
+        finally:
+            for f in files.values():
+                f.close()
+
+    def _remove_stale_archives(self, channel_dir: Path, current: Set[Path]):
+        """Delete archive pages left over from builds with more posts"""
+        archive_dir = channel_dir / "archive"
+        if not archive_dir.exists():
+            return
+
+        for path in archive_dir.iterdir():
+            if path not in current:
+                path.unlink()
+
+    def _links(self, channel: FeedChannel, page: FeedPage, fmt: str) -> List[tuple]:
+        """RFC 5005 (rel, href) links of a page"""
+        links = []
+        if page.number:
+            links.append(("current", channel.url(self.base_url, FEED_FORMATS[fmt])))
+        if page.prev_archive:
+            older = FeedPage(page.prev_archive, [])
+            links.append(
+                ("prev-archive", channel.url(self.base_url, older.file_name(fmt)))
+            )
+        return links
+
+    # RSS 2.0
+
+    def rss_header(
+        self, channel: FeedChannel, page: FeedPage, updated: datetime.datetime
+    ) -> str:
+        """Channel metadata up to the first item"""
+        self_url = channel.url(self.base_url, page.file_name("rss"))
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"'
+            ' xmlns:content="http://purl.org/rss/1.0/modules/content/"'
+            ' xmlns:dc="http://purl.org/dc/elements/1.1/"'
+            f" xmlns:fh={xml_attr(FEED_HISTORY_NS)}>\n"
+            "<channel>\n"
+            f"  <title>{xml_text(channel.title)}</title>\n"
+            f"  <link>{xml_text(channel.url(self.base_url))}</link>\n"
+            f"  <description>{xml_text(channel.description)}</description>\n"
+            f"  <language>{xml_text(self.language)}</language>\n"
+            f"  <lastBuildDate>{format_datetime(updated)}</lastBuildDate>\n"
+            f"  <atom:link href={xml_attr(self_url)}"
+            ' rel="self" type="application/rss+xml"/>\n'
+        ]
+        if page.number:
+            parts.append("  <fh:archive/>\n")
+        for rel, href in self._links(channel, page, "rss"):
+            parts.append(f"  <atom:link rel={xml_attr(rel)} href={xml_attr(href)}/>\n")
+        return "".join(parts)
+
+    def rss_item(self, entry: FeedEntry) -> str:
+        """One <item> element"""
+        parts = [
+            "  <item>\n",
+            f"    <title>{xml_text(entry.title)}</title>\n",
+            f"    <link>{xml_text(entry.url)}</link>\n",
+            f'    <guid isPermaLink="true">{xml_text(entry.url)}</guid>\n',
+            f"    <pubDate>{format_datetime(entry.date)}</pubDate>\n",
+            f"    <dc:creator>{xml_text(entry.author)}</dc:creator>\n",
+        ]
+        for category in entry.categories:
+            parts.append(f"    <category>{xml_text(category)}</category>\n")
+        parts.append(f"    <description>{xml_text(entry.summary)}</description>\n")
+        if entry.content is not None:
+            parts.append(
+                f"    <content:encoded>{xml_text(entry.content)}</content:encoded>\n"
+            )
+        parts.append("  </item>\n")
+        return "".join(parts)
+
+    def rss_footer(self) -> str:
+        """Close the channel"""
+        return "</channel>\n</rss>\n"
+
+    # Atom
+
+    def atom_header(
+        self, channel: FeedChannel, page: FeedPage, updated: datetime.datetime
+    ) -> str:
+        """Feed metadata up to the first entry"""
+        self_url = channel.url(self.base_url, page.file_name("atom"))
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom"'
+            f" xmlns:fh={xml_attr(FEED_HISTORY_NS)} xml:lang={xml_attr(self.language)}>\n"
+            f"  <id>{xml_text(channel.url(self.base_url))}</id>\n"
+            f"  <title>{xml_text(channel.title)}</title>\n"
+            f"  <subtitle>{xml_text(channel.description)}</subtitle>\n"
+            f"  <updated>{updated.isoformat()}</updated>\n"
+            f'  <link rel="self" href={xml_attr(self_url)}/>\n'
+            f'  <link rel="alternate" href={xml_attr(channel.url(self.base_url))}/>\n'
+            f"  <author><name>{xml_text(self.author)}</name></author>\n"
+        ]
+        if page.number:
+            parts.append("  <fh:archive/>\n")
+        for rel, href in self._links(channel, page, "atom"):
+            parts.append(f"  <link rel={xml_attr(rel)} href={xml_attr(href)}/>\n")
+        return "".join(parts)
+
+    def atom_item(self, entry: FeedEntry) -> str:
+        """One <entry> element"""
+        parts = [
+            "  <entry>\n",
+            f"    <id>{xml_text(entry.url)}</id>\n",
+            f"    <title>{xml_text(entry.title)}</title>\n",
+            f'    <link rel="alternate" href={xml_attr(entry.url)}/>\n',
+            f"    <published>{entry.date.isoformat()}</published>\n",
+            f"    <updated>{entry.date.isoformat()}</updated>\n",
+            f"    <author><name>{xml_text(entry.author)}</name></author>\n",
+        ]
+        for category in entry.categories:
+            parts.append(f"    <category term={xml_attr(category)}/>\n")
+        parts.append(f'    <summary type="text">{xml_text(entry.summary)}</summary>\n')
+        if entry.content is not None:
+            parts.append(
+                f'    <content type="html">{xml_text(entry.content)}</content>\n'
+            )
+        parts.append("  </entry>\n")
+        return "".join(parts)
+
+    def atom_footer(self) -> str:
+        """Close the feed"""
+        return "</feed>\n"
+
+    # JSON Feed 1.1
+
+    def json_header(
+        self, channel: FeedChannel, page: FeedPage, updated: datetime.datetime
+    ) -> str:
+        """Top-level members followed by the opening of the items array"""
+        feed = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": channel.title,
+            "home_page_url": channel.url(self.base_url),
+            "feed_url": channel.url(self.base_url, "feed.json"),
+            "description": channel.description,
+            "language": self.language,
+            "authors": [{"name": self.author}],
+        }
+        # JSON Feed pages older items through next_url
+        for rel, href in self._links(channel, page, "json"):
+            if rel == "prev-archive":
+                feed["next_url"] = href
+        members = json.dumps(feed, ensure_ascii=False)
+        return f'{members[:-1]}, "items": [\n'
+
+    def json_item(self, entry: FeedEntry) -> str:
+        """One item object"""
+        item = {
+            "id": entry.url,
+            "url": entry.url,
+            "title": entry.title,
+            "summary": entry.summary,
+            "date_published": entry.date.isoformat(),
+            "authors": [{"name": entry.author}],
+        }
+        if entry.content is not None:
+            item["content_html"] = entry.content
+        else:
+            item["content_text"] = entry.summary
+        if entry.categories:
+            item["tags"] = entry.categories
+        return json.dumps(item, ensure_ascii=False)
+
+    def json_footer(self) -> str:
+        """Close the items array and the feed object"""
+        return "\n]}\n"
@@ -4,8 +4,9 @@ Main blog generator class
 
 import shutil
 import sys
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import yaml
 
@@ -13,7 +14,10 @@ from core.utils.content_loader import ContentLoader
 from core.utils.template_renderer import TemplateRenderer
 
 from .assets import AssetProcessor
+from .compress import OutputCompressor
 from .content import Page, Post
+from .feeds import FEED_FORMATS
+from .manifest import BuildManifest, fingerprint
 from .robots import RobotsGenerator
 from .rss import RSSGenerator
 from .search import SearchIndexer
@@ -24,11 +28,17 @@ class BlogGenerator:
     """Main blog generator class"""
 
     def __init__(self, config_path: str = "config/config.yaml"):
+        self.config_path = Path(config_path)
         self.config = self._load_config(config_path)
+        # command line settings, applied again whenever the config is reloaded
+        self.overrides: Dict[Tuple[str, str], Any] = {}
         self.posts: List[Post] = []
         self.pages: List[Page] = []
+        self.build_manifest: Optional[BuildManifest] = None
+        self._init_components()
 
-        # Initialize components
+    def _init_components(self):
+        """Create the build components for the current config"""
         self.content_loader = ContentLoader(self.config)
         self.template_renderer = TemplateRenderer(self.config)
         self.asset_processor = AssetProcessor(self.config)
@@ -36,6 +46,12 @@ class BlogGenerator:
         self.search_indexer = SearchIndexer(self.config)
         self.sitemap_generator = SitemapGenerator(self.config)
         self.robots_generator = RobotsGenerator(self.config)
+        self.output_compressor = OutputCompressor(self.config)
+
+    def override(self, section: str, key: str, value: Any):
+        """Set a config value that takes precedence over the config file"""
+        self.overrides[(section, key)] = value
+        self.config.setdefault(section, {})[key] = value
 
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from YAML file"""
@@ -55,26 +71,101 @@ class BlogGenerator:
         self.posts = self.content_loader.load_posts()
         self.pages = self.content_loader.load_pages()
 
+        cache = self.content_loader.cache
+        if cache.enabled:
+            print(f"Content cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+            cache.prune()
+
     def render_templates(self):
         """Render all templates"""
         manifest = self.asset_processor.asset_manifest
         self.template_renderer.set_asset_manifest(manifest)
 
-        self.template_renderer.render_posts(self.posts)
-        self.template_renderer.render_pages(self.pages)
-        self.template_renderer.render_index(self.posts)
-        self.template_renderer.render_category_pages(self.posts)
+        try:
+            self.template_renderer.render_posts(self.posts)
+            self.template_renderer.render_pages(self.pages)
+            self.template_renderer.render_index(self.posts)
+            self.template_renderer.render_category_pages(self.posts)
+        finally:
+            self.template_renderer.shutdown_workers()
 
     def process_assets(self):
         """Process all static assets"""
+        if self.build_manifest is not None:
+            inputs = {
+                f"static:{path.as_posix()}": fingerprint(path.read_bytes())
+                for path in self.asset_processor.source_files()
+            }
+            inputs["config:assets"] = fingerprint(self.config.get("assets", {}))
+            inputs["config:build"] = fingerprint(self.config["build"].get("static_dir"))
+
+            output_dir = Path(self.config["build"]["output_dir"])
+            marker = output_dir / "_sync" / "manifest.json"
+            if self.build_manifest.stage_is_fresh("assets", inputs, marker):
+                self.asset_processor.load_manifest()
+                print("Assets unchanged, reusing previous output")
+                return
+
         self.asset_processor.process_all()
 
-    def generate_feeds(self):
-        """Generate RSS feed, search index, sitemap, and robots.txt"""
-        self.rss_generator.generate(self.posts)
-        self.search_indexer.generate(self.posts, self.pages)
+        cache = self.asset_processor.image_cache
+        if cache.enabled:
+            print(f"Image cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+            cache.prune()
+
+    def generate_feeds(self, update: bool = False):
+        """Generate RSS feed, search index, sitemap, and robots.txt
+
+        With a build manifest, each output is skipped while its own inputs are
+        unchanged, so editing a page leaves the feeds alone. With update, the
+        search index of the previous call is patched in place (watch mode).
+        """
+        # sitemap lastmod follows the rendered pages, which can change without
+        # a source change (templates), so it is checked on every build
         self.sitemap_generator.generate(self.posts, self.pages)
-        self.robots_generator.generate()
+
+        output_dir = Path(self.config["build"]["output_dir"])
+
+        rss_config = self.config.get("rss", {})
+        formats = [f for f in rss_config.get("formats", ["rss"]) if f in FEED_FORMATS]
+        if rss_config.get("enabled", True) and formats:
+            inputs = self._source_inputs(self.posts)
+            inputs["config:rss"] = fingerprint(rss_config)
+            inputs["config:site"] = fingerprint(self.config["site"])
+            marker = output_dir / FEED_FORMATS[formats[0]]
+            if self._stage_is_fresh("feeds", inputs, marker):
+                print("Feeds unchanged, skipping")
+            else:
+                # shares the fingerprints computed for the rendered pages
+                sources = self.build_manifest and self.build_manifest.source_fingerprint
+                self.rss_generator.generate(self.posts, sources)
+
+        inputs = self._source_inputs([*self.posts, *self.pages])
+        inputs["config:search"] = fingerprint(self.config.get("search", {}))
+        marker = output_dir / "search" / "index.json"
+        if self._stage_is_fresh("search", inputs, marker):
+            print("Search index unchanged, skipping")
+        elif update:
+            self.search_indexer.update(self.posts, self.pages)
+        else:
+            self.search_indexer.generate(self.posts, self.pages)
+
+        inputs = {"config:site": fingerprint(self.config["site"].get("url"))}
+        if not self._stage_is_fresh("robots", inputs, output_dir / "robots.txt"):
+            self.robots_generator.generate()
+
+    def _source_inputs(self, items: List[Any]) -> Dict[str, str]:
+        """Stage inputs for the sources of posts or pages"""
+        if self.build_manifest is None:
+            return {}
+        sources = self.build_manifest.source_fingerprint
+        return {f"source:{item.file_path}": sources(item) for item in items}
+
+    def _stage_is_fresh(self, stage: str, inputs: Dict[str, str], marker: Path) -> bool:
+        """Check a stage against the build manifest, never fresh without one"""
+        if self.build_manifest is None:
+            return False
+        return self.build_manifest.stage_is_fresh(stage, inputs, marker)
 
     def clean_output(self):
         """Clean the output directory"""
@@ -84,16 +175,144 @@ class BlogGenerator:
         output_dir.mkdir(parents=True, exist_ok=True)
         print(f"Cleaned output directory: {output_dir}")
 
-    def build(self, clean: bool = True):
+    def build(self, clean: bool = True, incremental: Optional[bool] = None):
         """Build the entire site"""
         print("Starting blog build...")
 
-        if clean:
+        if incremental is None:
+            incremental = self.config["build"].get("incremental", False)
+
+        # incremental builds keep previous output and skip unchanged files
+        self.build_manifest = BuildManifest(self.config) if incremental else None
+        self.template_renderer.build_manifest = self.build_manifest
+        if not incremental:
+            # a later incremental build must not trust outputs recorded before
+            BuildManifest.discard(self.config)
+
+        if clean and not incremental:
             self.clean_output()
+        Path(self.config["build"]["output_dir"]).mkdir(parents=True, exist_ok=True)
 
         self.load_content()
         self.process_assets()
         self.render_templates()
         self.generate_feeds()
 
+        if self.build_manifest is not None:
+            self.build_manifest.remove_stale_outputs()
+            self.build_manifest.save()
+            print(f"Incremental build wrote {len(self.build_manifest.written)} page(s)")
+
+        # last, so every output of this build has its compressed copies
+        self.output_compressor.generate()
+
         print("Build complete!")
+
+    def watch_paths(self) -> List[Path]:
+        """Source paths whose changes affect the build"""
+        build = self.config["build"]
+        paths = [build["input_dir"], build["template_dir"], build["static_dir"]]
+        return [Path(path) for path in paths] + [self.config_path]
+
+    def reload_config(self) -> bool:
+        """Reload the config file and recreate the build components
+
+        Values set with override() are kept. Returns False, keeping the
+        previous config, when the file is invalid.
+        """
+        try:
+            config = self._load_config(str(self.config_path))
+        except SystemExit:
+            print("Keeping the previous config")
+            return False
+        for (section, key), value in self.overrides.items():
+            config.setdefault(section, {})[key] = value
+        self.config = config
+        self._init_components()
+        return True
+
+    def rebuild(self, changed: Iterable[Path]) -> List[str]:
+        """Rebuild only the outputs affected by changed source files
+
+        Returns the written output files, relative to the output directory.
+        """
+        start = time.perf_counter()
+        changed = [Path(path).resolve() for path in changed]
+        build = self.config["build"]
+
+        def touches(directory: str) -> bool:
+            root = Path(directory).resolve()
+            return any(path == root or root in path.parents for path in changed)
+
+        if self.config_path.resolve() in changed:
+            if not self.reload_config():
+                return []
+            print("Config changed, rebuilding everything...")
+            self.build(clean=False, incremental=True)
+            return list(self.build_manifest.written)
+
+        static = touches(build["static_dir"]) or touches(
+            str(Path(build["template_dir"]) / "static")
+        )
+        templates = touches(build["template_dir"])
+        posts = self.content_loader.update_posts(self.posts, changed)
+        pages = self.content_loader.update_pages(self.pages, changed)
+        if not (static or templates) and posts is None and pages is None:
+            return []
+
+        print(f"\n🔄 {len(changed)} file(s) changed, rebuilding...")
+        if self.build_manifest is None:
+            self.build_manifest = BuildManifest(self.config)
+            self.template_renderer.build_manifest = self.build_manifest
+        else:
+            # edited files are parsed into new items, unchanged ones are kept
+            self.build_manifest.reset(keep_sources=True)
+
+        if posts is not None:
+            self.posts = posts
+        if pages is not None:
+            self.pages = pages
+
+        assets = self.asset_outputs() if static else {}
+        if static:
+            self.process_assets()
+        if templates:
+            self.template_renderer.reload_templates()
+
+        # unchanged pages are skipped by the build manifest
+        self.render_templates()
+        if posts is not None or pages is not None:
+            self.generate_feeds(update=True)
+
+        self.build_manifest.remove_stale_outputs()
+        self.build_manifest.save()
+        self.output_compressor.generate()
+
+        written = list(self.build_manifest.written)
+        if static:
+            written += sorted(
+                f"_sync/{name}"
+                for name, digest in self.asset_outputs().items()
+                if assets.get(name) != digest
+            )
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Rebuilt {len(written)} output(s) in {elapsed:.0f}ms")
+        return written
+
+    def asset_outputs(self) -> Dict[str, str]:
+        """Asset output names, with content fingerprints for stylesheets and scripts
+
+        hashed names change with their content; the fingerprints catch edits
+        when assets.use_hash is off
+        """
+        output_assets = Path(self.config["build"]["output_dir"]) / "_sync"
+        outputs = {}
+        for name in self.asset_processor.asset_manifest.values():
+            digest = ""
+            if name.endswith((".css", ".js")):
+                try:
+                    digest = fingerprint((output_assets / name).read_bytes())
+                except OSError:
+                    pass
+            outputs[name] = digest
+        return outputs
@@ -0,0 +1,174 @@
+"""
+build manifest for incremental builds
+maps each output file to fingerprints of the inputs it was built from
+"""
+
+import dataclasses
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from core.utils.cache import get_cache_dir
+
+MANIFEST_VERSION = 1
+
+
+def fingerprint(value: Any) -> str:
+    """fingerprint bytes, dataclasses or JSON-compatible values"""
+    if isinstance(value, bytes):
+        data = value
+    else:
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            value = dataclasses.asdict(value)
+        data = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def config_fingerprint(config: Dict[str, Any]) -> str:
+    """fingerprint config values that can affect build output"""
+    config = {k: v for k, v in config.items() if k not in ("dev", "cache")}
+    config["build"] = {
+        k: v
+        for k, v in config.get("build", {}).items()
+        if k not in ("workers", "incremental")
+    }
+    return fingerprint(config)
+
+
+class BuildManifest:
+    """tracks output inputs between builds so unchanged outputs can be skipped"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.output_dir = Path(config["build"]["output_dir"])
+        self.path = self.manifest_path(config)
+        self.previous = self._load()
+        self.outputs: Dict[str, Dict[str, str]] = {}
+        self.stages: Dict[str, Dict[str, str]] = {}
+        self.written: List[str] = []
+        # id -> (item, fingerprint) of posts and pages seen during this build
+        self._sources: Dict[int, Tuple[Any, str]] = {}
+        # the same for the build before reset(), reused for unchanged items
+        self._previous_sources: Dict[int, Tuple[Any, str]] = {}
+
+    @staticmethod
+    def manifest_path(config: Dict[str, Any]) -> Path:
+        """where the manifest of the last incremental build is saved"""
+        return get_cache_dir(config) / "build-manifest.json"
+
+    @staticmethod
+    def discard(config: Dict[str, Any]):
+        """delete the saved manifest before a build that does not record one
+
+        its entries would otherwise describe outputs that build overwrites
+        """
+        BuildManifest.manifest_path(config).unlink(missing_ok=True)
+
+    def _load(self) -> Dict[str, Any]:
+        """load previous manifest, ignoring it if it belongs to another output dir"""
+        empty = {"outputs": {}, "stages": {}}
+        if not self.path.exists():
+            return empty
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return empty
+
+        if (
+            data.get("version") != MANIFEST_VERSION
+            or data.get("output_dir") != self.output_dir.as_posix()
+        ):
+            return empty
+
+        return data
+
+    def relative(self, output_file: Path) -> str:
+        """get output path relative to the output directory"""
+        return Path(output_file).relative_to(self.output_dir).as_posix()
+
+    def is_fresh(self, output_file: Path, inputs: Dict[str, str]) -> bool:
+        """check whether an output exists and was built from the same inputs"""
+        rel = self.relative(output_file)
+        self.outputs[rel] = inputs
+        previous = self.previous["outputs"].get(rel)
+        return previous == inputs and Path(output_file).exists()
+
+    def record(self, output_file: Path, inputs: Dict[str, str]):
+        """record an output written during this build"""
+        rel = self.relative(output_file)
+        self.outputs[rel] = inputs
+        self.written.append(rel)
+
+    def source_fingerprint(self, item: Any) -> str:
+        """fingerprint of a loaded post or page, computed once per build
+
+        a page's inputs list the same posts many times over (indexes, categories,
+        feeds); the memo is dropped by reset() so items edited in place are
+        never stale, unless reset is told the items were replaced instead
+        """
+        entry = self._sources.get(id(item))
+        if entry is None or entry[0] is not item:
+            entry = self._previous_sources.get(id(item))
+            if entry is None or entry[0] is not item:
+                entry = (item, fingerprint(item))
+            self._sources[id(item)] = entry
+        return entry[1]
+
+    def stage_is_fresh(self, stage: str, inputs: Dict[str, str], marker: Path) -> bool:
+        """check whether a whole build stage can be skipped"""
+        self.stages[stage] = inputs
+        previous = self.previous["stages"].get(stage)
+        return previous == inputs and Path(marker).exists()
+
+    def reset(self, keep_sources: bool = False):
+        """start another build on top of this one without reloading from disk
+
+        stages that the next build does not run keep their recorded inputs;
+        keep_sources reuses the fingerprints of items that are still loaded,
+        for callers that replace edited items rather than change them
+        """
+        self.previous = {"outputs": self.outputs, "stages": self.stages}
+        self.outputs = {}
+        self.stages = dict(self.stages)
+        self.written = []
+        # entries of items the last build no longer used are dropped
+        self._previous_sources = self._sources if keep_sources else {}
+        self._sources = {}
+
+    def remove_stale_outputs(self) -> List[str]:
+        """delete outputs from the previous build that were not produced this time"""
+        removed = []
+        for rel in self.previous["outputs"]:
+            if rel in self.outputs:
+                continue
+
+            output_file = self.output_dir / rel
+            if output_file.exists():
+                output_file.unlink()
+                removed.append(rel)
+
+                # remove directories left empty by the deleted page
+                parent = output_file.parent
+                while parent != self.output_dir and not any(parent.iterdir()):
+                    parent.rmdir()
+                    parent = parent.parent
+
+        if removed:
+            print(f"Removed {len(removed)} stale output(s)")
+        return removed
+
+    def save(self):
+        """save manifest for the next build"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "output_dir": self.output_dir.as_posix(),
+            "outputs": self.outputs,
+            "stages": self.stages,
+        }
+        # one-shot dumps uses the C encoder, much faster for large sites
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, sort_keys=True))
@@ -15,7 +15,7 @@ class RobotsGenerator:
     def generate(self):
         """generate robots.txt file"""
         base_url = self.config["site"]["url"].rstrip("/")
-        sitemap_url = f"{base_url}/sitemap.xml"
+        sitemap_url = f"{base_url}/sitemap_index.xml"
 
         robots_content = f"""Sitemap: {sitemap_url}
 
@@ -3,48 +3,43 @@ RSS feed generation
 """
 
 from pathlib import Path
-from typing import Any, Dict, List
-
-from feedgen.feed import FeedGenerator
+from typing import Any, Callable, Dict, List, Optional
 
 from .content import Post
+from .feeds import FEED_FORMATS, FeedWriter
 
 
 class RSSGenerator:
-    """Handles RSS feed generation"""
+    """Handles RSS, Atom and JSON Feed generation"""
 
     def __init__(self, config: Dict[str, Any]):
         self.config = config
 
-    def generate(self, posts: List[Post]):
-        """Generate RSS feed from posts"""
+    def generate(
+        self, posts: List[Post], source_fingerprint: Optional[Callable] = None
+    ):
+        """Generate the site-wide, category and tag feeds from posts
+
+        source_fingerprint replaces fingerprint() for the posts on archive pages
+        """
         if not self.config.get("rss", {}).get("enabled", True):
             return
 
-        fg = FeedGenerator()
-        fg.title(self.config["rss"].get("title", self.config["site"]["title"]))
-        fg.link(href=self.config["site"]["url"], rel="alternate")
-        rss_config = self.config["rss"]
-        site_config = self.config["site"]
-        description = rss_config.get("description", site_config["description"])
-        fg.description(description)
-        fg.language(site_config.get("language", "en"))
-        fg.author(name=site_config["author"], email=site_config.get("email"))
-
-        # Add posts to feed
-        max_items = self.config["rss"].get("max_items", 20)
-        for post in posts[:max_items]:
-            fe = fg.add_entry()
-            fe.title(post.title)
-            fe.link(href=f"{self.config['site']['url']}{post.url}")
-            fe.description(post.excerpt or post.content[:500])
-            fe.author(name=post.author or self.config["site"]["author"])
-            fe.pubDate(post.date)
-            fe.guid(f"{self.config['site']['url']}{post.url}")
-
-        # Save RSS feed
-        output_file = Path(self.config["build"]["output_dir"]) / "rss.xml"
-        with open(output_file, "wb") as f:
-            f.write(fg.rss_str(pretty=True))
-
-        print("Generated RSS feed")
+        output_dir = Path(self.config["build"]["output_dir"])
+
+        writer = FeedWriter(self.config, source_fingerprint)
+        channels = writer.channels(posts)
+        writer.write_channels(posts, channels, output_dir)
+
+        tags = sum(1 for channel in channels if channel.path.startswith("tags/"))
+        categories = len(channels) - 1 - tags
+        print(
+            f"Generated feeds: {', '.join(FEED_FORMATS[f] for f in writer.formats)} "
+            f"({categories} category and {tags} tag feed(s))"
+        )
+        if writer.archive:
+            print(
+                f"Feed archives: {writer.archive_pages} page(s), "
+                f"{writer.archive_skipped} unchanged"
+            )
+            writer.cache.prune()
@@ -1,51 +1,536 @@
 """
 Search index generation
+Builds a tokenized inverted index with precomputed BM25 weights, sharded by
+term prefix so the client only downloads the shards a query needs.
+The eager tier (index.json) holds document metadata and summaries; term and
+body shards are fetched on demand. An optional trigram index over titles and
+headings gives typo-tolerant matches.
+Watch mode rebuilds patch the written index in place, re-weighting only the
+terms of edited documents and rewriting only the shards that hold them.
 """
 
+import bisect
+import html
 import json
+import math
+import re
+import shutil
+from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from .content import Page, Post
 
+SEARCH_INDEX_VERSION = 2
+
+# a title occurrence counts as this many body occurrences
+TITLE_WEIGHT = 3
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# block-level tags separate words; inline tags (a, code, em) do not
+_BLOCK_TAG_RE = re.compile(
+    r"</?(?:p|div|br|hr|h[1-6]|li|ul|ol|dl|dt|dd|pre|blockquote|table|tr|td|th"
+    r"|section|article|header|footer|figure|figcaption)\b[^>]*>",
+    re.IGNORECASE,
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+_HEADING_RE = re.compile(r"<h[1-6]([^>]*)>(.*?)</h[1-6]>", re.IGNORECASE | re.DOTALL)
+_ID_RE = re.compile(r"""\bid=["']([^"']+)["']""")
+
+# letters and digits; main.js uses the equivalent /[\p{L}\p{N}]+/gu
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def strip_tags(markup: str) -> str:
+    """Convert rendered HTML to plain text"""
+    text = _TAG_RE.sub("", _BLOCK_TAG_RE.sub(" ", markup))
+    # split() collapses the same whitespace as \s+ without a match per space
+    return " ".join(html.unescape(text).split())
+
+
+def summarize(markup: str, length: int) -> str:
+    """Plain text of markup shortened to length, cut at a word boundary"""
+    # plain text is never longer than its markup, so convert a growing prefix
+    # until it yields enough text; the slack covers a cut entity or word
+    window = length * 4
+    while True:
+        prefix = markup[:window]
+        if len(prefix) == len(markup):
+            text = strip_tags(markup)
+            break
+        if prefix.rfind("<") > prefix.rfind(">"):
+            prefix = prefix[: prefix.rfind("<")]
+        text = strip_tags(prefix)
+        if len(text) > length + 32:
+            break
+        window *= 2
+
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0]
+    return cut.rstrip(".,;:") + "..."
+
+
+def headings(content: str) -> List[Tuple[str, str]]:
+    """Extract (text, anchor id) pairs for headings in rendered HTML"""
+    found = []
+    for attrs, inner in _HEADING_RE.findall(content):
+        text = strip_tags(inner)
+        if text:
+            anchor = _ID_RE.search(attrs)
+            found.append((text, anchor.group(1) if anchor else ""))
+    return found
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms (shared by index build and query)"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each term, padded with two leading and one trailing space"""
+    grams = set()
+    for term in tokenize(text):
+        padded = f"  {term} "
+        grams.update(a + b + c for a, b, c in zip(padded, padded[1:], padded[2:]))
+    return grams
+
+
+def delta_encode(ids: List[int]) -> List[int]:
+    """Encode ascending ids as differences from the previous id"""
+    previous = 0
+    deltas = []
+    for entry_id in ids:
+        deltas.append(entry_id - previous)
+        previous = entry_id
+    return deltas
+
+
+def shard_name(term: str, prefix_length: int) -> str:
+    """Name of the shard holding a term; non-ASCII prefixes are hex encoded"""
+    prefix = term[:prefix_length]
+    if prefix.isascii() and prefix.isalnum():
+        return prefix
+    return "_" + prefix.encode("utf-8").hex()
+
+
+@dataclass
+class SearchDocument:
+    """Analysis of one post or page, reused while the item is unchanged"""
+
+    item: Any
+    text: str
+    summary: str
+    terms: Counter
+    # (text, anchor) of the title and headings, and their trigrams
+    entries: List[Tuple[str, str]] = field(default_factory=list)
+    grams: List[Set[str]] = field(default_factory=list)
+
+    @property
+    def length(self) -> int:
+        """Weighted number of terms"""
+        return sum(self.terms.values())
+
 
 class SearchIndexer:
     """Handles search index generation"""
 
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        search_config = config.get("search", {})
+        self.shard_prefix = search_config.get("shard_prefix", 2)
+        self.summary_length = search_config.get("summary_length", 160)
+        self.body_shard_size = search_config.get("body_shard_size", 50)
+        self.trigrams = search_config.get("trigrams", False)
+        # id -> analysis of the items of the previous generate or update call
+        self._documents: Dict[int, SearchDocument] = {}
+        # the index written by the previous call, in doc id order, for update()
+        self._written: Optional[List[SearchDocument]] = None
+        self._shards: Dict[str, Dict[str, List[float]]] = {}
+        self._lengths: List[int] = []
+        self._avg_length = 0.0
+        self._trigram_index: Dict[str, Any] = {}
+        # trigram -> ascending entry ids, and the first entry of each document
+        self._gram_ids: Dict[str, List[int]] = {}
+        self._entry_offsets: List[int] = []
 
     def generate(self, posts: List[Post], pages: List[Page]):
-        """Generate search index JSON"""
-        search_data = []
+        """Generate the sharded search index under output/search"""
+        documents = self._analyze([*posts, *pages])
+        lengths = [doc.length for doc in documents]
 
-        # Add posts to search index
-        for post in posts:
-            search_data.append(
-                {
-                    "title": post.title,
-                    "url": post.url,
-                    "content": post.content,
-                    "date": post.date.strftime("%Y-%m-%d"),
-                    "type": "post",
-                }
+        index = self.build_index([doc.terms for doc in documents])
+        shards: Dict[str, Dict[str, List[float]]] = {}
+        for term in sorted(index):
+            name = shard_name(term, self.shard_prefix)
+            shards.setdefault(name, {})[term] = index[term]
+
+        # rewrite the whole index so shards for removed terms do not linger
+        search_dir = self._search_dir()
+        if search_dir.exists():
+            shutil.rmtree(search_dir)
+        (search_dir / "terms").mkdir(parents=True)
+        (search_dir / "bodies").mkdir()
+
+        terms_size = 0
+        for name, terms in shards.items():
+            terms_size += self._write_json(search_dir / "terms" / f"{name}.json", terms)
+
+        # plain-text bodies in fixed-size chunks, loaded for result snippets
+        body_shards = range(0, len(documents), self.body_shard_size)
+        bodies_size = 0
+        for shard in range(len(body_shards)):
+            bodies_size += self._write_body_shard(search_dir, documents, shard)
+
+        trigram_size = 0
+        if self.trigrams:
+            self._set_trigrams(documents)
+            trigram_size = self._write_json(
+                search_dir / "trigrams.json", self._trigram_index
             )
 
-        # Add pages to search index
-        for page in pages:
-            search_data.append(
+        self._written = documents
+        self._shards = shards
+        self._lengths = lengths
+        self._avg_length = sum(lengths) / len(lengths) if lengths else 0
+        manifest_size = self._write_manifest(search_dir, documents)
+
+        print(f"Generated search index: {len(index)} terms in {len(shards)} shard(s)")
+        print(
+            f"Search payload: manifest {manifest_size / 1024:.1f} KB, "
+            f"terms {terms_size / 1024:.1f} KB in {len(shards)} shard(s), "
+            f"bodies {bodies_size / 1024:.1f} KB in {len(body_shards)} shard(s)"
+            + (f", trigrams {trigram_size / 1024:.1f} KB" if self.trigrams else "")
+        )
+
+    def update(self, posts: List[Post], pages: List[Page]):
+        """Patch the index written by the previous call for edited posts and pages
+
+        Only the terms of edited documents are re-weighted, and only the term
+        and body shards holding them are rewritten. The average document length
+        stays that of the last generate call, so weights can drift slightly
+        from a full build. Falls back to generate when documents were added,
+        removed or reordered.
+        """
+        items = [*posts, *pages]
+        previous = self._written
+        search_dir = self._search_dir()
+        if (
+            previous is None
+            or [doc.item.file_path for doc in previous]
+            != [item.file_path for item in items]
+            or not (search_dir / "index.json").exists()
+        ):
+            self.generate(posts, pages)
+            return
+
+        documents = self._analyze(items)
+        changed = [
+            doc_id
+            for doc_id, (old, new) in enumerate(zip(previous, documents))
+            if old is not new
+        ]
+        if not changed:
+            return
+
+        # postings of these terms change with the edited documents' lengths
+        affected: Set[str] = set()
+        for doc_id in changed:
+            affected.update(previous[doc_id].terms)
+            affected.update(documents[doc_id].terms)
+            self._lengths[doc_id] = documents[doc_id].length
+
+        touched = set()
+        for term in affected:
+            name = shard_name(term, self.shard_prefix)
+            shard = self._shards.get(name, {})
+            flat = self._reweigh(term, shard.get(term, []), documents, changed)
+            # weights are rounded, small edits often leave them as they were
+            if flat == shard.get(term, []):
+                continue
+            if flat:
+                self._shards.setdefault(name, shard)[term] = flat
+            else:
+                del shard[term]
+            touched.add(name)
+
+        for name in sorted(touched):
+            path = search_dir / "terms" / f"{name}.json"
+            if self._shards[name]:
+                self._shards[name] = dict(sorted(self._shards[name].items()))
+                self._write_json(path, self._shards[name])
+            else:
+                del self._shards[name]
+                path.unlink(missing_ok=True)
+
+        for shard in sorted({doc_id // self.body_shard_size for doc_id in changed}):
+            self._write_body_shard(search_dir, documents, shard)
+
+        if self.trigrams and self._update_trigrams(previous, documents, changed):
+            self._write_json(search_dir / "trigrams.json", self._trigram_index)
+
+        self._written = documents
+        self._write_manifest(search_dir, documents)
+        print(
+            f"Updated search index: {len(changed)} document(s), "
+            f"{len(touched)} of {len(self._shards)} term shard(s) rewritten"
+        )
+
+    def _reweigh(
+        self,
+        term: str,
+        flat: List[float],
+        documents: List[SearchDocument],
+        changed: List[int],
+    ) -> List[float]:
+        """Postings of a term after the changed documents were edited"""
+        tfs = {doc_id: documents[doc_id].terms.get(term, 0) for doc_id in changed}
+        docs = flat[0::3]
+        positions = {doc_id: bisect.bisect_left(docs, doc_id) for doc_id in changed}
+        listed = {
+            doc_id: position < len(docs) and docs[position] == doc_id
+            for doc_id, position in positions.items()
+        }
+
+        doc_count = len(documents)
+        avg_length = self._avg_length or 1
+        if all(listed[doc_id] == bool(tf) for doc_id, tf in tfs.items()):
+            # same df, so only the postings of the changed documents move
+            flat = list(flat)
+            for doc_id, tf in tfs.items():
+                if tf:
+                    start = positions[doc_id] * 3
+                    end = start + 3
+                    flat[start:end] = self._weigh(
+                        [(doc_id, tf)], doc_count, self._lengths, avg_length, len(docs)
+                    )
+            return flat
+
+        entries = [
+            (doc_id, tf) for doc_id, tf in zip(docs, flat[1::3]) if doc_id not in tfs
+        ]
+        entries.extend((doc_id, tf) for doc_id, tf in tfs.items() if tf)
+        entries.sort()
+        return self._weigh(entries, doc_count, self._lengths, avg_length)
+
+    def _analyze(self, items: List[Any]) -> List[SearchDocument]:
+        """Analyze items in doc id order, reusing the analysis of unchanged items"""
+        documents = {}
+        analyzed = []
+        for item in items:
+            # watch mode rebuilds reuse the analysis of unchanged items
+            doc = self._documents.get(id(item))
+            if doc is None or doc.item is not item:
+                text = strip_tags(item.content)
+                doc = SearchDocument(
+                    item,
+                    text,
+                    self._summary(item.description or text),
+                    self._document_terms(item.title, text),
+                )
+                if self.trigrams:
+                    doc.entries = [(item.title, ""), *headings(item.content)]
+                    doc.grams = [trigrams(text) for text, _ in doc.entries]
+            documents[id(item)] = doc
+            analyzed.append(doc)
+        self._documents = documents
+        return analyzed
+
+    def _summary(self, text: str) -> str:
+        """Shorten plain text to summary_length, cutting at a word boundary"""
+        return summarize(text, self.summary_length)
+
+    def _document_terms(self, title: str, text: str) -> Counter:
+        """Weighted term frequencies for a document's title and plain-text body"""
+        terms = Counter(tokenize(text))
+        for term in tokenize(title):
+            terms[term] += TITLE_WEIGHT
+        return terms
+
+    def build_index(self, doc_terms: List[Counter]) -> Dict[str, List[float]]:
+        """Build postings as flat [doc, tf, weight, ...] triples per term"""
+        doc_count = len(doc_terms)
+        lengths = [sum(terms.values()) for terms in doc_terms]
+        avg_length = (sum(lengths) / doc_count if doc_count else 0) or 1
+
+        postings: Dict[str, List[tuple]] = {}
+        for doc_id, terms in enumerate(doc_terms):
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        return {
+            term: self._weigh(entries, doc_count, lengths, avg_length)
+            for term, entries in postings.items()
+        }
+
+    def _weigh(
+        self,
+        entries: List[tuple],
+        doc_count: int,
+        lengths: List[int],
+        avg_length: float,
+        df: Optional[int] = None,
+    ) -> List[float]:
+        """Flat BM25 postings of one term from its (doc, tf) pairs
+
+        df defaults to the number of pairs, when they are all of the term's postings
+        """
+        if df is None:
+            df = len(entries)
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+        flat = []
+        for doc_id, tf in entries:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / avg_length)
+            weight = idf * tf * (BM25_K1 + 1) / (tf + norm)
+            flat.extend([doc_id, tf, round(weight, 4)])
+        return flat
+
+    def build_trigram_index(
+        self, entries: List[Tuple[int, str, str]]
+    ) -> Dict[str, Any]:
+        """Build a trigram index over (doc, text, anchor) title and heading entries
+
+        postings list entry ids in ascending order, delta encoded
+        """
+        entry_grams = [trigrams(text) for _, text, _ in entries]
+        return self._trigram_payload(entries, entry_grams, _gram_ids(entry_grams))
+
+    def _trigram_payload(
+        self,
+        entries: List[Tuple[int, str, str]],
+        entry_grams: List[Set[str]],
+        gram_ids: Dict[str, List[int]],
+    ) -> Dict[str, Any]:
+        """The trigrams.json document"""
+        return {
+            "entries": [list(entry) for entry in entries],
+            "sizes": [len(grams) for grams in entry_grams],
+            "grams": {gram: delta_encode(gram_ids[gram]) for gram in sorted(gram_ids)},
+        }
+
+    def _set_trigrams(self, documents: List[SearchDocument]):
+        """Build the trigram index from the trigrams cached on each document"""
+        entries = []
+        entry_grams = []
+        self._entry_offsets = []
+        for doc_id, doc in enumerate(documents):
+            self._entry_offsets.append(len(entries))
+            entries.extend((doc_id, text, anchor) for text, anchor in doc.entries)
+            entry_grams.extend(doc.grams)
+        self._gram_ids = _gram_ids(entry_grams)
+        self._trigram_index = self._trigram_payload(
+            entries, entry_grams, self._gram_ids
+        )
+
+    def _update_trigrams(
+        self,
+        previous: List[SearchDocument],
+        documents: List[SearchDocument],
+        changed: List[int],
+    ) -> bool:
+        """Move the entries of changed documents to their new trigrams
+
+        Returns False when no title or heading changed.
+        """
+        changed = [
+            doc_id
+            for doc_id in changed
+            if previous[doc_id].entries != documents[doc_id].entries
+        ]
+        if not changed:
+            return False
+        if any(
+            len(previous[doc_id].entries) != len(documents[doc_id].entries)
+            for doc_id in changed
+        ):
+            # entry ids of every later document shift
+            self._set_trigrams(documents)
+            return True
+
+        entries = self._trigram_index["entries"]
+        sizes = self._trigram_index["sizes"]
+        touched: Set[str] = set()
+        for doc_id in changed:
+            start = self._entry_offsets[doc_id]
+            old_grams = previous[doc_id].grams
+            doc = documents[doc_id]
+            for k, ((text, anchor), grams) in enumerate(zip(doc.entries, doc.grams)):
+                entry_id = start + k
+                entries[entry_id] = [doc_id, text, anchor]
+                sizes[entry_id] = len(grams)
+                for gram in old_grams[k] - grams:
+                    self._gram_ids[gram].remove(entry_id)
+                for gram in grams - old_grams[k]:
+                    bisect.insort(self._gram_ids.setdefault(gram, []), entry_id)
+                touched |= old_grams[k] ^ grams
+
+        encoded = self._trigram_index["grams"]
+        for gram in touched:
+            if self._gram_ids.get(gram):
+                encoded[gram] = delta_encode(self._gram_ids[gram])
+            else:
+                self._gram_ids.pop(gram, None)
+                encoded.pop(gram, None)
+        self._trigram_index["grams"] = dict(sorted(encoded.items()))
+        return True
+
+    def _search_dir(self) -> Path:
+        """Output directory of the index"""
+        return Path(self.config["build"]["output_dir"]) / "search"
+
+    def _write_body_shard(
+        self, search_dir: Path, documents: List[SearchDocument], shard: int
+    ) -> int:
+        """Write the plain-text bodies of one body shard"""
+        start = shard * self.body_shard_size
+        end = start + self.body_shard_size
+        chunk = [doc.text for doc in documents[start:end]]
+        return self._write_json(search_dir / "bodies" / f"{shard}.json", chunk)
+
+    def _write_manifest(self, search_dir: Path, documents: List[SearchDocument]) -> int:
+        """Write index.json with the metadata of every document"""
+        docs = []
+        for doc in documents:
+            is_post = isinstance(doc.item, Post)
+            docs.append(
                 {
-                    "title": page.title,
-                    "url": page.url,
-                    "content": page.content,
-                    "date": "",
-                    "type": "page",
+                    "title": doc.item.title,
+                    "url": doc.item.url,
+                    "date": doc.item.date.strftime("%Y-%m-%d") if is_post else "",
+                    "type": "post" if is_post else "page",
+                    "summary": doc.summary,
                 }
             )
 
-        # Save search index
-        output_file = Path(self.config["build"]["output_dir"]) / "search.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(search_data, f, ensure_ascii=False, indent=2)
+        return self._write_json(
+            search_dir / "index.json",
+            {
+                "version": SEARCH_INDEX_VERSION,
+                "shard_prefix": self.shard_prefix,
+                "shards": sorted(self._shards),
+                "body_shard_size": self.body_shard_size,
+                "trigrams": self.trigrams,
+                "doc_count": len(docs),
+                "avg_length": round(self._avg_length, 2),
+                "docs": docs,
+            },
+        )
+
+    def _write_json(self, path: Path, data: Any) -> int:
+        """Write compact JSON and return its size in bytes"""
+        encoded = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        return path.write_bytes(encoded.encode("utf-8"))
+
 
-        print("Generated search index")
+def _gram_ids(entry_grams: List[Set[str]]) -> Dict[str, List[int]]:
+    """Ascending entry ids of every trigram"""
+    gram_ids: Dict[str, List[int]] = {}
+    for entry_id, grams in enumerate(entry_grams):
+        for gram in grams:
+            gram_ids.setdefault(gram, []).append(entry_id)
+    return gram_ids
@@ -0,0 +1,168 @@
+"""
+Offline query engine for the search index written by SearchIndexer
+Ranks documents the same way main.js does so relevance can be tuned and
+benchmarked without a browser
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .search import shard_name, tokenize, trigrams
+
+# minimum share of query trigrams an entry must contain (same value in main.js)
+FUZZY_THRESHOLD = 0.5
+
+
+@dataclass
+class SearchResult:
+    """A ranked search hit"""
+
+    doc: int
+    score: float
+    title: str
+    url: str
+    type: str
+    date: str = ""
+
+
+class SearchIndex:
+    """Loads the sharded search index from disk and answers ranked queries"""
+
+    def __init__(self, search_dir: Path):
+        self.search_dir = Path(search_dir)
+        with open(self.search_dir / "index.json", "r", encoding="utf-8") as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+
+        self.docs: List[Dict[str, Any]] = self.manifest["docs"]
+        self.shard_prefix: int = self.manifest["shard_prefix"]
+        self.shard_names = set(self.manifest["shards"])
+        self.shards: Dict[str, Dict[str, List[float]]] = {}
+        self.trigram_index: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SearchIndex":
+        """Open the index in the configured output directory"""
+        return cls(Path(config["build"]["output_dir"]) / "search")
+
+    def load_shard(self, name: str) -> Dict[str, List[float]]:
+        """Load a term shard once; unknown shards are empty"""
+        if name not in self.shards:
+            shard = {}
+            if name in self.shard_names:
+                with open(
+                    self.search_dir / "terms" / f"{name}.json", "r", encoding="utf-8"
+                ) as f:
+                    shard = json.load(f)
+            self.shards[name] = shard
+        return self.shards[name]
+
+    def load_all(self):
+        """Load every term shard (for benchmarks and memory measurement)"""
+        for name in sorted(self.shard_names):
+            self.load_shard(name)
+
+    def load_trigrams(self) -> Optional[Dict[str, Any]]:
+        """Load the trigram index once, if the build emitted one"""
+        if self.trigram_index is None and self.manifest.get("trigrams"):
+            with open(self.search_dir / "trigrams.json", "r", encoding="utf-8") as f:
+                self.trigram_index = json.load(f)
+        return self.trigram_index
+
+    @property
+    def term_count(self) -> int:
+        """Number of terms in the loaded shards"""
+        return sum(len(shard) for shard in self.shards.values())
+
+    def search(
+        self, query: str, limit: Optional[int] = 8, fuzzy: bool = True
+    ) -> List[SearchResult]:
+        """Rank documents by BM25, then fill remaining slots with fuzzy title matches"""
+        results = self.ranked_search(query, limit)
+        if fuzzy and (limit is None or len(results) < limit):
+            found = {result.doc for result in results}
+            for result in self.fuzzy_search(query, None):
+                if result.doc not in found:
+                    results.append(result)
+            if limit is not None:
+                results = results[:limit]
+        return results
+
+    def ranked_search(self, query: str, limit: Optional[int] = 8) -> List[SearchResult]:
+        """Rank documents by summed BM25 weights; the last term also matches as a prefix"""
+        terms = tokenize(query)
+        scores: Dict[int, float] = {}
+
+        for i, term in enumerate(terms):
+            shard = self.load_shard(shard_name(term, self.shard_prefix))
+            as_prefix = i == len(terms) - 1 and len(term) >= self.shard_prefix
+            if as_prefix:
+                matched = [t for t in shard if t.startswith(term)]
+            else:
+                matched = [term] if term in shard else []
+
+            # postings are flat [doc, tf, weight] triples; keep the best expansion
+            best: Dict[int, float] = {}
+            for match in matched:
+                postings = shard[match]
+                for j in range(0, len(postings), 3):
+                    doc = postings[j]
+                    best[doc] = max(best.get(doc, 0), postings[j + 2])
+
+            for doc, weight in best.items():
+                scores[doc] = scores.get(doc, 0) + weight
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+
+        return [self._result(doc, score) for doc, score in ranked]
+
+    def fuzzy_search(self, query: str, limit: Optional[int] = 8) -> List[SearchResult]:
+        """Rank title and heading entries by the share of query trigrams they contain"""
+        index = self.load_trigrams()
+        grams = trigrams(query)
+        if not index or not grams:
+            return []
+
+        # postings are delta-encoded entry ids
+        overlap: Dict[int, int] = {}
+        for gram in grams:
+            entry = 0
+            for delta in index["grams"].get(gram, []):
+                entry += delta
+                overlap[entry] = overlap.get(entry, 0) + 1
+
+        # best entry per document: most shared trigrams, then the shortest entry
+        best: Dict[int, tuple] = {}
+        for entry, shared in overlap.items():
+            similarity = shared / len(grams)
+            if similarity < FUZZY_THRESHOLD:
+                continue
+            doc = index["entries"][entry][0]
+            key = (-similarity, index["sizes"][entry], entry)
+            if doc not in best or key < best[doc]:
+                best[doc] = key
+
+        ranked = sorted(best.items(), key=lambda item: item[1])
+        if limit is not None:
+            ranked = ranked[:limit]
+
+        results = []
+        for doc, (negated_similarity, _, entry) in ranked:
+            anchor = index["entries"][entry][2]
+            results.append(self._result(doc, -negated_similarity, anchor))
+        return results
+
+    def _result(self, doc: int, score: float, anchor: str = "") -> SearchResult:
+        """Build a result for a document id"""
+        url = self.docs[doc]["url"]
+        return SearchResult(
+            doc=doc,
+            score=round(score, 4),
+            title=self.docs[doc]["title"],
+            url=f"{url}#{anchor}" if anchor else url,
+            type=self.docs[doc]["type"],
+            date=self.docs[doc].get("date", ""),
+        )
@@ -1,107 +1,260 @@
 """
 sitemap generation for SEO
+urls are streamed into sitemap-N.xml files (optionally gzipped) that stay
+within the protocol limits of 50,000 urls and 50 MB, listed in sitemap_index.xml
+lastmod is the day the rendered content of a url last changed, tracked in a
+fingerprint history kept in the build cache
 """
 
-from datetime import datetime
+import gzip
+import hashlib
+import io
+import json
+import re
+from datetime import date, datetime
 from pathlib import Path
-from typing import Any, Dict, List
-from xml.etree.ElementTree import Element, ElementTree, SubElement
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from core.utils.cache import get_cache_dir
 
 from .content import Page, Post
+from .feeds import xml_text
+
+# per-file limits of the sitemap protocol (uncompressed size)
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+_URLSET_HEADER = (
+    f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+)
+_URLSET_FOOTER = "</urlset>\n"
+_SITEMAP_FILE_RE = re.compile(r"sitemap-(\d+)\.xml(?:\.gz)?")
+_MAIN_RE = re.compile(rb"<main[\s>].*</main>", re.DOTALL)
+
+SITEMAP_HISTORY_VERSION = 1
+
+# (loc, lastmod, changefreq, priority)
+SitemapUrl = Tuple[str, date, str, str]
+
+
+def content_fingerprint(html: bytes) -> str:
+    """fingerprint the <main> element of a rendered page, or the whole page
+
+    header, footer and asset urls are left out so a stylesheet change does not
+    mark every url as modified
+    """
+    match = _MAIN_RE.search(html)
+    return hashlib.sha256(match.group(0) if match else html).hexdigest()[:16]
+
+
+class SitemapHistory:
+    """per-url content fingerprints and the day each url last changed"""
+
+    def __init__(self, config: Dict[str, Any], today: Optional[date] = None):
+        self.enabled = config.get("cache", {}).get("enabled", False)
+        self.path = get_cache_dir(config) / "sitemap-history.json"
+        self.today = today or date.today()
+        self.previous = self._load()
+        self.urls: Dict[str, Dict[str, Any]] = {}
+        self.changed = 0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """load the previous history, ignoring it if missing or outdated"""
+        if not self.enabled or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != SITEMAP_HISTORY_VERSION:
+            return {}
+        return data.get("urls", {})
+
+    def lastmod(self, url: str, output_file: Path, first_seen: date) -> date:
+        """day the rendered content of url last changed"""
+        previous = self.previous.get(url)
+        try:
+            stat = output_file.stat()
+        except OSError:
+            # not rendered this build; keep what we knew
+            return date.fromisoformat(previous["lastmod"]) if previous else first_seen
+
+        # size and mtime unchanged means the file was not rewritten
+        signature = [stat.st_size, stat.st_mtime_ns]
+        if previous and previous["stat"] == signature:
+            digest = previous["hash"]
+        else:
+            digest = content_fingerprint(output_file.read_bytes())
+
+        if previous is None:
+            lastmod = min(first_seen, self.today).isoformat()
+        elif previous["hash"] != digest:
+            lastmod = self.today.isoformat()
+            self.changed += 1
+        else:
+            lastmod = previous["lastmod"]
+
+        self.urls[url] = {"hash": digest, "stat": signature, "lastmod": lastmod}
+        return date.fromisoformat(lastmod)
+
+    def save(self):
+        """save the history of urls seen in this build"""
+        if not self.enabled:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": SITEMAP_HISTORY_VERSION, "urls": self.urls}
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, sort_keys=True))
 
 
 class SitemapGenerator:
-    """handles sitemap.xml generation for SEO"""
+    """handles sitemap generation for SEO"""
 
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.base_url = config["site"]["url"].rstrip("/")
+        sitemap_config = config.get("sitemap", {})
+        self.max_urls = min(sitemap_config.get("max_urls", MAX_URLS), MAX_URLS)
+        self.max_bytes = min(sitemap_config.get("max_bytes", MAX_BYTES), MAX_BYTES)
+        self.gzip = sitemap_config.get("gzip", False)
 
     def generate(self, posts: List[Post], pages: List[Page]):
-        """generate sitemap.xml from posts and pages"""
-        urlset = Element("urlset")
-        urlset.set("xmlns", "http://www.sitemaps.org/schemas/sitemap/0.9")
-
-        # add homepage
-        self._add_url(
-            urlset,
-            url=self.base_url + "/",
-            lastmod=datetime.now(),
-            changefreq="daily",
-            priority="1.0",
+        """generate sitemap files and sitemap_index.xml from posts and pages"""
+        output_dir = Path(self.config["build"]["output_dir"])
+        history = SitemapHistory(self.config)
+        sitemaps = self.write(self._urls(posts, pages, history), output_dir)
+        self._write_index(sitemaps, output_dir)
+        self._remove_stale(len(sitemaps), output_dir)
+        history.save()
+
+        count = sum(urls for _, _, urls in sitemaps)
+        print(
+            f"Generated sitemap_index.xml: {count} url(s) in {len(sitemaps)} sitemap(s), "
+            f"{history.changed} changed"
         )
 
-        # add posts
+    def _urls(
+        self, posts: List[Post], pages: List[Page], history: SitemapHistory
+    ) -> Iterator[SitemapUrl]:
+        """yield sitemap entries for the homepage, posts and pages"""
+        output_dir = Path(self.config["build"]["output_dir"])
+
+        def lastmod(url: str, first_seen: date) -> date:
+            output_file = output_dir / url.strip("/") / "index.html"
+            return history.lastmod(url, output_file, first_seen)
+
+        # urls seen for the first time date from their content
+        newest = max((post.date.date() for post in posts), default=history.today)
+        yield self.base_url + "/", lastmod("/", newest), "daily", "1.0"
+
         for post in posts:
             if post.published:
-                self._add_url(
-                    urlset,
-                    url=self.base_url + post.url,
-                    lastmod=post.date,
-                    changefreq="weekly",
-                    priority="0.8",
-                )
+                modified = lastmod(post.url, post.date.date())
+                yield self.base_url + post.url, modified, "weekly", "0.8"
 
-        # add pages
         for page in pages:
-            self._add_url(
-                urlset,
-                url=self.base_url + page.url,
-                lastmod=datetime.now(),
-                changefreq="monthly",
-                priority="0.7",
+            modified = lastmod(
+                page.url, self._source_date(page.file_path, history.today)
             )
+            yield self.base_url + page.url, modified, "monthly", "0.7"
 
-        # save sitemap
-        self._save_sitemap(urlset)
-        print("Generated sitemap.xml")
-
-    def _add_url(
-        self,
-        urlset: Element,
-        url: str,
-        lastmod: datetime,
-        changefreq: str,
-        priority: str,
-    ):
-        """add URL entry to sitemap"""
-        url_elem = SubElement(urlset, "url")
-
-        loc = SubElement(url_elem, "loc")
-        loc.text = url
-
-        lastmod_elem = SubElement(url_elem, "lastmod")
-        lastmod_elem.text = lastmod.strftime("%Y-%m-%d")
-
-        changefreq_elem = SubElement(url_elem, "changefreq")
-        changefreq_elem.text = changefreq
-
-        priority_elem = SubElement(url_elem, "priority")
-        priority_elem.text = priority
-
-    def _save_sitemap(self, urlset: Element):
-        """save sitemap to file"""
-        output_file = Path(self.config["build"]["output_dir"]) / "sitemap.xml"
-
-        # format XML with indentation
-        self._indent(urlset)
-
-        # save with pretty formatting
-        tree = ElementTree(urlset)
-        tree.write(output_file, encoding="utf-8", xml_declaration=True, method="xml")
-
-    def _indent(self, elem: Element, level: int = 0):
-        """add indentation to XML for pretty printing"""
-        i = "\n" + level * "  "
-        if len(elem):
-            if not elem.text or not elem.text.strip():
-                elem.text = i + "  "
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-            for child in elem:
-                self._indent(child, level + 1)
-            if not child.tail or not child.tail.strip():
-                child.tail = i
-        else:
-            if level and (not elem.tail or not elem.tail.strip()):
-                elem.tail = i
+    def _source_date(self, file_path: str, default: date) -> date:
+        """modification day of a source file"""
+        try:
+            return datetime.fromtimestamp(Path(file_path).stat().st_mtime).date()
+        except OSError:
+            return default
+
+    def write(
+        self, urls: Iterable[SitemapUrl], output_dir: Path
+    ) -> List[Tuple[str, str, int]]:
+        """stream urls into numbered sitemap files, returns (name, lastmod, count)"""
+        sitemaps = []
+        out = None
+        count = size = 0
+        name = lastmod = ""
+
+        try:
+            for loc, modified, changefreq, priority in urls:
+                day = modified.strftime("%Y-%m-%d")
+                entry = (
+                    "  <url>\n"
+                    f"    <loc>{xml_text(loc)}</loc>\n"
+                    f"    <lastmod>{day}</lastmod>\n"
+                    f"    <changefreq>{changefreq}</changefreq>\n"
+                    f"    <priority>{priority}</priority>\n"
+                    "  </url>\n"
+                )
+                entry_size = len(entry.encode("utf-8"))
+
+                full = (
+                    count == self.max_urls
+                    or size + entry_size + len(_URLSET_FOOTER) > self.max_bytes
+                )
+                if out is None or full:
+                    if out is not None:
+                        out.write(_URLSET_FOOTER)
+                        out.close()
+                        sitemaps.append((name, lastmod, count))
+                    name = self._file_name(len(sitemaps) + 1)
+                    out = self._open(Path(output_dir) / name)
+                    out.write(_URLSET_HEADER)
+                    count, size, lastmod = 0, len(_URLSET_HEADER), ""
+
+                out.write(entry)
+                count += 1
+                size += entry_size
+                lastmod = max(lastmod, day)
+
+            if out is not None:
+                out.write(_URLSET_FOOTER)
+                sitemaps.append((name, lastmod, count))
+        finally:
+            if out is not None:
+                out.close()
+
+        return sitemaps
+
+    def _file_name(self, number: int) -> str:
+        """name of the numbered sitemap file"""
+        return f"sitemap-{number}.xml" + (".gz" if self.gzip else "")
+
+    def _open(self, path: Path) -> TextIO:
+        """open a sitemap file for streaming text writes"""
+        if self.gzip:
+            # fixed mtime keeps the compressed bytes stable across builds
+            return io.TextIOWrapper(
+                gzip.GzipFile(path, "wb", compresslevel=9, mtime=0), encoding="utf-8"
+            )
+        return open(path, "w", encoding="utf-8")
+
+    def _write_index(self, sitemaps: List[Tuple[str, str, int]], output_dir: Path):
+        """write sitemap_index.xml listing every sitemap file"""
+        with open(Path(output_dir) / "sitemap_index.xml", "w", encoding="utf-8") as f:
+            f.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<sitemapindex xmlns="{SITEMAP_NS}">\n'
+            )
+            for name, lastmod, _ in sitemaps:
+                f.write(
+                    "  <sitemap>\n"
+                    f"    <loc>{xml_text(self.base_url)}/{name}</loc>\n"
+                    f"    <lastmod>{lastmod}</lastmod>\n"
+                    "  </sitemap>\n"
+                )
+            f.write("</sitemapindex>\n")
+
+    def _remove_stale(self, count: int, output_dir: Path):
+        """remove sitemap files this build did not write"""
+        output_dir = Path(output_dir)
+        legacy = output_dir / "sitemap.xml"
+        if legacy.exists():
+            legacy.unlink()
+
+        # earlier builds may have had more urls or the other gzip setting
+        current = {self._file_name(number) for number in range(1, count + 1)}
+        for path in output_dir.glob("sitemap-*.xml*"):
+            if _SITEMAP_FILE_RE.fullmatch(path.name) and path.name not in current:
+                path.unlink()
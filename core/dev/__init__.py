@@ -3,5 +3,6 @@ Development utilities
 """
 
 from .server import DevServer
+from .watcher import Watcher
 
-__all__ = ["DevServer"]
+__all__ = ["DevServer", "Watcher"]
@@ -0,0 +1,153 @@
+"""
+Live reload for the development server
+rebuilds are pushed to open pages over Server-Sent Events: changed stylesheets
+are swapped in place and a page reloads only when its own HTML changed
+"""
+
+import hashlib
+import json
+import queue
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+LIVERELOAD_PATH = "/__livereload"
+
+# injected into served HTML; swaps stylesheets by their unhashed name and
+# reloads only when the current page is listed
+CLIENT_SCRIPT = """(function () {
+  var source = new EventSource("%s");
+  function unhashed(url) {
+    return url.split("?")[0].replace(/-[0-9a-f]{8}\\.css$/, ".css");
+  }
+  source.addEventListener("css", function (event) {
+    JSON.parse(event.data).forEach(function (url) {
+      document.querySelectorAll('link[rel="stylesheet"]').forEach(function (link) {
+        var current = new URL(link.href, location.href).pathname;
+        if (unhashed(current) !== unhashed(url)) return;
+        var next = link.cloneNode();
+        next.href = url + (current === url ? "?t=" + Date.now() : "");
+        next.onload = function () { link.remove(); };
+        link.after(next);
+      });
+    });
+  });
+  source.addEventListener("reload", function (event) {
+    var pages = JSON.parse(event.data);
+    var path = location.pathname.replace(/index\\.html$/, "");
+    if (pages.indexOf("*") !== -1 || pages.indexOf(path) !== -1) location.reload();
+  });
+})();""" % LIVERELOAD_PATH
+
+# hashed stylesheet urls; a new hash alone does not change a page
+_CSS_HASH_RE = re.compile(rb"(/_sync/[^\"'\s>]*?)-[0-9a-f]{8}(\.css)")
+
+
+def page_url(path: str) -> str:
+    """url of a page from its output path or request path"""
+    url = "/" + path.lstrip("/")
+    if url.endswith("/index.html"):
+        url = url[: -len("index.html")]
+    return url
+
+
+def page_digest(html: bytes) -> str:
+    """digest of a page, ignoring the hashes of the stylesheets it links"""
+    return hashlib.sha256(_CSS_HASH_RE.sub(rb"\1\2", html)).hexdigest()
+
+
+def inject_client(html: bytes) -> bytes:
+    """add the live reload client before </body>"""
+    script = f"<script>{CLIENT_SCRIPT}</script>".encode("utf-8")
+    index = html.rfind(b"</body>")
+    if index == -1:
+        return html + script
+    return html[:index] + script + html[index:]
+
+
+class LiveReload:
+    """Tracks pages open in browsers and pushes rebuild events to them"""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = Path(output_dir)
+        self._clients: List[queue.Queue] = []
+        self._pages: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        """register an event stream; None on the queue ends it"""
+        events: queue.Queue = queue.Queue()
+        with self._lock:
+            self._clients.append(events)
+        return events
+
+    def unsubscribe(self, events: queue.Queue):
+        """drop a closed event stream"""
+        with self._lock:
+            if events in self._clients:
+                self._clients.remove(events)
+
+    def served(self, url: str, html: bytes):
+        """remember the HTML a browser was given for a page"""
+        with self._lock:
+            self._pages[url] = page_digest(html)
+
+    def notify(self, written: List[str]):
+        """push the outputs written by a rebuild to the open pages"""
+        stylesheets = [f"/{path}" for path in written if path.endswith(".css")]
+        other_assets = [
+            path
+            for path in written
+            if path.startswith("_sync/") and not path.endswith(".css")
+        ]
+
+        if other_assets:
+            # scripts and images can affect any page
+            reload = ["*"]
+        else:
+            reload = [url for url in map(page_url, written) if self._changed(url)]
+
+        if stylesheets:
+            self._send("css", stylesheets)
+        if reload:
+            self._send("reload", reload)
+        if stylesheets or reload:
+            pages = "every page" if reload == ["*"] else f"{len(reload)} page(s)"
+            print(f"Live reload: {pages}, {len(stylesheets)} stylesheet(s) swapped")
+
+    def _changed(self, url: str) -> bool:
+        """check whether an open page now differs from what its browser shows"""
+        if not url.endswith("/") and not url.endswith(".html"):
+            return False
+        with self._lock:
+            previous = self._pages.get(url)
+        if previous is None:
+            # no browser has loaded this page
+            return False
+
+        output_file = self.output_dir / url.lstrip("/")
+        if url.endswith("/"):
+            output_file = output_file / "index.html"
+        try:
+            digest = page_digest(output_file.read_bytes())
+        except OSError:
+            return False
+
+        with self._lock:
+            self._pages[url] = digest
+        return digest != previous
+
+    def _send(self, event: str, data: List[str]):
+        """queue an event for every connected browser"""
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        with self._lock:
+            for events in self._clients:
+                events.put(message)
+
+    def close(self):
+        """end every open event stream"""
+        with self._lock:
+            for events in self._clients:
+                events.put(None)
+            self._clients = []
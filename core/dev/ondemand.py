@@ -0,0 +1,383 @@
+"""
+On-demand rendering for the development server
+pages are rendered from source when first requested instead of building the
+whole site up front: a front matter index maps URLs to source files, only the
+posts shown on the requested page are parsed, and assets are processed when
+the first page or asset is requested
+"""
+
+import datetime
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.blog.manifest import BuildManifest
+from core.utils.cache import get_cache_dir
+from core.utils.template_renderer import RenderJob
+
+from .livereload import page_url
+
+INDEX_VERSION = 1
+
+_INDEX_PAGE_RE = re.compile(r"^/page/(\d+)/$")
+
+
+@dataclass
+class SourceEntry:
+    """A post or page located from its front matter"""
+
+    kind: str
+    file_path: str
+    # (mtime_ns, size) of the source file when it was read
+    stamp: Tuple[int, int]
+    url: str
+    category: Optional[str] = None
+    date: Optional[datetime.datetime] = None
+
+
+class SourceIndex:
+    """Where every post and page is served, read from front matter only
+
+    entries are kept on disk by file size and mtime, so a warm start reads no
+    source file and costs one stat per file
+    """
+
+    def __init__(self, config: Dict[str, Any], loader):
+        self.config = config
+        self.loader = loader
+        self.input_dir = Path(config["build"]["input_dir"])
+        self.path = get_cache_dir(config) / "ondemand-index.json"
+        self._files: Dict[str, Dict[str, Any]] = self._load()
+        # posts newest first, like ContentLoader.load_posts
+        self.posts: List[SourceEntry] = []
+        self.pages: List[SourceEntry] = []
+        # url -> entry and its position in posts (-1 for pages)
+        self.urls: Dict[str, Tuple[SourceEntry, int]] = {}
+
+    def scan(self) -> int:
+        """Stat every source file and read the front matter of new and edited ones
+
+        Returns the number of files read.
+        """
+        posts_dir = self.input_dir / "posts"
+        pages_dir = self.input_dir / "pages"
+        sources = [("post", path) for path in sorted(posts_dir.rglob("*.md"))]
+        sources += [("page", path) for path in sorted(pages_dir.glob("*.md"))]
+
+        files = {}
+        posts, pages = [], []
+        read = 0
+        for kind, md_file in sources:
+            try:
+                info = md_file.stat()
+            except OSError:
+                continue
+            stamp = [info.st_mtime_ns, info.st_size]
+
+            key = str(md_file)
+            record = self._files.get(key)
+            if record is None or record["kind"] != kind or record["stamp"] != stamp:
+                record = {
+                    "kind": kind,
+                    "stamp": stamp,
+                    "entry": self._read(kind, md_file),
+                }
+                read += 1
+            files[key] = record
+
+            fields = record["entry"]
+            if fields is None:
+                continue
+            entry = SourceEntry(kind, key, (stamp[0], stamp[1]), fields["url"])
+            if kind == "post":
+                entry.category = fields["category"]
+                entry.date = datetime.datetime.fromisoformat(fields["date"])
+                posts.append(entry)
+            else:
+                pages.append(entry)
+
+        posts.sort(key=lambda entry: entry.date, reverse=True)
+
+        # a full build renders posts before pages, so a page wins a shared URL
+        urls = {}
+        for position, entry in enumerate(posts):
+            urls[entry.url] = (entry, position)
+        for entry in pages:
+            urls[entry.url] = (entry, -1)
+
+        changed = read > 0 or files.keys() != self._files.keys()
+        self._files = files
+        self.posts, self.pages, self.urls = posts, pages, urls
+        if changed:
+            self._save()
+        return read
+
+    def categories(self) -> List[str]:
+        """Categories of the published posts"""
+        return sorted(set(entry.category for entry in self.posts if entry.category))
+
+    def _read(self, kind: str, md_file: Path) -> Optional[Dict[str, Any]]:
+        """Front matter fields of one file, None for drafts and unreadable files"""
+        try:
+            if kind == "post":
+                return self.loader.read_post_entry(md_file)
+            return self.loader.read_page_entry(md_file)
+        except Exception as e:
+            print(f"Error processing {kind} {md_file}: {e}")
+            return None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Entries saved by the last scan of this input directory"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (
+            data.get("version") != INDEX_VERSION
+            or data.get("input_dir") != self.input_dir.as_posix()
+        ):
+            return {}
+        return data.get("files", {})
+
+    def _save(self):
+        """Save the entries for the next start"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": INDEX_VERSION,
+            "input_dir": self.input_dir.as_posix(),
+            "files": self._files,
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data))
+
+
+def _touches(changed: List[Path], directory: str) -> bool:
+    """Check whether a changed path is inside a directory"""
+    root = Path(directory).resolve()
+    return any(path == root or root in path.parents for path in changed)
+
+
+class OnDemandSite:
+    """Renders the page behind a request URL from source on its first request
+
+    parsed posts and pages are kept in memory until their file changes, the
+    renderer keeps compiled templates, and a rendered page is served from the
+    output directory until a watched source changes
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.index = SourceIndex(generator.config, generator.content_loader)
+        self._scanned = False
+        self._assets = False
+        # file path -> (stamp, parsed Post or Page)
+        self._items: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        # url -> rendered output file, relative to the output directory
+        self._rendered: Dict[str, str] = {}
+        # requests arrive on several server threads
+        self._lock = threading.Lock()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def output_dir(self) -> Path:
+        """Output directory of the current config"""
+        return Path(self.generator.config["build"]["output_dir"])
+
+    def render(self, path: str) -> List[str]:
+        """Render the page for a request path unless it is already current
+
+        Returns the written outputs, relative to the output directory. Paths
+        that are not pages are left to the output directory as it is.
+        """
+        url = page_url(path)
+        if url.startswith("/_sync/"):
+            if self._assets:
+                return []
+            with self._lock:
+                return self._build_assets()
+
+        if not url.endswith("/"):
+            if "." in url.rsplit("/", 1)[-1]:
+                return []
+            # rendered into a directory, which the server then redirects to
+            url += "/"
+
+        with self._lock:
+            if url in self._rendered:
+                return []
+            start = time.perf_counter()
+            written = self._render(url)
+            if written:
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"Rendered {url} on demand in {elapsed:.0f}ms")
+            return written
+
+    def refresh(self, changed: List[Path]) -> List[str]:
+        """Pick up changed sources and re-render the pages rendered so far
+
+        Returns the written outputs, like BlogGenerator.rebuild.
+        """
+        start = time.perf_counter()
+        changed = [Path(path).resolve() for path in changed]
+        generator = self.generator
+
+        with self._lock:
+            written = []
+            if generator.config_path.resolve() in changed:
+                if not generator.reload_config():
+                    return []
+                print("Config changed, re-rendering pages...")
+                self.index = SourceIndex(generator.config, generator.content_loader)
+                self._scanned = False
+                self._items.clear()
+                if self._assets:
+                    self._assets = False
+                    written += self._build_assets()
+            else:
+                build = generator.config["build"]
+                static = _touches(changed, build["static_dir"]) or _touches(
+                    changed, str(Path(build["template_dir"]) / "static")
+                )
+                templates = _touches(changed, build["template_dir"])
+                content = _touches(changed, build["input_dir"])
+                if not (static or templates or content):
+                    return []
+
+                print(f"\n🔄 {len(changed)} file(s) changed, re-rendering...")
+                if static and self._assets:
+                    before = generator.asset_outputs()
+                    self._process_assets()
+                    written += sorted(
+                        f"_sync/{name}"
+                        for name, digest in generator.asset_outputs().items()
+                        if before.get(name) != digest
+                    )
+                if templates:
+                    generator.template_renderer.reload_templates()
+                if content and self._scanned:
+                    self.index.scan()
+
+            # any page may list an edited post, so every rendered page is redone
+            rendered = self._rendered
+            self._rendered = {}
+            for url, rel in sorted(rendered.items()):
+                pages = self._render(url)
+                if not pages:
+                    pages = self._remove(rel)
+                written += pages
+
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"Re-rendered {len(rendered)} page(s) in {elapsed:.0f}ms")
+        return written
+
+    def _render(self, url: str) -> List[str]:
+        """Render one URL, returns the written outputs or [] if nothing is there"""
+        if not self._scanned:
+            read = self.index.scan()
+            self._scanned = True
+            print(
+                f"Indexed {len(self.index.posts)} post(s) and "
+                f"{len(self.index.pages)} page(s), {read} file(s) read"
+            )
+
+        job = self._job(url)
+        if job is None:
+            return []
+
+        written = self._build_assets()
+        self.generator.template_renderer.render_job(job)
+        rel = job.output_file.relative_to(self.output_dir).as_posix()
+        self._rendered[url] = rel
+        return written + [rel]
+
+    def _job(self, url: str) -> Optional[RenderJob]:
+        """Find what a full build would write for a URL
+
+        category pages are written last, then index pages, pages and posts,
+        so that is the order in which a shared URL is resolved
+        """
+        renderer = self.generator.template_renderer
+        posts = self.index.posts
+        categories = self.index.categories()
+
+        category = url.strip("/")
+        if category in categories:
+            entries = [entry for entry in posts if entry.category == category]
+            return renderer.category_job(category, self._load(entries), categories)
+
+        match = _INDEX_PAGE_RE.match(url)
+        if url == "/" or (match and int(match.group(1)) > 1):
+            page_num = int(match.group(1)) if match else 1
+            posts_per_page = self.generator.config["build"].get("posts_per_page", 10)
+            total_pages = (len(posts) + posts_per_page - 1) // posts_per_page
+            if page_num <= total_pages:
+                start_idx = (page_num - 1) * posts_per_page
+                end_idx = start_idx + posts_per_page
+                page_posts = self._load(posts[start_idx:end_idx])
+                return renderer.index_job(page_posts, categories, page_num, total_pages)
+
+        entry, position = self.index.urls.get(url, (None, -1))
+        if entry is None:
+            return None
+        item = self._item(entry)
+        if item is None:
+            return None
+        if entry.kind == "page":
+            return renderer.page_job(item)
+
+        prev_post = self._item(posts[position - 1]) if position > 0 else None
+        next_post = (
+            self._item(posts[position + 1]) if position < len(posts) - 1 else None
+        )
+        return renderer.post_job(item, prev_post, next_post)
+
+    def _item(self, entry: SourceEntry) -> Optional[Any]:
+        """Parsed post or page, kept until its file changes"""
+        cached = self._items.get(entry.file_path)
+        if cached is not None and cached[0] == entry.stamp:
+            return cached[1]
+
+        loader = self.generator.content_loader
+        load = loader.load_post if entry.kind == "post" else loader.load_page
+        item = load(Path(entry.file_path))
+        self._items[entry.file_path] = (entry.stamp, item)
+        return item
+
+    def _load(self, entries: List[SourceEntry]) -> List[Any]:
+        """Parsed items for entries, leaving out files that fail to parse"""
+        return [item for item in map(self._item, entries) if item is not None]
+
+    def _build_assets(self) -> List[str]:
+        """Process assets before the first page that links them
+
+        Returns the asset outputs on the first call, [] afterwards.
+        """
+        if self._assets:
+            return []
+        self._process_assets()
+        self._assets = True
+        return sorted(f"_sync/{name}" for name in self.generator.asset_outputs())
+
+    def _process_assets(self):
+        """Process assets and hand their hashed names to the renderer"""
+        generator = self.generator
+        # reuses the assets of the last build when their inputs are unchanged;
+        # the build manifest is only read, never saved from here
+        generator.build_manifest = BuildManifest(generator.config)
+        generator.process_assets()
+        generator.template_renderer.set_asset_manifest(
+            generator.asset_processor.asset_manifest
+        )
+
+    def _remove(self, rel: str) -> List[str]:
+        """Delete the output of a page whose source is gone"""
+        output_file = self.output_dir / rel
+        if not output_file.exists():
+            return []
+        output_file.unlink()
+        return [rel]
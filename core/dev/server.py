@@ -2,13 +2,396 @@
 Development server for local testing
 """
 
+import datetime
+import email.utils
+import hashlib
 import http.server
 import os
+import queue
 import socket
 import socketserver
+import stat
 import threading
+import urllib.parse
 import webbrowser
-from typing import Any, Dict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .livereload import LIVERELOAD_PATH, LiveReload, inject_client, page_url
+from .ondemand import OnDemandSite
+from .watcher import Watcher
+
+# worker threads serving connections; keep-alive connections hold one each
+DEFAULT_WORKERS = 16
+
+# seconds an idle keep-alive connection may hold a worker
+KEEPALIVE_TIMEOUT = 5
+
+# memory for cached output files (dev.cache_mb)
+DEFAULT_CACHE_MB = 64
+
+# precompressed siblings written by the build, in order of preference
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+
+
+@dataclass
+class CachedFile:
+    """An output file held in memory with the validators it is served with"""
+
+    body: bytes
+    etag: str
+    mtime: float
+    mtime_ns: int
+    size: int
+
+
+def load_file(file_path: str) -> Optional[CachedFile]:
+    """Read a regular file and compute its strong ETag from the content"""
+    try:
+        with open(file_path, "rb") as f:
+            info = os.fstat(f.fileno())
+            if not stat.S_ISREG(info.st_mode):
+                return None
+            body = f.read()
+    except OSError:
+        return None
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return CachedFile(body, etag, info.st_mtime, info.st_mtime_ns, len(body))
+
+
+class ResponseCache:
+    """LRU of output file bytes, checked against each file's size and mtime
+
+    rebuilds invalidate the files they write, which also catches rewrites
+    that keep the same size within one mtime tick
+    """
+
+    def __init__(self, max_bytes: int, max_file_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        # larger files are streamed from disk instead of evicting everything
+        self.max_file_bytes = max_file_bytes or max_bytes // 8
+        self._files: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path: str) -> Optional[CachedFile]:
+        """Cached file if still current, otherwise load it; None if not cacheable"""
+        key = os.path.abspath(file_path)
+        try:
+            info = os.stat(key)
+        except OSError:
+            self.invalidate([key])
+            return None
+        if not stat.S_ISREG(info.st_mode) or info.st_size > self.max_file_bytes:
+            return None
+
+        with self._lock:
+            entry = self._files.get(key)
+            if (
+                entry is not None
+                and entry.mtime_ns == info.st_mtime_ns
+                and entry.size == info.st_size
+            ):
+                self._files.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = load_file(key)
+        if entry is None or entry.size > self.max_file_bytes:
+            return None
+        with self._lock:
+            self.misses += 1
+            self._remove(key)
+            self._files[key] = entry
+            self._size += entry.size
+            while self._size > self.max_bytes:
+                _, evicted = self._files.popitem(last=False)
+                self._size -= evicted.size
+        return entry
+
+    def invalidate(self, file_paths: Iterable[str]):
+        """Drop files that were rewritten or removed"""
+        with self._lock:
+            for file_path in file_paths:
+                self._remove(os.path.abspath(file_path))
+
+    def _remove(self, key: str):
+        """Drop one entry; the caller holds the lock"""
+        entry = self._files.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+
+class DevHTTPServer(socketserver.TCPServer):
+    """Serves connections on a bounded pool of worker threads
+
+    a slow client or a large file only occupies its own worker, and open live
+    reload streams do not block page requests
+    """
+
+    allow_reuse_address = True
+    # browsers open several connections at once; the default backlog of 5
+    # drops connection attempts under load
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, workers: int = DEFAULT_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="dev-server"
+        )
+        self._connections: Set[socket.socket] = set()
+        self._lock = threading.Lock()
+        # connections accepted but not yet picked up by a worker
+        self.waiting = 0
+
+    def process_request(self, request, client_address):
+        """Hand the connection to a worker; it waits in the queue when all are busy"""
+        with self._lock:
+            self.waiting += 1
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        """Serve every request on one connection, then close it"""
+        with self._lock:
+            self.waiting -= 1
+            self._connections.add(request)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._lock:
+                self._connections.discard(request)
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """Stop accepting, drop queued connections and end idle keep-alive ones"""
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            for request in self._connections:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class DevRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the output directory, adding live reload to HTML pages when enabled
+
+    with an on-demand site, pages are rendered from source before they are served
+    """
+
+    # keep-alive lets a page and its assets share one connection
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    # headers and body go out in separate writes; with Nagle on, a kept-alive
+    # connection waits for the delayed ACK (~40 ms) before sending the body
+    disable_nagle_algorithm = True
+
+    def __init__(
+        self,
+        *args,
+        livereload: Optional[LiveReload] = None,
+        cache: Optional[ResponseCache] = None,
+        site: Optional[OnDemandSite] = None,
+        **kwargs,
+    ):
+        # set before the base class handles the request
+        self.livereload = livereload
+        self.cache = cache
+        self.site = site
+        super().__init__(*args, **kwargs)
+
+    def end_headers(self):
+        """Close kept-alive connections while others wait for a worker"""
+        # an idle keep-alive connection would otherwise hold its worker until
+        # the timeout while a queued browser connection gets nothing
+        if getattr(self.server, "waiting", 0) > 0 and not self.close_connection:
+            self.send_header("Connection", "close")
+        super().end_headers()
+
+    def do_GET(self):
+        """Serve the event stream, then files from memory, then the base handler"""
+        path = urllib.parse.urlsplit(self.path).path
+        if self.livereload is not None and path == LIVERELOAD_PATH:
+            self._stream_events()
+            return
+        if not self._render_on_demand(path):
+            return
+        if not self._send_file(path):
+            super().do_GET()
+
+    def do_HEAD(self):
+        """Answer HEAD from the same cached files as GET"""
+        path = urllib.parse.urlsplit(self.path).path
+        if not self._render_on_demand(path):
+            return
+        if not self._send_file(path, head=True):
+            super().do_HEAD()
+
+    def _render_on_demand(self, path: str) -> bool:
+        """Render the requested page from source, returns False after an error page"""
+        if self.site is None:
+            return True
+        try:
+            written = self.site.render(path)
+        except Exception as e:
+            print(f"Render failed: {e}")
+            self.send_error(500, "Render failed", str(e))
+            return False
+        if written and self.cache is not None:
+            self.cache.invalidate(os.path.join(self.directory, rel) for rel in written)
+        return True
+
+    def _send_file(self, path: str, head: bool = False) -> bool:
+        """Send a file from the cache, returns False to leave it to the base handler
+
+        directories without a trailing slash (redirects), listings, missing
+        files and files too large to cache are left to SimpleHTTPRequestHandler
+        """
+        file_path = self.translate_path(self.path)
+        if path.endswith("/"):
+            file_path = os.path.join(file_path, "index.html")
+        inject = self.livereload is not None and file_path.endswith(".html")
+        load = self.cache.get if self.cache is not None else load_file
+
+        # the injected client changes the body, so pages get it uncompressed
+        encoding, entry = None, None
+        if not inject:
+            encoding, entry = self._precompressed(file_path, load)
+        if entry is None:
+            if self.cache is None and not inject:
+                return False
+            entry = load(file_path)
+            if entry is None:
+                return False
+
+        body, etag = entry.body, entry.etag
+        if inject:
+            # the live reload client makes this a different representation
+            self.livereload.served(page_url(path), body)
+            body = inject_client(body)
+            etag = etag[:-1] + '-livereload"'
+
+        if self._not_modified(etag, entry.mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return True
+
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(file_path))
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(entry.mtime))
+        # browsers revalidate every time, which costs a 304 and no body
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+        return True
+
+    def _precompressed(
+        self, file_path: str, load: Callable[[str], Optional[CachedFile]]
+    ) -> Tuple[Optional[str], Optional[CachedFile]]:
+        """Pick a compressed sibling the client accepts and that matches the file"""
+        for encoding in self._accepted_encodings():
+            variant = load(file_path + PRECOMPRESSED[encoding])
+            if variant is None:
+                continue
+            # siblings carry the mtime of the file they were compressed from;
+            # anything else is a leftover from before the last rebuild
+            try:
+                current = os.stat(file_path).st_mtime_ns == variant.mtime_ns
+            except OSError:
+                current = False
+            if current:
+                return encoding, variant
+        return None, None
+
+    def _accepted_encodings(self) -> List[str]:
+        """Precompressed encodings allowed by Accept-Encoding, most preferred first"""
+        header = self.headers.get("Accept-Encoding")
+        if not header:
+            return []
+
+        weights = {}
+        for part in header.split(","):
+            name, _, params = part.strip().partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            weights[name.strip().lower()] = quality
+
+        default = weights.get("*", 0.0)
+        order = list(PRECOMPRESSED)
+        accepted = [e for e in order if weights.get(e, default) > 0]
+        return sorted(
+            accepted, key=lambda e: (-weights.get(e, default), order.index(e))
+        )
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        """Check the request's validators against the current file"""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match uses weak comparison and takes precedence
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or etag in tags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        return int(mtime) <= since.timestamp()
+
+    def _stream_events(self):
+        """Hold the connection open and forward rebuild events"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.close_connection = True
+
+        events = self.livereload.subscribe()
+        try:
+            self.wfile.write(b"retry: 1000\n\n")
+            self.wfile.flush()
+            while True:
+                try:
+                    message = events.get(timeout=15)
+                except queue.Empty:
+                    # comment line keeps proxies from closing an idle stream
+                    message = b": ping\n\n"
+                if message is None:
+                    break
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.livereload.unsubscribe(events)
 
 
 class DevServer:
@@ -20,28 +403,69 @@ class DevServer:
         self.host = "0.0.0.0"
         self.port = config.get("dev", {}).get("port", 8000)
 
-    def serve(self, port: int = None):
-        """Start the development server"""
+    def serve(self, port: int = None, generator=None):
+        """Start the development server, rebuilding on changes when given a generator
+
+        with dev.on_demand, pages are rendered from the generator's sources
+        when first requested instead of being served from a finished build
+        """
         if port:
             self.port = port
 
-        # Change to output directory
+        # serve the output directory without leaving the project root,
+        # so watch mode rebuilds resolve config paths as usual
         output_dir = self.config["build"]["output_dir"]
-        os.chdir(output_dir)
+        dev_config = self.config.get("dev", {})
+
+        # live reload is injected by this server only, never into build output
+        livereload = None
+        if dev_config.get("livereload", False):
+            livereload = LiveReload(output_dir)
+        # output files are served from memory and revalidated with 304s
+        cache = None
+        cache_mb = dev_config.get("cache_mb", DEFAULT_CACHE_MB)
+        if cache_mb:
+            cache = ResponseCache(int(cache_mb * 1024 * 1024))
+        site = None
+        if generator is not None and dev_config.get("on_demand", False):
+            site = OnDemandSite(generator)
+            print("Rendering pages on demand; feeds, sitemap and search need a build")
+        Handler = partial(
+            DevRequestHandler,
+            directory=output_dir,
+            livereload=livereload,
+            cache=cache,
+            site=site,
+        )
+
+        watcher = None
+        if generator is not None and dev_config.get("watch", False):
+
+            def rebuild(changed: List[Path]):
+                if site is not None:
+                    written = site.refresh(changed)
+                else:
+                    written = generator.rebuild(changed)
+                if cache is not None:
+                    cache.invalidate(os.path.join(output_dir, rel) for rel in written)
+                if livereload is not None:
+                    livereload.notify(written)
+
+            watcher = Watcher(generator.watch_paths(), rebuild)
+            watcher.start()
 
-        # Create server
-        Handler = http.server.SimpleHTTPRequestHandler
-        with socketserver.TCPServer((self.host, self.port), Handler) as httpd:
+        workers = dev_config.get("workers", DEFAULT_WORKERS)
+        with DevHTTPServer((self.host, self.port), Handler, workers=workers) as httpd:
             # get local IP address
             local_ip = self._get_local_ip()
 
             print("\n🚀 Development server running!")
             print("\n📍 Local access:")
-            print("   http://localhost:{self.port}")
-            print("   http://127.0.0.1:{self.port}")
+            print(f"   http://localhost:{self.port}")
+            print(f"   http://127.0.0.1:{self.port}")
             if local_ip:
                 print("\n🌐 Network access:")
-                print("   http://{local_ip}:{self.port}")
+                print(f"   http://{local_ip}:{self.port}")
             print("\n✋ Press Ctrl+C to stop\n")
 
             # Open browser in a separate thread
@@ -57,6 +481,11 @@ class DevServer:
                 httpd.serve_forever()
             except KeyboardInterrupt:
                 print("\nServer stopped.")
+            finally:
+                if watcher is not None:
+                    watcher.stop()
+                if livereload is not None:
+                    livereload.close()
 
     def _get_local_ip(self) -> str:
         """get local IP address for network access"""
@@ -71,6 +500,10 @@ class DevServer:
             return ""
 
     def build_and_serve(self, generator):
-        """Build the site and then serve it"""
-        generator.build()
-        self.serve()
+        """Build the site and then serve it, or serve it on demand without a build"""
+        dev_config = self.config.get("dev", {})
+        if not dev_config.get("on_demand", False):
+            # watch mode rebuilds on top of the build manifest of this build
+            watch = dev_config.get("watch", False)
+            generator.build(incremental=True if watch else None)
+        self.serve(generator=generator)
@@ -0,0 +1,270 @@
+"""
+File watching for the development server
+uses inotify where available and falls back to polling modification times
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# inotify constants from <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+_EVENT = struct.Struct("iIII")
+
+# editor swap, backup and temporary files
+IGNORED_SUFFIXES = ("~", ".swp", ".swx", ".tmp", ".part")
+
+
+def is_ignored(path: Path) -> bool:
+    """Check whether a path is a hidden or editor file that should not trigger builds"""
+    name = path.name
+    return name.startswith(".") or name.endswith(IGNORED_SUFFIXES) or name == "4913"
+
+
+class InotifyBackend:
+    """Recursive inotify watches on the watched directories"""
+
+    def __init__(self, roots: List[Path], files: Set[Path]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.watches: Dict[int, Path] = {}
+        try:
+            for root in roots:
+                self._watch_tree(root)
+            # single files are watched through their directory so editors
+            # that replace the file on save are still seen
+            for path in files:
+                self._watch(path.parent)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, directory: Path):
+        """Add a watch on one directory"""
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed: {os.strerror(errno)}")
+        self.watches[wd] = directory
+
+    def _watch_tree(self, root: Path) -> List[Path]:
+        """Watch a directory and its subdirectories, returns the files found"""
+        found = []
+        for directory, _, filenames in os.walk(root):
+            self._watch(Path(directory))
+            found.extend(Path(directory) / name for name in filenames)
+        return found
+
+    def wait(self, timeout: float) -> Set[Path]:
+        """Block until events arrive or the timeout passes, returns changed paths"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed: Set[Path] = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            start = offset + _EVENT.size
+            offset = start + length
+            name = data[start:offset].rstrip(b"\0")
+
+            if mask & IN_Q_OVERFLOW:
+                # events were dropped, report every watched directory
+                changed.update(self.watches.values())
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = directory / os.fsdecode(name)
+            changed.add(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # files can land in a new directory before it is watched
+                try:
+                    changed.update(self._watch_tree(path))
+                except OSError:
+                    pass
+
+        return changed
+
+    def close(self):
+        """Release the inotify descriptor"""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingBackend:
+    """Compares modification times and sizes of the watched files at an interval"""
+
+    def __init__(self, roots: List[Path], files: Set[Path], interval: float = 0.5):
+        self.roots = roots
+        self.files = files
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Stat every watched file"""
+        entries = {}
+        for path in self.files:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries[str(path)] = (stat.st_mtime_ns, stat.st_size)
+
+        pending = [str(root) for root in self.roots]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as scan:
+                    for entry in scan:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        else:
+                            stat = entry.stat()
+                            entries[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+        return entries
+
+    def wait(self, timeout: float) -> Set[Path]:
+        """Sleep for one interval (at most the timeout), returns changed paths"""
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        previous, self.snapshot = self.snapshot, snapshot
+        changed = {
+            path
+            for path, signature in snapshot.items()
+            if previous.get(path) != signature
+        }
+        changed.update(path for path in previous if path not in snapshot)
+        return {Path(path) for path in changed}
+
+    def close(self):
+        """Nothing to release"""
+
+
+class Watcher:
+    """Watches source files and reports debounced batches of changes"""
+
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        callback: Callable[[List[Path]], None],
+        debounce: float = 0.05,
+        interval: float = 0.5,
+        polling: bool = False,
+    ):
+        paths = [Path(path).resolve() for path in paths]
+        self.roots = [path for path in paths if path.is_dir()]
+        self.files = {path for path in paths if not path.is_dir()}
+        self.callback = callback
+        self.debounce = debounce
+        self.interval = interval
+        self.polling = polling
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _open_backend(self):
+        """Use inotify when the platform has it, otherwise poll"""
+        if not self.polling and sys.platform.startswith("linux"):
+            try:
+                return InotifyBackend(self.roots, self.files)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}), polling for changes")
+        return PollingBackend(self.roots, self.files, self.interval)
+
+    def _wanted(self, path: Path) -> bool:
+        """Keep watched files and non-editor files inside watched directories"""
+        if path in self.files:
+            return True
+        return not is_ignored(path) and any(
+            path == root or root in path.parents for root in self.roots
+        )
+
+    def poll(self, timeout: float) -> List[Path]:
+        """Wait for a change, then collect the rest of the burst it belongs to"""
+        changed = {p for p in self.backend.wait(timeout) if self._wanted(p)}
+        if not changed:
+            return []
+
+        # saves touch several files in quick succession; stop waiting once
+        # they settle, but never hold a rebuild back for more than a second
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            more = {p for p in self.backend.wait(self.debounce) if self._wanted(p)}
+            if not more:
+                break
+            changed |= more
+        return sorted(changed)
+
+    def start(self):
+        """Start watching on a background thread"""
+        # watches are in place before returning, so no edit after start is missed
+        self.backend = self._open_backend()
+        kind = "polling" if isinstance(self.backend, PollingBackend) else "inotify"
+        print(
+            f"👀 Watching {len(self.roots) + len(self.files)} path(s) for changes ({kind})"
+        )
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Report batches of changes until stopped"""
+        while not self._stop.is_set():
+            changed = self.poll(self.interval)
+            if not changed:
+                continue
+            try:
+                self.callback(changed)
+            except Exception as e:
+                # keep watching; the next save usually fixes the error
+                print(f"Rebuild failed: {e}")
+
+    def stop(self):
+        """Stop watching and release the backend"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
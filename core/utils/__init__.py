@@ -2,7 +2,8 @@
 Utility functions
 """
 
+from .cache import DiskCache
 from .content_loader import ContentLoader
 from .template_renderer import TemplateRenderer
 
-__all__ = ["ContentLoader", "TemplateRenderer"]
+__all__ = ["ContentLoader", "DiskCache", "TemplateRenderer"]
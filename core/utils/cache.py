@@ -0,0 +1,128 @@
+"""
+On-disk build cache utilities
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def get_cache_dir(config: Dict[str, Any]) -> Path:
+    """Get the root build cache directory from config"""
+    return Path(config.get("cache", {}).get("dir", ".cache"))
+
+
+class DiskCache:
+    """Content-addressed cache stored under the build cache directory"""
+
+    def __init__(self, config: Dict[str, Any], namespace: str):
+        cache_config = config.get("cache", {})
+        self.enabled = cache_config.get("enabled", False)
+        self.root = get_cache_dir(config) / namespace
+        self.max_age_days = cache_config.get("max_age_days", 30)
+        self.max_size_mb = cache_config.get("max_size_mb", 512)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Hash key parts (str or bytes) into a cache key"""
+        digest = hashlib.sha256()
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = str(part).encode("utf-8")
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str, suffix: str) -> Path:
+        """Get the file path for a cache entry"""
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def _read(self, key: str, suffix: str) -> Optional[bytes]:
+        """Read raw entry bytes and refresh its age on hit"""
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key, suffix)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+
+        # touch entry so age-based eviction keeps recently used entries
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return data
+
+    def _write(self, key: str, suffix: str, data: bytes):
+        """Write raw entry bytes atomically"""
+        if not self.enabled:
+            return
+
+        path = self._entry_path(key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def get_json(self, key: str) -> Optional[Any]:
+        """Get a JSON entry from cache"""
+        data = self._read(key, ".json")
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def set_json(self, key: str, value: Any):
+        """Store a JSON entry in cache"""
+        self._write(key, ".json", json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Get a binary entry from cache"""
+        return self._read(key, ".bin")
+
+    def set_bytes(self, key: str, value: bytes):
+        """Store a binary entry in cache"""
+        self._write(key, ".bin", value)
+
+    def prune(self):
+        """Evict entries older than max_age_days, then oldest until under max_size_mb"""
+        if not self.enabled or not self.root.exists():
+            return
+
+        entries = []
+        for path in self.root.rglob("*"):
+            if path.is_file():
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        max_age = self.max_age_days * 86400
+        max_size = self.max_size_mb * 1024 * 1024
+        now = time.time()
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+
+        # oldest first
+        for mtime, size, path in sorted(entries, key=lambda e: e[0]):
+            if now - mtime <= max_age and total_size <= max_size:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total_size -= size
+            removed += 1
+
+        if removed:
+            print(f"Evicted {removed} cache entries from {self.root}")
@@ -2,16 +2,31 @@
 Content loading utilities
 """
 
+import dataclasses
 import datetime
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import frontmatter
 import markdown
 from jinja2 import Template
 
 from core.blog.content import Page, Post
+from core.blog.manifest import config_fingerprint
+from core.utils.cache import DiskCache
+from core.utils.workers import resolve_workers
+
+MARKDOWN_EXTENSIONS = ["codehilite", "toc", "tables", "fenced_code"]
+
+# bump when parsing output changes so stale cache entries are not reused
+CONTENT_CACHE_VERSION = 2
+
+# jinja syntax markers; only content using them depends on config values
+TEMPLATE_MARKERS = (b"{{", b"{%", b"{#")
 
 
 class ContentLoader:
@@ -19,6 +34,7 @@ class ContentLoader:
 
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self.cache = DiskCache(config, "content")
 
     def load_posts(self) -> List[Post]:
         """Load and parse blog posts from markdown files"""
@@ -30,68 +46,13 @@ class ContentLoader:
             posts_dir.mkdir(parents=True, exist_ok=True)
             return posts
 
-        for md_file in posts_dir.rglob("*.md"):
-            try:
-                post_data = frontmatter.load(md_file)
-
-                # Skip drafts unless building drafts
-                if not post_data.metadata.get("published", True):
-                    continue
-
-                # Extract metadata
-                title = post_data.metadata.get("title", md_file.stem)
-                date_str = post_data.metadata.get("date")
-
-                # Parse date
-                date = self._parse_date(date_str, md_file)
-
-                # Detect category from folder structure
-                relative_path = md_file.relative_to(posts_dir)
-                category = None
-                if len(relative_path.parts) > 1:
-                    # File is in a subfolder, use the folder name as category
-                    category = relative_path.parts[0]
-
-                # Generate slug and URL
-                slug = post_data.metadata.get("slug", self._slugify(title))
-
-                # Create URL structure
-                if category:
-                    url = f"/{category}/{slug}/"
-                else:
-                    url = f"/{slug}/"
-
-                # Convert markdown to HTML
-                content = markdown.markdown(
-                    post_data.content,
-                    extensions=["codehilite", "toc", "tables", "fenced_code"],
-                )
-
-                # Convert H1 to H2 to avoid multiple H1 tags (SEO best practice)
-                content = self._convert_h1_to_h2(content)
-
-                # Render any Jinja2 variables in content (e.g., config.site.email)
-                content = Template(content).render(config=self.config)
-
-                post = Post(
-                    title=title,
-                    content=content,
-                    date=date,
-                    url=url,
-                    file_path=str(md_file),
-                    slug=slug,
-                    category=category,
-                    author=post_data.metadata.get("author"),
-                    description=post_data.metadata.get("description"),
-                    image=post_data.metadata.get("image"),
-                    published=post_data.metadata.get("published", True),
-                )
-
+        md_files = sorted(posts_dir.rglob("*.md"))
+        for md_file, post, error in self._parse_files(self._parse_post, md_files):
+            if error:
+                print(f"Error processing post {md_file}: {error}")
+            elif post:
                 posts.append(post)
 
-            except Exception as e:
-                print(f"Error processing post {md_file}: {e}")
-
         # Sort posts by date (newest first)
         posts.sort(key=lambda p: p.date, reverse=True)
         print(f"Loaded {len(posts)} posts")
@@ -107,44 +68,310 @@ class ContentLoader:
             pages_dir.mkdir(parents=True, exist_ok=True)
             return pages
 
-        for md_file in pages_dir.glob("*.md"):
-            try:
-                page_data = frontmatter.load(md_file)
-
-                # Extract metadata
-                title = page_data.metadata.get("title", md_file.stem)
-                slug = page_data.metadata.get("slug", self._slugify(title))
-                url = f"/{slug}/"
-
-                # Convert markdown to HTML
-                content = markdown.markdown(
-                    page_data.content,
-                    extensions=["codehilite", "toc", "tables", "fenced_code"],
-                )
+        md_files = sorted(pages_dir.glob("*.md"))
+        for md_file, page, error in self._parse_files(self._parse_page, md_files):
+            if error:
+                print(f"Error processing page {md_file}: {error}")
+            elif page:
+                pages.append(page)
 
-                # Convert H1 to H2 to avoid multiple H1 tags (SEO best practice)
-                content = self._convert_h1_to_h2(content)
+        print(f"Loaded {len(pages)} pages")
+        return pages
 
-                # Render any Jinja2 variables in content (e.g., config.site.email)
-                content = Template(content).render(config=self.config)
+    def update_posts(
+        self, posts: List[Post], changed: List[Path]
+    ) -> Optional[List[Post]]:
+        """Re-parse changed post files, keeping every other loaded post
 
-                page = Page(
-                    title=title,
-                    content=content,
-                    url=url,
-                    file_path=str(md_file),
-                    slug=slug,
-                    description=page_data.metadata.get("description"),
-                    image=page_data.metadata.get("image"),
-                )
+        Returns None when no changed path is inside the posts directory.
+        """
+        posts_dir = Path(self.config["build"]["input_dir"]) / "posts"
+        updated = self._update_files(
+            posts, changed, posts_dir, True, self._parse_post, "post"
+        )
+        if updated is not None:
+            # same order as load_posts: by file, then newest first
+            updated.sort(key=lambda p: Path(p.file_path))
+            updated.sort(key=lambda p: p.date, reverse=True)
+        return updated
+
+    def update_pages(
+        self, pages: List[Page], changed: List[Path]
+    ) -> Optional[List[Page]]:
+        """Re-parse changed page files, keeping every other loaded page
+
+        Returns None when no changed path is inside the pages directory.
+        """
+        pages_dir = Path(self.config["build"]["input_dir"]) / "pages"
+        updated = self._update_files(
+            pages, changed, pages_dir, False, self._parse_page, "page"
+        )
+        if updated is not None:
+            updated.sort(key=lambda p: Path(p.file_path))
+        return updated
+
+    def load_post(self, md_file: Path) -> Optional[Post]:
+        """Parse one post through the content cache, None for drafts and errors"""
+        return self._load_file(self._parse_post, md_file, "post")
+
+    def load_page(self, md_file: Path) -> Optional[Page]:
+        """Parse one page through the content cache, None on errors"""
+        return self._load_file(self._parse_page, md_file, "page")
+
+    def read_post_entry(self, md_file: Path) -> Optional[Dict[str, Any]]:
+        """URL, category and date of a post from its front matter alone
+
+        The markdown body is not rendered. Returns None for drafts.
+        """
+        metadata = frontmatter.load(md_file).metadata
+        if not metadata.get("published", True):
+            return None
+
+        title = metadata.get("title", md_file.stem)
+        category, _, url = self._post_location(md_file, metadata, title)
+        date = self._parse_date(metadata.get("date"), md_file)
+        return {"url": url, "category": category, "date": date.isoformat()}
+
+    def read_page_entry(self, md_file: Path) -> Dict[str, Any]:
+        """URL of a page from its front matter alone"""
+        metadata = frontmatter.load(md_file).metadata
+        title = metadata.get("title", md_file.stem)
+        slug = metadata.get("slug", self._slugify(title))
+        return {"url": f"/{slug}/"}
+
+    def _load_file(
+        self, parse: Callable[[Path], Any], md_file: Path, kind: str
+    ) -> Optional[Any]:
+        """Parse a single file through the content cache, printing errors"""
+        [(_, item, error)] = self._parse_files(parse, [md_file])
+        if error:
+            print(f"Error processing {kind} {md_file}: {error}")
+            return None
+        return item
+
+    def _update_files(
+        self,
+        items: List[Any],
+        changed: List[Path],
+        directory: Path,
+        recursive: bool,
+        parse: Callable[[Path], Any],
+        kind: str,
+    ) -> Optional[List[Any]]:
+        """Drop items whose files changed and parse their current versions"""
+        root = directory.resolve()
+        scopes = []
+        for path in changed:
+            path = Path(path).resolve()
+            if path == root or root in path.parents:
+                scopes.append(directory / path.relative_to(root))
+            elif path in root.parents:
+                # a whole parent directory changed, e.g. after dropped events
+                scopes.append(directory)
+        if not scopes:
+            return None
+
+        # loaded file paths are built from directory, so plain string
+        # prefixes find the affected items without touching the disk
+        exact = {str(scope) for scope in scopes}
+        prefixes = tuple(str(scope) + os.sep for scope in scopes)
+        updated = [
+            item
+            for item in items
+            if item.file_path not in exact and not item.file_path.startswith(prefixes)
+        ]
+
+        md_files = set()
+        for scope in scopes:
+            if scope.is_dir():
+                if recursive:
+                    md_files.update(scope.rglob("*.md"))
+                elif scope == directory:
+                    md_files.update(scope.glob("*.md"))
+            elif scope.suffix == ".md" and scope.exists():
+                if recursive or scope.parent == directory:
+                    md_files.add(scope)
+
+        for md_file, item, error in self._parse_files(parse, sorted(md_files)):
+            if error:
+                print(f"Error processing {kind} {md_file}: {error}")
+            elif item:
+                updated.append(item)
+        return updated
+
+    def _parse_post(self, md_file: Path) -> Optional[Post]:
+        """Parse a single post file, returning None for drafts"""
+        post_data = frontmatter.load(md_file)
+
+        # Skip drafts unless building drafts
+        if not post_data.metadata.get("published", True):
+            return None
+
+        # Extract metadata
+        title = post_data.metadata.get("title", md_file.stem)
+        date_str = post_data.metadata.get("date")
+
+        # Parse date
+        date = self._parse_date(date_str, md_file)
+
+        category, slug, url = self._post_location(md_file, post_data.metadata, title)
+
+        content = self._render_markdown(post_data.content)
+
+        return Post(
+            title=title,
+            content=content,
+            date=date,
+            url=url,
+            file_path=str(md_file),
+            slug=slug,
+            category=category,
+            tags=self._parse_tags(post_data.metadata.get("tags")),
+            author=post_data.metadata.get("author"),
+            description=post_data.metadata.get("description"),
+            image=post_data.metadata.get("image"),
+            published=post_data.metadata.get("published", True),
+        )
+
+    def _post_location(
+        self, md_file: Path, metadata: Dict[str, Any], title: str
+    ) -> Tuple[Optional[str], str, str]:
+        """Category, slug and URL of a post from its path and front matter"""
+        posts_dir = Path(self.config["build"]["input_dir"]) / "posts"
 
-                pages.append(page)
+        # Detect category from folder structure
+        relative_path = md_file.relative_to(posts_dir)
+        category = None
+        if len(relative_path.parts) > 1:
+            # File is in a subfolder, use the folder name as category
+            category = relative_path.parts[0]
 
-            except Exception as e:
-                print(f"Error processing page {md_file}: {e}")
+        # Generate slug and URL
+        slug = metadata.get("slug", self._slugify(title))
 
-        print(f"Loaded {len(pages)} pages")
-        return pages
+        # Create URL structure
+        if category:
+            url = f"/{category}/{slug}/"
+        else:
+            url = f"/{slug}/"
+
+        return category, slug, url
+
+    def _parse_page(self, md_file: Path) -> Page:
+        """Parse a single static page file"""
+        page_data = frontmatter.load(md_file)
+
+        # Extract metadata
+        title = page_data.metadata.get("title", md_file.stem)
+        slug = page_data.metadata.get("slug", self._slugify(title))
+        url = f"/{slug}/"
+
+        content = self._render_markdown(page_data.content)
+
+        return Page(
+            title=title,
+            content=content,
+            url=url,
+            file_path=str(md_file),
+            slug=slug,
+            description=page_data.metadata.get("description"),
+            image=page_data.metadata.get("image"),
+        )
+
+    def _render_markdown(self, text: str) -> str:
+        """Convert markdown body to the final HTML used by templates"""
+        content = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+
+        # Convert H1 to H2 to avoid multiple H1 tags (SEO best practice)
+        content = self._convert_h1_to_h2(content)
+
+        # Render any Jinja2 variables in content (e.g., config.site.email)
+        return Template(content).render(config=self.config)
+
+    def _parse_files(
+        self, parse: Callable[[Path], Any], md_files: List[Path]
+    ) -> List[Tuple[Path, Any, Optional[str]]]:
+        """parse files serially or on a process pool, keeping file order"""
+        results = {}
+        pending = []
+
+        # reuse cached results for files whose key did not change
+        for md_file in md_files:
+            key = self._cache_key(md_file) if self.cache.enabled else None
+            entry = self.cache.get_json(key) if key else None
+            if entry is not None:
+                results[md_file] = (self._decode_entry(entry, md_file), None)
+            else:
+                pending.append((md_file, key))
+
+        pending_files = [md_file for md_file, _ in pending]
+        workers = min(resolve_workers(self.config), len(pending_files))
+
+        if workers > 1:
+            chunksize = max(1, len(pending_files) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parsed = list(
+                    executor.map(
+                        partial(_try_parse, parse), pending_files, chunksize=chunksize
+                    )
+                )
+        else:
+            parsed = [_try_parse(parse, md_file) for md_file in pending_files]
+
+        for (md_file, key), (result, error) in zip(pending, parsed):
+            results[md_file] = (result, error)
+            if key and not error:
+                self.cache.set_json(key, self._encode_entry(result, md_file))
+
+        return [(md_file, *results[md_file]) for md_file in md_files]
+
+    def _cache_key(self, md_file: Path) -> Optional[str]:
+        """Build the content cache key for a markdown file"""
+        try:
+            source = md_file.read_bytes()
+        except OSError:
+            return None
+
+        parts = [
+            CONTENT_CACHE_VERSION,
+            md_file.as_posix(),
+            source,
+            ",".join(MARKDOWN_EXTENSIONS),
+            markdown.__version__,
+            _pygments_version(),
+        ]
+
+        # config only matters when the content renders jinja variables
+        if any(marker in source for marker in TEMPLATE_MARKERS):
+            parts.append(config_fingerprint(self.config))
+
+        return DiskCache.make_key(*parts)
+
+    def _encode_entry(self, item: Any, md_file: Path) -> Dict[str, Any]:
+        """Serialize a parsed Post/Page (or skipped draft) for the cache"""
+        if item is None:
+            return {"type": None}
+
+        fields = dataclasses.asdict(item)
+        entry = {"type": type(item).__name__, "fields": fields}
+        if isinstance(item, Post):
+            fields["date"] = item.date.isoformat()
+            # dates taken from file mtime must be recomputed on every load
+            entry["mtime_date"] = item.date == self._parse_date(None, md_file)
+        return entry
+
+    def _decode_entry(self, entry: Dict[str, Any], md_file: Path) -> Any:
+        """Rebuild a Post/Page from a cache entry"""
+        if entry["type"] == "Post":
+            fields = dict(entry["fields"])
+            if entry.get("mtime_date"):
+                fields["date"] = self._parse_date(None, md_file)
+            else:
+                fields["date"] = datetime.datetime.fromisoformat(fields["date"])
+            return Post(**fields)
+        if entry["type"] == "Page":
+            return Page(**entry["fields"])
+        return None
 
     def _parse_date(self, date_str, md_file: Path) -> datetime.datetime:
         """Parse date from various formats"""
@@ -163,6 +390,14 @@ class ContentLoader:
 
         return date
 
+    def _parse_tags(self, tags) -> List[str]:
+        """Normalize front matter tags given as a list or a comma-separated string"""
+        if not tags:
+            return []
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        return [str(tag).strip() for tag in tags if str(tag).strip()]
+
     def _slugify(self, text: str) -> str:
         """Convert text to URL-friendly slug"""
         text = text.lower()
@@ -177,3 +412,23 @@ class ContentLoader:
         # replace closing h1 tags with h2
         html_content = re.sub(r"</h1>", "</h2>", html_content)
         return html_content
+
+
+def _try_parse(
+    parse: Callable[[Path], Any], md_file: Path
+) -> Tuple[Any, Optional[str]]:
+    """run a parse function and capture its error message (picklable for workers)"""
+    try:
+        return parse(md_file), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _pygments_version() -> str:
+    """Get the installed Pygments version used by codehilite"""
+    try:
+        import pygments
+
+        return pygments.__version__
+    except ImportError:
+        return ""
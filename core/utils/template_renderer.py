@@ -3,15 +3,64 @@ Template rendering utilities
 """
 
 import datetime
+import hashlib
+import json
 import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import markdown
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import (
+    BaseLoader,
+    ChoiceLoader,
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    ModuleLoader,
+    meta,
+    pass_context,
+    select_autoescape,
+)
 
 from core.blog.content import Page, Post
+from core.blog.manifest import (
+    BuildManifest,
+    config_fingerprint,
+    fingerprint,
+)
 from core.blog.metadata import MetadataGenerator
+from core.utils.cache import get_cache_dir
+from core.utils.workers import resolve_workers
+
+TEMPLATE_EXTENSIONS = ("html", "xml")
+
+# tokens the HTML minifier cares about: protected blocks kept verbatim,
+# gaps of whitespace/comments that may be collapsed, and inline scripts
+_MINIFY_TOKEN_RE = re.compile(
+    r"(?P<protected><(?P<tag>pre|code|style)[^>]*?>.*?</(?P=tag)>)"
+    r"|(?P<gap>(?:\s*<!--(?!(?-i:\[if)).*?-->)+\s*|\s{2,}|[^\S ]\s*|(?<=>) (?=<))"
+    r"|(?P<script><script[^>]*>)(?P<script_body>.*?)</script>",
+    re.DOTALL | re.IGNORECASE,
+)
+_HTML_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+_MULTI_SPACE_RE = re.compile(r" {2,}")
+
+
+def _runtime_filter(func):
+    """Wrap a filter so Jinja never folds it into compiled or cached template code"""
+    return pass_context(lambda context, *args, **kwargs: func(*args, **kwargs))
+
+
+@dataclass
+class RenderJob:
+    """A single page to render: template, context and output file"""
+
+    template: str
+    context: Dict[str, Any]
+    output_file: Path
 
 
 class TemplateRenderer:
@@ -22,13 +71,36 @@ class TemplateRenderer:
         self.asset_manifest = {}
         self.image_dimensions = {}
         self.metadata_generator = MetadataGenerator(config)
+        self.source_loader = FileSystemLoader(config["build"]["template_dir"])
         self.jinja_env = self._setup_jinja()
+        self.build_manifest: Optional[BuildManifest] = None
+        self._template_inputs_cache: Dict[str, Dict[str, str]] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
 
-    def _setup_jinja(self) -> Environment:
+    def _setup_jinja(self, precompiled: bool = True) -> Environment:
         """Setup Jinja2 environment"""
+        cache_config = self.config.get("cache", {})
+        loader: BaseLoader = self.source_loader
+        bytecode_cache = None
+
+        if cache_config.get("enabled", False):
+            # compiled template bytecode is reused until the template source changes
+            bytecode_dir = get_cache_dir(self.config) / "jinja"
+            bytecode_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(bytecode_dir))
+
+            if precompiled and cache_config.get("precompiled_templates", False):
+                if self._precompiled_templates_current():
+                    loader = ChoiceLoader(
+                        [ModuleLoader(str(self._precompiled_dir())), self.source_loader]
+                    )
+                elif self._precompiled_dir().exists():
+                    print("Precompiled templates are out of date, using sources")
+
         env = Environment(
-            loader=FileSystemLoader(self.config["build"]["template_dir"]),
+            loader=loader,
             autoescape=select_autoescape(["html", "xml"]),
+            bytecode_cache=bytecode_cache,
         )
 
         # Add custom filters
@@ -43,18 +115,85 @@ class TemplateRenderer:
         env.filters["excerpt"] = lambda text, length=200: (
             text[:length] + "..." if len(text) > length else text
         )
-        env.filters["asset"] = self._asset_url
-        env.filters["image"] = self._image_url
-        env.filters["img_tag"] = self._generate_img_tag
+        env.filters["asset"] = _runtime_filter(self._asset_url)
+        env.filters["image"] = _runtime_filter(self._image_url)
+        env.filters["img_tag"] = _runtime_filter(self._generate_img_tag)
+
+        # per-build constants shared by every template
+        env.globals["config"] = self.config
+        env.globals["current_year"] = datetime.datetime.now().year
+        env.globals["metadata"] = self.metadata_generator
 
         return env
 
+    def _precompiled_dir(self) -> Path:
+        """Directory holding precompiled template modules"""
+        return get_cache_dir(self.config) / "templates"
+
+    def _template_sources_digest(self) -> str:
+        """Digest of every template source, used to detect stale precompiled modules"""
+        digest = hashlib.sha256()
+        for name in self.source_loader.list_templates():
+            if name.rsplit(".", 1)[-1] not in TEMPLATE_EXTENSIONS:
+                continue
+            source, _, _ = self.source_loader.get_source(None, name)
+            digest.update(name.encode("utf-8"))
+            digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _precompiled_templates_current(self) -> bool:
+        """Check precompiled modules were built from the current template sources"""
+        digest_file = self._precompiled_dir() / "templates.json"
+        if not digest_file.exists():
+            return False
+        with open(digest_file, "r", encoding="utf-8") as f:
+            compiled = json.load(f)
+        return compiled.get("digest") == self._template_sources_digest()
+
+    def compile_templates(self) -> Path:
+        """Precompile templates into importable modules under the cache directory
+
+        Raises ValueError when the build cache is disabled, since the modules
+        are only loaded from it.
+        """
+        if not self.config.get("cache", {}).get("enabled", False):
+            raise ValueError(
+                "precompiled templates need the build cache (cache.enabled)"
+            )
+
+        target = self._precompiled_dir()
+        if target.exists():
+            shutil.rmtree(target)
+        target.mkdir(parents=True)
+
+        env = self._setup_jinja(precompiled=False)
+        env.compile_templates(
+            str(target), extensions=TEMPLATE_EXTENSIONS, zip=None, ignore_errors=False
+        )
+
+        with open(target / "templates.json", "w", encoding="utf-8") as f:
+            json.dump({"digest": self._template_sources_digest()}, f)
+
+        print(f"Precompiled templates to {target}")
+
+        # switch to the compiled modules if enabled
+        self.jinja_env = self._setup_jinja()
+        return target
+
+    def reload_templates(self):
+        """Pick up edited template sources on the next render"""
+        self._template_inputs_cache.clear()
+        self.jinja_env = self._setup_jinja()
+
     def set_asset_manifest(self, manifest: Dict[str, str]):
         """set asset manifest and load image dimensions"""
         import json
 
         self.asset_manifest = manifest
 
+        # workers were initialized with the previous manifest
+        self.shutdown_workers()
+
         # load image dimensions
         dimensions_file = (
             Path(self.config["build"]["output_dir"]) / "_sync" / "image-dimensions.json"
@@ -108,7 +247,16 @@ class TemplateRenderer:
         width = dimensions.get("width", 0)
         height = dimensions.get("height", 0)
 
-        attrs = [f'src="{img_url}"', f'alt="{alt}"']
+        srcsets = self._image_srcsets(actual_path, dimensions.get("variants", []))
+        sizes = self.config.get("assets", {}).get("image_sizes", "100vw")
+
+        attrs = [f'src="{img_url}"']
+
+        if "webp" in srcsets:
+            attrs.append(f'srcset="{srcsets.pop("webp")}"')
+            attrs.append(f'sizes="{sizes}"')
+
+        attrs.append(f'alt="{alt}"')
 
         if width and height:
             attrs.append(f'width="{width}"')
@@ -117,57 +265,131 @@ class TemplateRenderer:
         attrs.append('loading="lazy"')
         attrs.append('decoding="async"')
 
-        return f'<img {" ".join(attrs)}>'
+        img = f'<img {" ".join(attrs)}>'
+        if not srcsets:
+            return img
+
+        # other formats (AVIF) are offered as <picture> sources with WebP as fallback
+        sources = "".join(
+            f'<source type="image/{fmt}" srcset="{srcset}" sizes="{sizes}">'
+            for fmt, srcset in sorted(srcsets.items())
+        )
+        return f"<picture>{sources}{img}</picture>"
+
+    def _image_srcsets(self, path: str, variants: List[str]) -> Dict[str, str]:
+        """build srcset values per image format from responsive variants"""
+        if not variants:
+            return {}
+
+        candidates: Dict[str, List[Tuple[int, str]]] = {}
+        for variant in [path] + variants:
+            width = self.image_dimensions.get(variant, {}).get("width", 0)
+            if width:
+                fmt = variant.rsplit(".", 1)[-1].lower()
+                candidates.setdefault(fmt, []).append((width, f"/_sync/{variant}"))
+
+        return {
+            fmt: ", ".join(f"{url} {width}w" for width, url in sorted(items))
+            for fmt, items in candidates.items()
+        }
 
     def _minify_html(self, html: str) -> str:
-        """Minify HTML content"""
+        """Minify HTML content in a single pass, leaving pre/code/style untouched"""
         if not self.config.get("assets", {}).get("minify_html", False):
             return html
 
-        # FIRST: Protect pre, code, and style content BEFORE any minification
-        protected_content = {}
-        counter = 0
-
-        for tag in ["pre", "code", "style"]:
-            pattern = f"<{tag}[^>]*?>.*?</{tag}>"
-            matches = re.finditer(pattern, html, re.DOTALL | re.IGNORECASE)
-            for match in matches:
-                placeholder = f"__PROTECTED_CONTENT_{counter}__"
-                protected_content[placeholder] = match.group(0)
-                html = html.replace(match.group(0), placeholder)
-                counter += 1
-
-        # THEN: Apply minification
-        html = re.sub(r"<!--(?!\[if).*?-->", "", html, flags=re.DOTALL)
-        html = re.sub(r">\s+<", "><", html)
-        html = re.sub(r"^\s+|\s+$", "", html, flags=re.MULTILINE)
-        html = re.sub(r" {2,}", " ", html)
-
-        script_pattern = r"<script(?:[^>]*)>(.*?)</script>"
-
-        def minify_script_content(match):
-            script_tag_start = match.group(0).split(">")[0] + ">"
-            script_content = match.group(1)
-            script_tag_end = "</script>"
-
-            if self.config.get("assets", {}).get("minify_js", False):
-                minified_js = self._minify_inline_js(script_content)
-                return script_tag_start + minified_js + script_tag_end
+        return self._minify_markup(html).strip()
+
+    def _minify_markup(self, html: str) -> str:
+        """Stream through markup once, collapsing whitespace between tokens"""
+        out = []
+        pos = 0
+        pending_gap = None  # whitespace/comment run waiting for its right neighbour
+        protected_end = -1
+
+        for match in _MINIFY_TOKEN_RE.finditer(html):
+            start = match.start()
+
+            if start > pos:
+                if pending_gap:
+                    out.append(self._collapse_gap(html, pending_gap, protected_end))
+                    pending_gap = None
+                out.append(html[pos:start])
+
+            if match.group("gap") is not None:
+                pending_gap = match
             else:
-                script_content = re.sub(r"\s+", " ", script_content).strip()
-                return script_tag_start + script_content + script_tag_end
+                protected = match.group("protected") is not None
+                if pending_gap:
+                    out.append(
+                        self._collapse_gap(html, pending_gap, protected_end, protected)
+                    )
+                    pending_gap = None
+
+                if protected:
+                    out.append(match.group("protected"))
+                    protected_end = match.end()
+                else:
+                    out.append(
+                        self._minify_script(
+                            match.group("script"), match.group("script_body")
+                        )
+                    )
+
+            pos = match.end()
+
+        if pending_gap:
+            out.append(self._collapse_gap(html, pending_gap, protected_end))
+        out.append(html[pos:])
+
+        return "".join(out)
+
+    def _collapse_gap(
+        self,
+        html: str,
+        match: re.Match,
+        protected_end: int,
+        before_protected: bool = False,
+    ) -> str:
+        """Minify a run of whitespace and HTML comments between two tokens"""
+        start, end = match.span()
+        whitespace = match.group("gap")
+        if "<!--" in whitespace:
+            whitespace = _HTML_COMMENT_RE.sub("", whitespace)
+
+        # leading/trailing whitespace of the document
+        if start == 0 or end == len(html):
+            return ""
+
+        # whitespace between tags (protected blocks do not count as tags)
+        prev_char = html[start - 1] if start != protected_end else ""
+        next_char = html[end] if not before_protected else ""
+        if prev_char == ">" and next_char == "<":
+            return ""
 
-        flags = re.DOTALL | re.IGNORECASE
-        html = re.sub(script_pattern, minify_script_content, html, flags=flags)
+        # whitespace spanning lines is dropped entirely
+        if "\n" in whitespace:
+            return ""
+
+        return _MULTI_SPACE_RE.sub(" ", whitespace).replace("\t", "")
 
-        html = re.sub(r"\n+", "", html)
-        html = re.sub(r"\t+", "", html)
+    def _minify_script(self, script_tag_start: str, script_content: str) -> str:
+        """Minify an inline script element"""
+        script_tag_start = self._minify_markup(script_tag_start)
 
-        # FINALLY: Restore protected content
-        for placeholder, content in protected_content.items():
-            html = html.replace(placeholder, content)
+        # apply the markup whitespace rules inside the script, with the
+        # surrounding tag brackets as context for the line-based rules
+        script_content = _HTML_COMMENT_RE.sub("", f">{script_content}<")
+        script_content = re.sub(r">\s+<", "><", script_content)
+        script_content = re.sub(r"^\s+|\s+$", "", script_content, flags=re.MULTILINE)
+        script_content = _MULTI_SPACE_RE.sub(" ", script_content)[1:-1]
 
-        return html.strip()
+        if self.config.get("assets", {}).get("minify_js", False):
+            script_content = self._minify_inline_js(script_content)
+        else:
+            script_content = re.sub(r"\s+", " ", script_content).strip()
+
+        return script_tag_start + script_content + "</script>"
 
     def _minify_inline_js(self, js_content: str) -> str:
         """Minify inline JavaScript content"""
@@ -185,171 +407,310 @@ class TemplateRenderer:
 
     def render_posts(self, posts: List[Post]):
         """Render individual post pages"""
-        template = self.jinja_env.get_template("post.html")
-        output_base_dir = Path(self.config["build"]["output_dir"])
+        jobs = []
 
         for i, post in enumerate(posts):
             prev_post = posts[i - 1] if i > 0 else None
             next_post = posts[i + 1] if i < len(posts) - 1 else None
+            jobs.append(self.post_job(post, prev_post, next_post))
 
-            html = template.render(
-                post=post,
-                config=self.config,
-                prev_post=prev_post,
-                next_post=next_post,
-                current_year=datetime.datetime.now().year,
-                metadata=self.metadata_generator,
-            )
-
-            html = self._minify_html(html)
-
-            if post.category:
-                post_dir = output_base_dir / post.category / post.slug
-            else:
-                post_dir = output_base_dir / post.slug
-
-            post_dir.mkdir(parents=True, exist_ok=True)
-            output_file = post_dir / "index.html"
-
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(html)
-
-        minify_status = (
-            " (minified)"
-            if self.config.get("assets", {}).get("minify_html", False)
-            else ""
+        rendered = self._render_jobs(jobs)
+        print(
+            f"Rendered {self._count_status(rendered, len(posts))} posts{self._minify_status()}"
         )
-        print(f"Rendered {len(posts)} posts{minify_status}")
 
     def render_pages(self, pages: List[Page]):
         """Render static pages"""
-        template = self.jinja_env.get_template("page.html")
-        output_base_dir = Path(self.config["build"]["output_dir"])
+        jobs = [self.page_job(page) for page in pages]
 
-        for page in pages:
-            current_year = datetime.datetime.now().year
-            html = template.render(
-                page=page,
-                config=self.config,
-                current_year=current_year,
-                metadata=self.metadata_generator,
-            )
-
-            html = self._minify_html(html)
-
-            page_dir = output_base_dir / page.slug
-            page_dir.mkdir(parents=True, exist_ok=True)
-            output_file = page_dir / "index.html"
-
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(html)
-
-        minify_status = (
-            " (minified)"
-            if self.config.get("assets", {}).get("minify_html", False)
-            else ""
+        rendered = self._render_jobs(jobs)
+        print(
+            f"Rendered {self._count_status(rendered, len(pages))} pages{self._minify_status()}"
         )
-        print(f"Rendered {len(pages)} pages{minify_status}")
 
     def render_index(self, posts: List[Post]):
         """Render index page with paginated posts"""
-        template = self.jinja_env.get_template("index.html")
-        output_dir = Path(self.config["build"]["output_dir"])
         posts_per_page = self.config["build"].get("posts_per_page", 10)
 
         categories = sorted(set(post.category for post in posts if post.category))
 
         total_posts = len(posts)
         total_pages = (total_posts + posts_per_page - 1) // posts_per_page
+        jobs = []
 
         for page_num in range(1, total_pages + 1):
             start_idx = (page_num - 1) * posts_per_page
             end_idx = start_idx + posts_per_page
             page_posts = posts[start_idx:end_idx]
+            jobs.append(self.index_job(page_posts, categories, page_num, total_pages))
 
-            # pagination logic
-            if page_num == 1:
-                prev_url = None
-            elif page_num == 2:
-                prev_url = "/"
-            else:
-                prev_url = f"/page/{page_num - 1}/"
-
-            if page_num < total_pages:
-                next_url = f"/page/{page_num + 1}/"
-            else:
-                next_url = None
-
-            pagination = {
-                "current_page": page_num,
-                "total_pages": total_pages,
-                "prev_url": prev_url,
-                "next_url": next_url,
-            }
-
-            html = template.render(
-                posts=page_posts,
-                categories=categories,
-                pagination=pagination if total_pages > 1 else None,
-                config=self.config,
-                current_year=datetime.datetime.now().year,
-                metadata=self.metadata_generator,
-            )
-
-            html = self._minify_html(html)
-
-            if page_num == 1:
-                output_file = output_dir / "index.html"
-            else:
-                page_dir = output_dir / "page" / str(page_num)
-                page_dir.mkdir(parents=True, exist_ok=True)
-                output_file = page_dir / "index.html"
-
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(html)
-
-        minify_status = (
-            " (minified)"
-            if self.config.get("assets", {}).get("minify_html", False)
-            else ""
+        rendered = self._render_jobs(jobs)
+        print(
+            f"Rendered index with {self._count_status(rendered, total_pages)} "
+            f"page(s){self._minify_status()}"
         )
-        print(f"Rendered index with {total_pages} page(s){minify_status}")
 
     def render_category_pages(self, posts: List[Post]):
         """Render category pages using index.html template"""
-        template = self.jinja_env.get_template("index.html")
-        output_dir = Path(self.config["build"]["output_dir"])
-
         categories = sorted(set(post.category for post in posts if post.category))
+        jobs = []
 
         for category in categories:
             category_posts = [p for p in posts if p.category == category]
+            jobs.append(self.category_job(category, category_posts, categories))
 
-            temp_config = self.config.copy()
-            temp_config["site"] = temp_config["site"].copy()
-            temp_config["site"]["title"] = category
-
-            html = template.render(
-                posts=category_posts,
-                categories=categories,
-                pagination=None,
-                config=temp_config,
-                current_year=datetime.datetime.now().year,
-                metadata=self.metadata_generator,
-            )
+        rendered = self._render_jobs(jobs)
+        print(
+            f"Rendered {self._count_status(rendered, len(categories))} "
+            f"category page(s){self._minify_status()}"
+        )
+
+    def post_job(
+        self, post: Post, prev_post: Optional[Post], next_post: Optional[Post]
+    ) -> RenderJob:
+        """Render job for a post page between its neighbours"""
+        output_base_dir = Path(self.config["build"]["output_dir"])
 
-            html = self._minify_html(html)
+        if post.category:
+            post_dir = output_base_dir / post.category / post.slug
+        else:
+            post_dir = output_base_dir / post.slug
 
-            category_dir = output_dir / category
-            category_dir.mkdir(parents=True, exist_ok=True)
-            output_file = category_dir / "index.html"
+        context = {
+            "post": post,
+            "prev_post": prev_post,
+            "next_post": next_post,
+        }
+        return RenderJob("post.html", context, post_dir / "index.html")
 
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(html)
+    def page_job(self, page: Page) -> RenderJob:
+        """Render job for a static page"""
+        output_base_dir = Path(self.config["build"]["output_dir"])
 
-        minify_status = (
-            " (minified)"
-            if self.config.get("assets", {}).get("minify_html", False)
-            else ""
+        context = {
+            "page": page,
+        }
+        output_file = output_base_dir / page.slug / "index.html"
+        return RenderJob("page.html", context, output_file)
+
+    def index_job(
+        self,
+        page_posts: List[Post],
+        categories: List[str],
+        page_num: int,
+        total_pages: int,
+    ) -> RenderJob:
+        """Render job for one page of the paginated index"""
+        output_dir = Path(self.config["build"]["output_dir"])
+
+        # pagination logic
+        if page_num == 1:
+            prev_url = None
+        elif page_num == 2:
+            prev_url = "/"
+        else:
+            prev_url = f"/page/{page_num - 1}/"
+
+        if page_num < total_pages:
+            next_url = f"/page/{page_num + 1}/"
+        else:
+            next_url = None
+
+        pagination = {
+            "current_page": page_num,
+            "total_pages": total_pages,
+            "prev_url": prev_url,
+            "next_url": next_url,
+        }
+
+        if page_num == 1:
+            output_file = output_dir / "index.html"
+        else:
+            output_file = output_dir / "page" / str(page_num) / "index.html"
+
+        context = {
+            "posts": page_posts,
+            "categories": categories,
+            "pagination": pagination if total_pages > 1 else None,
+        }
+        return RenderJob("index.html", context, output_file)
+
+    def category_job(
+        self, category: str, category_posts: List[Post], categories: List[str]
+    ) -> RenderJob:
+        """Render job for a category page, titled after the category"""
+        output_dir = Path(self.config["build"]["output_dir"])
+
+        temp_config = self.config.copy()
+        temp_config["site"] = temp_config["site"].copy()
+        temp_config["site"]["title"] = category
+
+        context = {
+            "posts": category_posts,
+            "categories": categories,
+            "category": category,
+            "pagination": None,
+            "config": temp_config,
+        }
+        output_file = output_dir / category / "index.html"
+        return RenderJob("index.html", context, output_file)
+
+    def render_job(self, job: RenderJob):
+        """Render and write a single job now, bypassing the build manifest"""
+        self._write_output(
+            job.output_file, self._render_page(job.template, job.context)
         )
-        print(f"Rendered {len(categories)} category page(s){minify_status}")
+
+    def _render_jobs(self, jobs: List[RenderJob]) -> int:
+        """Render and write jobs, skipping outputs whose inputs are unchanged"""
+        pending = []
+        # inputs every job shares, fingerprinted once per batch
+        shared = self._shared_inputs() if self.build_manifest is not None else {}
+
+        for job in jobs:
+            inputs = None
+            if self.build_manifest is not None:
+                inputs = self._job_inputs(job, shared)
+                if self.build_manifest.is_fresh(job.output_file, inputs):
+                    continue
+            pending.append((job, inputs))
+
+        workers = min(resolve_workers(self.config), len(pending))
+        if workers > 1:
+            contexts = [(job.template, job.context) for job, _ in pending]
+            chunksize = max(1, len(contexts) // (workers * 4))
+            pages = self._get_pool(workers).map(
+                _render_in_worker, contexts, chunksize=chunksize
+            )
+        else:
+            pages = (self._render_page(job.template, job.context) for job, _ in pending)
+
+        # write in the parent so output order and manifest updates stay serial
+        for (job, inputs), html in zip(pending, pages):
+            self._write_output(job.output_file, html)
+            if inputs is not None:
+                self.build_manifest.record(job.output_file, inputs)
+
+        return len(pending)
+
+    def _render_page(self, template_name: str, context: Dict[str, Any]) -> str:
+        """Render a template with context and minify the result"""
+        template = self.jinja_env.get_template(template_name)
+        return self._minify_html(template.render(**context))
+
+    def _get_pool(self, workers: int) -> ProcessPoolExecutor:
+        """Start the render worker pool, loading the Jinja environment once per worker"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_render_worker,
+                initargs=(self.config, self.asset_manifest, self.image_dimensions),
+            )
+        return self._pool
+
+    def shutdown_workers(self):
+        """Stop the render worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _write_output(self, output_file: Path, html: str):
+        """Write rendered HTML to the output file"""
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(html)
+
+    def _shared_inputs(self) -> Dict[str, str]:
+        """Fingerprint inputs shared by every render job"""
+        return {
+            "assets:manifest": fingerprint(
+                [self.asset_manifest, self.image_dimensions]
+            ),
+            "config": config_fingerprint(self.config),
+            "context:current_year": fingerprint(self.jinja_env.globals["current_year"]),
+        }
+
+    def _job_inputs(self, job: RenderJob, shared: Dict[str, str]) -> Dict[str, str]:
+        """Collect input fingerprints for a render job"""
+        inputs = dict(self._template_inputs(job.template))
+        inputs.update(shared)
+        sources = self.build_manifest.source_fingerprint
+
+        for key, value in job.context.items():
+            if key == "metadata":
+                continue
+            if key == "config":
+                inputs["config"] = config_fingerprint(value)
+            elif isinstance(value, (Post, Page)):
+                inputs[f"source:{value.file_path}"] = sources(value)
+                inputs[f"context:{key}"] = value.file_path
+            elif isinstance(value, list) and all(
+                isinstance(item, (Post, Page)) for item in value
+            ):
+                for item in value:
+                    inputs[f"source:{item.file_path}"] = sources(item)
+                inputs[f"context:{key}"] = fingerprint([i.file_path for i in value])
+            else:
+                inputs[f"context:{key}"] = fingerprint(value)
+
+        return inputs
+
+    def _template_inputs(self, name: str) -> Dict[str, str]:
+        """Fingerprint a template and every template it extends or includes"""
+        if name in self._template_inputs_cache:
+            return self._template_inputs_cache[name]
+
+        inputs = {}
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            if f"template:{current}" in inputs:
+                continue
+
+            source, _, _ = self.source_loader.get_source(self.jinja_env, current)
+            inputs[f"template:{current}"] = fingerprint(source)
+
+            referenced = meta.find_referenced_templates(self.jinja_env.parse(source))
+            for ref in referenced:
+                if ref is None:
+                    # dynamic template name, depend on every template
+                    pending.extend(self.source_loader.list_templates())
+                else:
+                    pending.append(ref)
+
+        self._template_inputs_cache[name] = inputs
+        return inputs
+
+    def _count_status(self, rendered: int, total: int) -> str:
+        """Format rendered count, noting skipped outputs in incremental builds"""
+        if rendered == total:
+            return str(total)
+        return f"{rendered} of {total}"
+
+    def _minify_status(self) -> str:
+        """Suffix for render messages when HTML is minified"""
+        if self.config.get("assets", {}).get("minify_html", False):
+            return " (minified)"
+        return ""
+
+
+# renderer owned by each render worker process
+_worker_renderer: Optional[TemplateRenderer] = None
+
+
+def _init_render_worker(
+    config: Dict[str, Any],
+    asset_manifest: Dict[str, str],
+    image_dimensions: Dict[str, Any],
+):
+    """Create the worker's renderer and Jinja environment once"""
+    global _worker_renderer
+    _worker_renderer = TemplateRenderer(config)
+    _worker_renderer.asset_manifest = asset_manifest
+    _worker_renderer.image_dimensions = image_dimensions
+
+
+def _render_in_worker(job: Tuple[str, Dict[str, Any]]) -> str:
+    """Render one page in a worker process"""
+    template_name, context = job
+    return _worker_renderer._render_page(template_name, context)
@@ -0,0 +1,17 @@
+"""
+Worker pool sizing
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+
+def resolve_workers(config: Dict[str, Any], override: Optional[int] = None) -> int:
+    """Number of worker processes from an override, then build.workers (0 = all CPUs)"""
+    workers = override
+    if workers is None:
+        workers = config["build"].get("workers", 1)
+    workers = int(workers or 0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark for feed generation
+Compares the streaming feed writer against the previous feedgen/lxml path on
+synthetic posts and reports time, peak Python memory and output size.
+"""
+
+import argparse
+import datetime
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import core.blog  # noqa: E402,F401
+from core.blog.content import Post  # noqa: E402
+from core.blog.feeds import FeedWriter  # noqa: E402
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do tempor".split()
+
+
+def make_posts(count: int, seed: int = 42):
+    """Generate posts with a few HTML paragraphs each"""
+    rng = random.Random(seed)
+    posts = []
+    for i in range(count):
+        paragraphs = [
+            "<p>" + " ".join(rng.choice(WORDS) for _ in range(60)) + " &amp; more</p>"
+            for _ in range(rng.randint(3, 8))
+        ]
+        posts.append(
+            Post(
+                title=f"Post {i} <{rng.choice(WORDS)}>",
+                content="\n\n".join(paragraphs),
+                date=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+                + datetime.timedelta(hours=i),
+                url=f"/post-{i}/",
+                file_path=f"post-{i}.md",
+                slug=f"post-{i}",
+                category=rng.choice(["music", "tools"]),
+            )
+        )
+    posts.reverse()
+    return posts
+
+
+def feedgen_rss(config, posts, output_dir: Path):
+    """The feedgen implementation RSSGenerator used before the streaming writer"""
+    from feedgen.feed import FeedGenerator
+
+    fg = FeedGenerator()
+    fg.title(config["rss"]["title"])
+    fg.link(href=config["site"]["url"], rel="alternate")
+    fg.description(config["rss"]["description"])
+    fg.language(config["site"]["language"])
+    fg.author(name=config["site"]["author"], email=config["site"]["email"])
+
+    for post in posts:
+        fe = fg.add_entry()
+        fe.title(post.title)
+        fe.link(href=f"{config['site']['url']}{post.url}")
+        fe.description(post.excerpt or post.content[:500])
+        fe.author(name=post.author or config["site"]["author"])
+        fe.pubDate(post.date)
+        fe.guid(f"{config['site']['url']}{post.url}")
+
+    with open(output_dir / "rss.xml", "wb") as f:
+        f.write(fg.rss_str(pretty=True))
+    return ["rss.xml"]
+
+
+def measure(label: str, func, output_dir: Path, repeat: int):
+    """Print the best time, peak traced memory and output size of func"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        written = func(output_dir)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(output_dir)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = sum((output_dir / name).stat().st_size for name in written)
+    print(
+        f"  {label:<28} {min(timings) * 1000:>9.1f} ms  "
+        f"peak {peak / 1024 / 1024:>7.2f} MB  {size / 1024:>9,.1f} KB"
+    )
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark feed generation")
+    parser.add_argument("--entries", "-n", type=int, default=10000, help="Feed entries")
+    parser.add_argument(
+        "--repeat", "-r", type=int, default=3, help="Timing repetitions"
+    )
+    args = parser.parse_args()
+
+    config = {
+        "site": {
+            "title": "Bench",
+            "description": "Feed benchmark",
+            "url": "https://example.com",
+            "author": "Bench Author",
+            "email": "bench@example.com",
+            "language": "en",
+        },
+        "rss": {
+            "title": "Bench",
+            "description": "Feed benchmark",
+            "max_items": args.entries,
+        },
+    }
+    posts = make_posts(args.entries)
+
+    # lxml allocates outside the Python allocator, so feedgen's peak is understated
+    print(f"{args.entries:,} entries (best of {args.repeat})")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_dir = Path(temp_dir)
+
+        start = time.perf_counter()
+        import feedgen.feed  # noqa: F401
+
+        print(
+            f"  {'feedgen import':<28} {(time.perf_counter() - start) * 1000:>9.1f} ms"
+        )
+        measure(
+            "feedgen rss",
+            lambda out: feedgen_rss(config, posts, out),
+            output_dir,
+            args.repeat,
+        )
+
+        cases = [
+            ("streaming rss", ["rss"], False),
+            ("streaming rss+atom+json", ["rss", "atom", "json"], False),
+            ("streaming rss full content", ["rss"], True),
+        ]
+        for label, formats, full_content in cases:
+            config["rss"]["formats"] = formats
+            config["rss"]["full_content"] = full_content
+            writer = FeedWriter(config)
+            measure(
+                label, lambda out: writer.write(posts, out), output_dir, args.repeat
+            )
+
+
+if __name__ == "__main__":
+    main()
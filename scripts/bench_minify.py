@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for TemplateRenderer._minify_html
+Compares the single-pass minifier with the previous placeholder/replace version
+on a large generated post with many code blocks.
+"""
+
+import argparse
+import re
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import core.blog  # noqa: E402,F401
+from core.utils.template_renderer import TemplateRenderer  # noqa: E402
+
+
+def legacy_minify_html(renderer: TemplateRenderer, html: str) -> str:
+    """Previous implementation: protect blocks with placeholders, then regex passes"""
+    protected_content = {}
+    counter = 0
+
+    for tag in ["pre", "code", "style"]:
+        pattern = f"<{tag}[^>]*?>.*?</{tag}>"
+        matches = re.finditer(pattern, html, re.DOTALL | re.IGNORECASE)
+        for match in matches:
+            placeholder = f"__PROTECTED_CONTENT_{counter}__"
+            protected_content[placeholder] = match.group(0)
+            html = html.replace(match.group(0), placeholder)
+            counter += 1
+
+    html = re.sub(r"<!--(?!\[if).*?-->", "", html, flags=re.DOTALL)
+    html = re.sub(r">\s+<", "><", html)
+    html = re.sub(r"^\s+|\s+$", "", html, flags=re.MULTILINE)
+    html = re.sub(r" {2,}", " ", html)
+
+    def minify_script_content(match):
+        script_tag_start = match.group(0).split(">")[0] + ">"
+        return (
+            script_tag_start + renderer._minify_inline_js(match.group(1)) + "</script>"
+        )
+
+    flags = re.DOTALL | re.IGNORECASE
+    html = re.sub(
+        r"<script(?:[^>]*)>(.*?)</script>", minify_script_content, html, flags=flags
+    )
+
+    html = re.sub(r"\n+", "", html)
+    html = re.sub(r"\t+", "", html)
+
+    for placeholder, content in protected_content.items():
+        html = html.replace(placeholder, content)
+
+    return html.strip()
+
+
+def generate_post(code_blocks: int) -> str:
+    """Generate a post page with prose, inline code and highlighted code blocks"""
+    sections = []
+    for i in range(code_blocks):
+        section = f"""
+        <h2 id="step-{i}">Step {i}</h2>
+        <!-- section {i} -->
+        <p>
+            Run <code>make build-{i}</code> and   check the   output
+            before moving on to the next step.
+        </p>
+        <div class="codehilite"><pre><span></span><code><span class="k">def</span> step_{i}():
+    <span class="n">value</span> = {i}
+        <span class="k">return</span> value  *  2
+</code></pre></div>
+"""
+        sections.append(section)
+
+    return f"""<!DOCTYPE html>
+<html>
+  <head>
+    <style>
+      body {{ margin: 0; }}
+    </style>
+    <script>
+      const savedTheme = localStorage.getItem('theme') || 'dark';
+      document.documentElement.setAttribute('data-theme', savedTheme);
+    </script>
+  </head>
+  <body>
+    <article class="post">
+      {"".join(sections)}
+    </article>
+  </body>
+</html>
+"""
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark HTML minification")
+    parser.add_argument(
+        "--blocks", "-b", type=int, default=500, help="Code blocks in the post"
+    )
+    parser.add_argument(
+        "--repeat", "-r", type=int, default=5, help="Timing repetitions"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        renderer = TemplateRenderer(
+            {
+                "site": {"url": "http://localhost"},
+                "build": {"template_dir": temp_dir, "output_dir": temp_dir},
+                "assets": {"minify_html": True, "minify_js": True},
+            }
+        )
+
+        html = generate_post(args.blocks)
+        old_output = legacy_minify_html(renderer, html)
+        new_output = renderer._minify_html(html)
+
+        old_time = min(
+            timeit.repeat(
+                lambda: legacy_minify_html(renderer, html), number=1, repeat=args.repeat
+            )
+        )
+        new_time = min(
+            timeit.repeat(
+                lambda: renderer._minify_html(html), number=1, repeat=args.repeat
+            )
+        )
+
+    print(f"Input: {len(html):,} bytes, {args.blocks} code blocks")
+    print(f"Output: old {len(old_output):,} bytes, new {len(new_output):,} bytes")
+    print(f"Identical output: {old_output == new_output}")
+    print(f"Old minifier: {old_time * 1000:.1f} ms")
+    print(f"New minifier: {new_time * 1000:.1f} ms")
+    print(f"Speedup: {old_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
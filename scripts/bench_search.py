@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the search index
+Builds indexes for synthetic corpora and reports per-tier size, build time and
+query latency for BM25 and typo-tolerant trigram queries.
+"""
+
+import argparse
+import datetime
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import core.blog  # noqa: E402,F401
+from core.blog.content import Post  # noqa: E402
+from core.blog.search import SearchIndexer  # noqa: E402
+from core.blog.search_query import SearchIndex  # noqa: E402
+
+SYLLABLES = "ka ro mi ten sol ar ve lin dor pu ex gra".split()
+
+
+def make_vocabulary(rng: random.Random, size: int):
+    """Generate pseudo-words from syllables"""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_posts(count: int, seed: int = 42):
+    """Generate posts with titles, headings and paragraphs of pseudo-words"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng, 5000)
+    posts = []
+
+    for i in range(count):
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 7)))
+        sections = []
+        for h in range(rng.randint(2, 5)):
+            heading = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(2, 4)))
+            body = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(40, 120)))
+            sections.append(f'<h2 id="section-{h}">{heading}</h2>\n<p>{body}</p>')
+
+        posts.append(
+            Post(
+                title=title,
+                content="\n".join(sections),
+                date=datetime.datetime(2024, 1, 1) + datetime.timedelta(days=i),
+                url=f"/post-{i}/",
+                file_path=f"post-{i}.md",
+                slug=f"post-{i}",
+            )
+        )
+    return posts
+
+
+def make_typo(word: str, rng: random.Random) -> str:
+    """Swap two adjacent letters"""
+    if len(word) < 3:
+        return word
+    chars = list(word)
+    i = rng.randrange(len(chars) - 1)
+    chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def time_queries(search, queries, repeat: int):
+    """Return (mean, p95) latency in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return sum(timings) / len(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def tier_size(path: Path) -> int:
+    """Total bytes of a file or directory"""
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the search index")
+    parser.add_argument(
+        "--docs", "-d", type=int, nargs="+", default=[1000, 10000], help="Corpus sizes"
+    )
+    parser.add_argument(
+        "--queries", "-q", type=int, default=50, help="Queries per query type"
+    )
+    parser.add_argument(
+        "--repeat", "-r", type=int, default=5, help="Timing repetitions"
+    )
+    args = parser.parse_args()
+
+    for count in args.docs:
+        posts = make_posts(count)
+        rng = random.Random(count)
+        samples = rng.sample(range(count), args.queries)
+        exact = [" ".join(posts[doc].title.split()[:2]) for doc in samples]
+        # first two title words with a typo in the first
+        typos = []
+        for doc in samples:
+            first, second = posts[doc].title.split()[:2]
+            typos.append(f"{make_typo(first, rng)} {second}")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = {
+                "build": {"output_dir": temp_dir},
+                "search": {"trigrams": True},
+            }
+
+            start = time.perf_counter()
+            SearchIndexer(config).generate(posts, [])
+            build_time = time.perf_counter() - start
+
+            search_dir = Path(temp_dir) / "search"
+            index = SearchIndex(search_dir)
+            index.load_all()
+            index.load_trigrams()
+
+            bm25 = time_queries(lambda q: index.ranked_search(q), exact, args.repeat)
+            fuzzy = time_queries(lambda q: index.fuzzy_search(q), typos, args.repeat)
+            found = sum(
+                any(r.doc == doc for r in index.fuzzy_search(typo))
+                for doc, typo in zip(samples, typos)
+            )
+
+            print(f"\n{count:,} documents (built in {build_time:.2f} s)")
+            for tier in ["index.json", "terms", "bodies", "trigrams.json"]:
+                print(f"  {tier:<14} {tier_size(search_dir / tier) / 1024:>10,.1f} KB")
+            print(f"  BM25 query     mean {bm25[0]:.3f} ms, p95 {bm25[1]:.3f} ms")
+            print(f"  Trigram query  mean {fuzzy[0]:.3f} ms, p95 {fuzzy[1]:.3f} ms")
+            print(f"  Typo recall    {found}/{len(typos)} in top 8")
+
+
+if __name__ == "__main__":
+    main()
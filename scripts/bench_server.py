@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Load generator for the development server
+Serves a synthetic page with its assets (or an existing output directory) from
+a separate process and reports requests per second and latency percentiles for
+the single-threaded HTTP/1.0 server DevServer used before, the pooled
+keep-alive DevHTTPServer, and DevHTTPServer serving from its in-memory cache.
+"""
+
+import argparse
+import http.client
+import http.server
+import multiprocessing
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import core.blog  # noqa: E402,F401
+from core.dev.livereload import page_url  # noqa: E402
+from core.dev.server import (  # noqa: E402
+    DEFAULT_WORKERS,
+    DevHTTPServer,
+    DevRequestHandler,
+    ResponseCache,
+)
+
+
+class LegacyServer(socketserver.TCPServer):
+    """The server DevServer used before: one connection at a time over HTTP/1.0"""
+
+    allow_reuse_address = True
+
+
+class QuietLegacyHandler(http.server.SimpleHTTPRequestHandler):
+    """The handler DevServer used before, without the request log"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietHandler(DevRequestHandler):
+    """DevRequestHandler without the request log"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_site(output_dir: Path) -> list:
+    """Write a page, its stylesheets and scripts and one large image"""
+    urls = ["/"]
+    assets = []
+    for i in range(8):
+        (output_dir / f"style-{i}.css").write_text("body{margin:0}\n" * 400)
+        (output_dir / f"app-{i}.js").write_text("console.log(1);\n" * 400)
+        urls += [f"/style-{i}.css", f"/app-{i}.js"]
+        assets.append(f'<link rel="stylesheet" href="/style-{i}.css">')
+        assets.append(f'<script src="/app-{i}.js"></script>')
+    (output_dir / "hero.jpg").write_bytes(os.urandom(2 * 1024 * 1024))
+    urls.append("/hero.jpg")
+    (output_dir / "index.html").write_text(
+        "<html><head>"
+        + "".join(assets)
+        + "</head><body>"
+        + "<p>post</p>" * 2000
+        + "</body></html>"
+    )
+    return urls
+
+
+def site_urls(output_dir: Path, limit: int = 50) -> list:
+    """Pick pages and assets from an existing output directory"""
+    files = (path for path in sorted(output_dir.rglob("*")) if path.is_file())
+    return [page_url(path.relative_to(output_dir).as_posix()) for path in files][:limit]
+
+
+def run_server(mode: str, directory: str, workers: int, port, ready):
+    """Serve the directory until terminated (runs in a child process)"""
+    # the request log would dominate the measurement
+    if mode == "legacy":
+        handler = partial(QuietLegacyHandler, directory=directory)
+        httpd = LegacyServer(("127.0.0.1", 0), handler)
+    else:
+        cache = ResponseCache(256 * 1024 * 1024) if mode == "cached" else None
+        handler = partial(QuietHandler, directory=directory, cache=cache)
+        httpd = DevHTTPServer(("127.0.0.1", 0), handler, workers=workers)
+    port.value = httpd.server_address[1]
+    ready.set()
+    httpd.serve_forever()
+
+
+def client(port: int, urls: list, deadline: float, latencies: list, errors: list):
+    """Fetch the urls in a loop until the deadline, reusing the connection"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.perf_counter() < deadline:
+        for url in urls:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", url)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                errors.append(url)
+                conn.close()
+                continue
+            latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def measure(mode: str, directory: str, urls: list, args) -> None:
+    """Start a server and print throughput and latency under concurrent clients"""
+    port = multiprocessing.Value("i", 0)
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=run_server,
+        args=(mode, directory, args.workers, port, ready),
+        daemon=True,
+    )
+    server.start()
+    ready.wait(10)
+
+    latencies: list = []
+    errors: list = []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(
+            target=client, args=(port.value, urls, deadline, latencies, errors)
+        )
+        for _ in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    server.terminate()
+    server.join()
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(
+        f"  {mode:<8} {len(latencies) / elapsed:>9.1f} req/s  "
+        f"p50 {percentile(0.50):>8.1f} ms  p99 {percentile(0.99):>8.1f} ms  "
+        f"max {latencies[-1] * 1000:>8.1f} ms  {len(errors)} error(s)"
+    )
+
+
+def main():
+    """Run the load test"""
+    parser = argparse.ArgumentParser(description="Load test the development server")
+    parser.add_argument("--dir", help="Serve an existing output directory")
+    parser.add_argument(
+        "--clients", "-c", type=int, default=16, help="Concurrent connections"
+    )
+    parser.add_argument(
+        "--duration", "-d", type=float, default=5.0, help="Seconds per server"
+    )
+    parser.add_argument(
+        "--workers", "-w", type=int, default=DEFAULT_WORKERS, help="Server workers"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.dir:
+            directory = args.dir
+            urls = site_urls(Path(directory))
+        else:
+            directory = temp_dir
+            urls = make_site(Path(directory))
+
+        print(
+            f"{len(urls)} url(s), {args.clients} client(s), {args.duration:.0f}s each, "
+            f"{args.workers} worker(s)"
+        )
+        for mode in ("legacy", "pooled", "cached"):
+            measure(mode, directory, urls, args)
+
+
+if __name__ == "__main__":
+    main()
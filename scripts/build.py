@@ -23,6 +23,17 @@ def main():
     parser.add_argument(
         "--no-clean", action="store_true", help="Don't clean output directory"
     )
+    parser.add_argument(
+        "--incremental",
+        "-i",
+        action="store_true",
+        help="Only rebuild outputs whose inputs changed",
+    )
+    parser.add_argument(
+        "--compile-templates",
+        action="store_true",
+        help="Precompile templates into the build cache before building",
+    )
     parser.add_argument(
         "--serve",
         "-s",
@@ -32,6 +43,23 @@ def main():
     parser.add_argument(
         "--port", "-p", type=int, default=8000, help="Port for local server"
     )
+    parser.add_argument(
+        "--on-demand",
+        action="store_true",
+        help="Serve without building, rendering pages when requested (dev.on_demand)",
+    )
+    parser.add_argument(
+        "--no-watch",
+        action="store_true",
+        help="Don't rebuild on source changes while serving (dev.watch)",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Worker processes for parsing and rendering (0 = all CPUs)",
+    )
 
     args = parser.parse_args()
 
@@ -39,13 +67,41 @@ def main():
         # Initialize generator
         generator = BlogGenerator(args.config)
 
+        # Command line settings outlive config reloads while serving
+        # Override worker count from the command line
+        if args.jobs is not None:
+            generator.override("build", "workers", args.jobs)
+
+        # Precompile templates and render from the compiled modules; the
+        # renderer shares generator.config and switches over once compiled
+        if args.compile_templates:
+            if not generator.config.get("cache", {}).get("enabled", False):
+                print("--compile-templates needs the build cache (cache.enabled)")
+                sys.exit(1)
+            generator.override("cache", "precompiled_templates", True)
+            generator.template_renderer.compile_templates()
+
+        # Watch mode rebuilds on top of an incremental build
+        if args.no_watch:
+            generator.override("dev", "watch", False)
+        watch = args.serve and generator.config.get("dev", {}).get("watch", False)
+
+        # On-demand serving renders pages from source instead of building
+        if args.on_demand:
+            generator.override("dev", "on_demand", True)
+            args.serve = True
+        on_demand = args.serve and generator.config.get("dev", {}).get("on_demand")
+
         # Build the site
-        generator.build(clean=not args.no_clean)
+        if not on_demand:
+            generator.build(
+                clean=not args.no_clean, incremental=args.incremental or watch or None
+            )
 
         # Serve locally if requested
         if args.serve:
             server = DevServer(generator.config)
-            server.serve(port=args.port)
+            server.serve(port=args.port, generator=generator)
 
     except KeyboardInterrupt:
         print("\nBuild interrupted by user.")
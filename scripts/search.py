@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Query the built search index from the command line
+Prints ranked results with per-query latency, or benchmarks a file of queries
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.blog.search_query import SearchIndex  # noqa: E402
+
+
+def load_index(args) -> SearchIndex:
+    """Open the index from --index or the configured output directory"""
+    if args.index:
+        return SearchIndex(Path(args.index))
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    return SearchIndex.from_config(config)
+
+
+def run_queries(index: SearchIndex, queries, limit: int):
+    """Print ranked results and latency for each query"""
+    for query in queries:
+        start = time.perf_counter()
+        results = index.search(query, limit=limit)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        print(f"\n{query!r}: {len(results)} result(s) in {elapsed:.2f} ms")
+        for rank, result in enumerate(results, 1):
+            print(f"  {rank}. [{result.score:.3f}] {result.title} ({result.url})")
+
+
+def run_benchmark(index: SearchIndex, queries, limit: int, repeat: int):
+    """Time every query over warm shards and print latency percentiles"""
+    index.load_all()
+
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, limit=limit)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    total = sum(timings) / 1000
+    print(f"Queries: {len(queries)} x {repeat} = {len(timings)}")
+    print(f"Mean latency: {statistics.mean(timings):.3f} ms")
+    print(f"p50 latency: {timings[len(timings) // 2]:.3f} ms")
+    print(f"p95 latency: {timings[int(len(timings) * 0.95) - 1]:.3f} ms")
+    print(f"Throughput: {len(timings) / total:.0f} queries/s")
+
+
+def main():
+    """Main entry point for the search CLI"""
+    parser = argparse.ArgumentParser(description="Query the search index")
+    parser.add_argument("queries", nargs="*", help="Queries to run")
+    parser.add_argument(
+        "--config", "-c", default="config/config.yaml", help="Config file path"
+    )
+    parser.add_argument(
+        "--index", "-i", default=None, help="Search index directory (output/search)"
+    )
+    parser.add_argument("--limit", "-n", type=int, default=8, help="Results per query")
+    parser.add_argument(
+        "--bench",
+        "-b",
+        default=None,
+        help="Benchmark queries from a file, one per line",
+    )
+    parser.add_argument(
+        "--repeat", "-r", type=int, default=10, help="Benchmark repetitions"
+    )
+    args = parser.parse_args()
+
+    try:
+        tracemalloc.start()
+        index = load_index(args)
+        index.load_all()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    except FileNotFoundError as e:
+        print(f"Search index not found: {e.filename} (run a build first)")
+        sys.exit(1)
+
+    print(
+        f"Index: {len(index.docs)} documents, {index.term_count} terms in "
+        f"{len(index.shard_names)} shard(s), {memory / 1024 / 1024:.2f} MB in memory"
+    )
+
+    if args.bench:
+        queries = [
+            line.strip()
+            for line in Path(args.bench).read_text(encoding="utf-8").splitlines()
+            if line.strip()
+        ]
+        run_benchmark(index, queries, args.limit, args.repeat)
+    elif args.queries:
+        run_queries(index, args.queries, args.limit)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -214,3 +214,194 @@ class TestAssetProcessor:
                     asset_processor._process_icons(Path("static"), Path("output"))
 
         assert "icons/icon.png" in asset_processor.asset_manifest
+
+    def test_parallel_image_conversion_matches_serial(self, mock_config, tmp_path):
+        from PIL import Image
+
+        images_dir = tmp_path / "static" / "images"
+        (images_dir / "nested").mkdir(parents=True)
+        for i, name in enumerate(["b.png", "a.jpg", "nested/c.png", "d.gif"]):
+            fmt = {".png": "PNG", ".jpg": "JPEG", ".gif": "GIF"}[Path(name).suffix]
+            Image.new("RGB", (10 + i, 20), (i * 40, 0, 0)).save(images_dir / name, fmt)
+
+        results = {}
+        for workers in (1, 2):
+            mock_config["assets"]["image_workers"] = workers
+            output_assets = tmp_path / f"out-{workers}"
+            processor = AssetProcessor(mock_config)
+            processor._process_images(tmp_path / "static", output_assets)
+            results[workers] = (
+                list(processor.asset_manifest.items()),
+                processor.image_dimensions,
+                {
+                    p.relative_to(output_assets).as_posix(): p.read_bytes()
+                    for p in output_assets.rglob("*")
+                    if p.is_file()
+                },
+            )
+
+        assert results[1] == results[2]
+        manifest, dimensions, files = results[2]
+        assert [key for key, _ in manifest] == [
+            "images/a.jpg",
+            "images/b.png",
+            "images/d.gif",
+            "images/nested/c.png",
+        ]
+        assert dimensions["images/nested/c.webp"] == {"width": 12, "height": 20}
+        assert "images/d.gif" in files
+
+    def test_image_workers_default_to_build_workers(self, asset_processor):
+        asset_processor.config["build"]["workers"] = 3
+        assert asset_processor._get_image_workers() == 3
+
+        asset_processor.config["assets"]["image_workers"] = 2
+        assert asset_processor._get_image_workers() == 2
+
+    def test_image_cache(self, mock_config, tmp_path):
+        from PIL import Image
+
+        images_dir = tmp_path / "static" / "images"
+        images_dir.mkdir(parents=True)
+        Image.new("RGB", (30, 20), (200, 0, 0)).save(images_dir / "a.png", "PNG")
+        mock_config["cache"] = {"enabled": True, "dir": str(tmp_path / "cache")}
+
+        processor = AssetProcessor(mock_config)
+        processor._process_images(tmp_path / "static", tmp_path / "out-1")
+        assert (processor.image_cache.hits, processor.image_cache.misses) == (0, 1)
+
+        # warm build copies the cached conversion without encoding
+        processor = AssetProcessor(mock_config)
+        with patch("core.blog.assets.convert_image") as mock_convert:
+            processor._process_images(tmp_path / "static", tmp_path / "out-2")
+        mock_convert.assert_not_called()
+        assert (processor.image_cache.hits, processor.image_cache.misses) == (1, 0)
+        assert processor.image_dimensions["images/a.webp"] == {
+            "width": 30,
+            "height": 20,
+        }
+        assert (tmp_path / "out-2" / "images" / "a.webp").read_bytes() == (
+            tmp_path / "out-1" / "images" / "a.webp"
+        ).read_bytes()
+
+        # changing encoder settings misses the cache
+        mock_config["assets"]["webp_quality"] = 50
+        processor = AssetProcessor(mock_config)
+        processor._process_images(tmp_path / "static", tmp_path / "out-3")
+        assert processor.image_cache.misses == 1
+
+    def test_stable_hash_ignores_build_timestamp(self, mock_config):
+        first = AssetProcessor(mock_config)
+        second = AssetProcessor(mock_config)
+        second.build_timestamp = "1"
+        assert first._generate_hash("content") == second._generate_hash("content")
+        assert first._generate_hash("content") != first._generate_hash("other")
+
+        mock_config["assets"]["stable_hash"] = False
+        assert first._generate_hash("content") != second._generate_hash("content")
+
+    def test_report_manifest_changes(self, mock_config, tmp_path, capsys):
+        mock_config["cache"] = {"enabled": True, "dir": str(tmp_path / "cache")}
+        processor = AssetProcessor(mock_config)
+        processor.asset_manifest = {
+            "css/main.css": "css/main-aaaa.css",
+            "js/main.js": "js/main-bbbb.js",
+            "images/old.png": "images/old.webp",
+        }
+        assert processor._report_manifest_changes() == {}
+
+        processor.asset_manifest = {
+            "css/main.css": "css/main-cccc.css",
+            "js/main.js": "js/main-bbbb.js",
+            "images/new.png": "images/new.webp",
+        }
+        changes = processor._report_manifest_changes()
+
+        assert changes == {
+            "added": ["images/new.png"],
+            "removed": ["images/old.png"],
+            "changed": ["css/main.css"],
+        }
+        out = capsys.readouterr().out
+        assert "1 unchanged, 1 changed, 1 added, 1 removed" in out
+        assert "css/main-aaaa.css -> css/main-cccc.css" in out
+
+    def test_responsive_variants(self, mock_config, tmp_path):
+        from PIL import Image
+
+        images_dir = tmp_path / "static" / "images"
+        images_dir.mkdir(parents=True)
+        Image.new("RGB", (1000, 500), (0, 0, 200)).save(images_dir / "wide.jpg", "JPEG")
+        Image.new("RGB", (300, 300), (0, 200, 0)).save(images_dir / "small.png", "PNG")
+        mock_config["assets"]["responsive_widths"] = [960, 480, 2000]
+        mock_config["assets"]["avif"] = True
+
+        processor = AssetProcessor(mock_config)
+        output_assets = tmp_path / "output" / "_sync"
+        processor._process_images(tmp_path / "static", output_assets)
+
+        dims = processor.image_dimensions
+        assert dims["images/wide.webp"]["variants"] == [
+            "images/wide-480w.webp",
+            "images/wide-960w.webp",
+            "images/wide-480w.avif",
+            "images/wide-960w.avif",
+            "images/wide.avif",
+        ]
+        assert dims["images/wide-480w.webp"] == {"width": 480, "height": 240}
+        assert dims["images/wide.avif"] == {"width": 1000, "height": 500}
+        assert (
+            processor.asset_manifest["images/wide-960w.avif"] == "images/wide-960w.avif"
+        )
+        with Image.open(output_assets / "images" / "wide-960w.webp") as img:
+            assert img.size == (960, 480)
+
+        # images narrower than every breakpoint only get the full-size AVIF
+        assert dims["images/small.webp"]["variants"] == ["images/small.avif"]
+
+    def test_failed_conversions_are_left_out(self, mock_config, tmp_path):
+        from PIL import Image
+
+        from core.blog.assets import convert_image
+
+        images_dir = tmp_path / "static" / "images"
+        images_dir.mkdir(parents=True)
+        Image.new("RGB", (1000, 500)).save(images_dir / "wide.jpg", "JPEG")
+        Image.new("RGB", (300, 300)).save(images_dir / "broken.png", "PNG")
+        mock_config["assets"]["responsive_widths"] = [480]
+        mock_config["assets"]["avif"] = True
+        mock_config["assets"]["image_workers"] = 1
+
+        def failing(job):
+            if job.fmt == "AVIF" or job.source.name == "broken.png":
+                return None
+            return convert_image(job)
+
+        processor = AssetProcessor(mock_config)
+        output_assets = tmp_path / "output" / "_sync"
+        with patch("core.blog.assets.convert_image", side_effect=failing):
+            processor._process_images(tmp_path / "static", output_assets)
+
+        dims = processor.image_dimensions
+        assert dims["images/wide.webp"]["variants"] == ["images/wide-480w.webp"]
+        assert not list(output_assets.rglob("*.avif"))
+        assert not any(name.endswith(".avif") for name in processor.asset_manifest)
+
+        # a failed primary conversion is copied in its own format, without variants
+        assert processor.asset_manifest["images/broken.png"] == "images/broken.png"
+        assert dims["images/broken.png"] == {"width": 300, "height": 300}
+        assert (output_assets / "images" / "broken.png").exists()
+        assert not list(output_assets.rglob("broken*.webp"))
+
+    def test_icons_have_no_variants(self, mock_config, tmp_path):
+        from PIL import Image
+
+        icons_dir = tmp_path / "static" / "icons"
+        icons_dir.mkdir(parents=True)
+        Image.new("RGB", (1000, 1000)).save(icons_dir / "logo.png", "PNG")
+        mock_config["assets"]["responsive_widths"] = [480]
+
+        processor = AssetProcessor(mock_config)
+        processor._process_icons(tmp_path / "static", tmp_path / "output")
+
+        assert "variants" not in processor.image_dimensions["icons/logo.webp"]
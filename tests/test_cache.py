@@ -0,0 +1,86 @@
+"""
+Tests for DiskCache
+"""
+
+import os
+import time
+
+import pytest
+
+from core.utils.cache import DiskCache, get_cache_dir
+
+
+@pytest.fixture
+def cache_config(temp_dir):
+    return {
+        "cache": {
+            "enabled": True,
+            "dir": str(temp_dir / ".cache"),
+            "max_age_days": 30,
+            "max_size_mb": 1,
+        }
+    }
+
+
+class TestDiskCache:
+    """Test DiskCache functionality"""
+
+    def test_get_cache_dir_default(self):
+        """Test default cache directory"""
+        assert str(get_cache_dir({})) == ".cache"
+
+    def test_disabled_by_default(self, temp_dir):
+        """Test cache is a no-op without cache config"""
+        cache = DiskCache({}, "content")
+        cache.set_json("key", {"a": 1})
+        assert cache.get_json("key") is None
+        assert cache.hits == 0
+
+    def test_make_key_is_stable(self):
+        """Test keys depend on every part"""
+        assert DiskCache.make_key("a", b"b") == DiskCache.make_key("a", b"b")
+        assert DiskCache.make_key("ab", "") != DiskCache.make_key("a", "b")
+
+    def test_json_roundtrip(self, cache_config):
+        """Test storing and loading JSON entries"""
+        cache = DiskCache(cache_config, "content")
+        assert cache.get_json("abc") is None
+        cache.set_json("abc", {"title": "Hello"})
+
+        assert cache.get_json("abc") == {"title": "Hello"}
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_bytes_roundtrip(self, cache_config):
+        """Test storing and loading binary entries"""
+        cache = DiskCache(cache_config, "images")
+        cache.set_bytes("abc", b"\x00\x01")
+        assert cache.get_bytes("abc") == b"\x00\x01"
+
+    def test_prune_by_age(self, cache_config):
+        """Test entries older than max_age_days are evicted"""
+        cache = DiskCache(cache_config, "content")
+        cache.set_json("old", 1)
+        cache.set_json("new", 2)
+
+        old_time = time.time() - 40 * 86400
+        os.utime(cache._entry_path("old", ".json"), (old_time, old_time))
+
+        cache.prune()
+
+        assert not cache._entry_path("old", ".json").exists()
+        assert cache._entry_path("new", ".json").exists()
+
+    def test_prune_by_size(self, cache_config):
+        """Test oldest entries are evicted when over max_size_mb"""
+        cache = DiskCache(cache_config, "images")
+        for i, name in enumerate(["a", "b", "c"]):
+            cache.set_bytes(name, b"x" * 400 * 1024)
+            stamp = time.time() - 100 + i
+            os.utime(cache._entry_path(name, ".bin"), (stamp, stamp))
+
+        cache.prune()
+
+        assert not cache._entry_path("a", ".bin").exists()
+        assert cache._entry_path("b", ".bin").exists()
+        assert cache._entry_path("c", ".bin").exists()
@@ -0,0 +1,123 @@
+"""
+Tests for precompressed output copies
+"""
+
+import gzip
+import os
+
+import pytest
+
+from core.blog import compress
+from core.blog.compress import OutputCompressor
+
+
+@pytest.fixture
+def compress_config(sample_config, tmp_path):
+    sample_config["build"]["output_dir"] = str(tmp_path / "output")
+    sample_config["cache"] = {"enabled": True, "dir": str(tmp_path / "cache")}
+    sample_config["compress"] = {"enabled": True, "brotli": False, "workers": 2}
+    (tmp_path / "output" / "post").mkdir(parents=True)
+    return sample_config
+
+
+@pytest.fixture
+def output_dir(compress_config, tmp_path):
+    output_dir = tmp_path / "output"
+    (output_dir / "index.html").write_text("<p>home</p>" * 100)
+    (output_dir / "post" / "index.html").write_text("<p>post</p>" * 100)
+    (output_dir / "search.json").write_text('{"a": 1}' * 100)
+    (output_dir / "tiny.css").write_text("body{}")
+    (output_dir / "photo.jpg").write_bytes(os.urandom(1024))
+    return output_dir
+
+
+class TestOutputCompressor:
+    def test_writes_gzip_copies(self, compress_config, output_dir):
+        written = OutputCompressor(compress_config).generate()
+
+        assert written == [
+            "index.html.gz",
+            "post/index.html.gz",
+            "search.json.gz",
+        ]
+        with gzip.open(output_dir / "index.html.gz") as f:
+            assert f.read() == (output_dir / "index.html").read_bytes()
+        # copies share the mtime of their source
+        assert (output_dir / "index.html.gz").stat().st_mtime_ns == (
+            output_dir / "index.html"
+        ).stat().st_mtime_ns
+
+    def test_skips_unchanged_outputs(self, compress_config, output_dir, capsys):
+        OutputCompressor(compress_config).generate()
+        assert OutputCompressor(compress_config).generate() == []
+
+        (output_dir / "post" / "index.html").write_text("<p>edited</p>" * 100)
+        assert OutputCompressor(compress_config).generate() == ["post/index.html.gz"]
+        assert "1 file(s) (gz), 2 unchanged, 0 removed" in capsys.readouterr().out
+
+    def test_clean_builds_reuse_brotli_results(self, compress_config, output_dir):
+        compressor = OutputCompressor(compress_config)
+        compressor.encoders[".br"] = lambda data: data[:10]
+        compressor.generate()
+        for path in output_dir.rglob("*.br"):
+            path.unlink()
+
+        compressor = OutputCompressor(compress_config)
+        compressor.encoders[".br"] = lambda data: pytest.fail("recompressed")
+        assert len(compressor.generate()) == 3
+        assert compressor.cache.hits == 3
+        assert (output_dir / "index.html.br").read_bytes() == b"<p>home</p"
+
+    def test_output_is_deterministic(self, compress_config, output_dir):
+        OutputCompressor(compress_config).generate()
+        first = (output_dir / "index.html.gz").read_bytes()
+        (output_dir / "index.html.gz").unlink()
+        compress_config["cache"]["enabled"] = False
+        OutputCompressor(compress_config).generate()
+        assert (output_dir / "index.html.gz").read_bytes() == first
+
+    def test_removes_copies_of_removed_outputs(self, compress_config, output_dir):
+        OutputCompressor(compress_config).generate()
+        (output_dir / "post" / "index.html").unlink()
+
+        OutputCompressor(compress_config).generate()
+        assert not (output_dir / "post").exists()
+        assert (output_dir / "index.html.gz").exists()
+
+    def test_keeps_rewritten_files(self, compress_config, output_dir):
+        """a sitemap written as .gz by the build is not a leftover copy"""
+        (output_dir / "sitemap-1.xml").write_text("<urlset/>" * 100)
+        OutputCompressor(compress_config).generate()
+
+        (output_dir / "sitemap-1.xml").unlink()
+        with gzip.open(output_dir / "sitemap-1.xml.gz", "wb") as f:
+            f.write(b"<urlset>new</urlset>")
+        OutputCompressor(compress_config).generate()
+        assert (output_dir / "sitemap-1.xml.gz").exists()
+
+    def test_disabling_removes_copies(self, compress_config, output_dir):
+        OutputCompressor(compress_config).generate()
+        compress_config["compress"]["enabled"] = False
+        assert OutputCompressor(compress_config).generate() == []
+        assert list(output_dir.rglob("*.gz")) == []
+
+    def test_disabled_does_nothing(self, compress_config, output_dir, tmp_path):
+        compress_config["compress"]["enabled"] = False
+        assert OutputCompressor(compress_config).generate() == []
+        assert not (tmp_path / "cache" / "compressed.json").exists()
+
+    def test_brotli(self, compress_config, output_dir):
+        brotli = pytest.importorskip("brotli")
+        compress_config["compress"]["brotli"] = True
+        written = OutputCompressor(compress_config).generate()
+
+        assert "index.html.br" in written
+        assert (
+            brotli.decompress((output_dir / "index.html.br").read_bytes())
+            == (output_dir / "index.html").read_bytes()
+        )
+
+    def test_brotli_optional(self, compress_config, monkeypatch):
+        monkeypatch.setattr(compress, "brotli", None)
+        compress_config["compress"]["brotli"] = True
+        assert list(OutputCompressor(compress_config).encoders) == [".gz"]
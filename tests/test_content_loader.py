@@ -46,6 +46,7 @@ class TestContentLoader:
         post = posts[0]
         assert post.title == "Test Post"
         assert post.author == "Test Author"
+        assert post.tags == ["test", "blog"]
         assert post.published is True
 
     def test_load_pages_empty_directory(self, temp_dir, sample_config):
@@ -89,6 +90,13 @@ class TestContentLoader:
         assert loader._slugify("Multiple   Spaces") == "multiple-spaces"
         assert loader._slugify("Special-Characters@#$") == "special-characters"
 
+    def test_parse_tags(self, sample_config):
+        loader = ContentLoader(sample_config)
+
+        assert loader._parse_tags(None) == []
+        assert loader._parse_tags("rock, live ,") == ["rock", "live"]
+        assert loader._parse_tags(["rock", 2024]) == ["rock", "2024"]
+
     @patch("pathlib.Path.rglob", side_effect=Exception("Read error"))
     def test_load_posts_error(self, mock_rglob, temp_dir, sample_config):
         """Test error handling when loading posts"""
@@ -112,3 +120,155 @@ class TestContentLoader:
             posts = loader.load_posts()
 
         assert posts == []
+
+    def test_load_posts_parallel_matches_serial(
+        self, temp_dir, sample_config, sample_post_content
+    ):
+        """Test process pool loading keeps the same posts and order"""
+        posts_dir = temp_dir / "posts"
+        (posts_dir / "music").mkdir(parents=True)
+
+        for i in range(6):
+            content = sample_post_content.replace(
+                'title: "Test Post"', f'title: "Post {i}"'
+            ).replace('date: "2024-10-14"', f'date: "2024-10-{10 + i}"')
+            (posts_dir / "music" / f"post-{i}.md").write_text(content)
+
+        sample_config["build"]["input_dir"] = str(temp_dir)
+
+        serial = ContentLoader(sample_config).load_posts()
+        sample_config["build"]["workers"] = 3
+        parallel = ContentLoader(sample_config).load_posts()
+
+        assert [p.title for p in parallel] == [p.title for p in serial]
+        assert [p.content for p in parallel] == [p.content for p in serial]
+        assert parallel[0].title == "Post 5"
+        assert parallel[0].url == "/music/post-5/"
+
+    def test_load_posts_parallel_reports_errors(self, temp_dir, sample_config, capsys):
+        """Test per-file errors are still reported when using workers"""
+        posts_dir = temp_dir / "posts"
+        posts_dir.mkdir()
+        (posts_dir / "good.md").write_text(
+            '---\ntitle: "Good"\ndate: "2024-01-01"\n---\nHi'
+        )
+        (posts_dir / "bad.md").write_text(
+            '---\ntitle: "Bad"\ndate: "not-a-date"\n---\nHi'
+        )
+
+        sample_config["build"]["input_dir"] = str(temp_dir)
+        sample_config["build"]["workers"] = 2
+
+        posts = ContentLoader(sample_config).load_posts()
+
+        assert [p.title for p in posts] == ["Good"]
+        assert (
+            f"Error processing post {posts_dir / 'bad.md'}" in capsys.readouterr().out
+        )
+
+    def test_load_posts_uses_content_cache(
+        self, temp_dir, sample_config, sample_post_content
+    ):
+        """Test unchanged files are served from the content cache"""
+        posts_dir = temp_dir / "posts"
+        posts_dir.mkdir()
+        post_file = posts_dir / "test-post.md"
+        post_file.write_text(sample_post_content)
+
+        sample_config["build"]["input_dir"] = str(temp_dir)
+        sample_config["cache"] = {"enabled": True, "dir": str(temp_dir / ".cache")}
+
+        first = ContentLoader(sample_config).load_posts()
+
+        loader = ContentLoader(sample_config)
+        with patch("markdown.markdown") as mock_markdown:
+            cached = loader.load_posts()
+        mock_markdown.assert_not_called()
+        assert loader.cache.hits == 1
+        assert cached == first
+
+        post_file.write_text(sample_post_content.replace("That's it!", "Changed"))
+        loader = ContentLoader(sample_config)
+        changed = loader.load_posts()
+        assert loader.cache.misses == 1
+        assert "Changed" in changed[0].content
+
+    def test_cache_key_tracks_config_only_for_templated_content(
+        self, temp_dir, sample_config
+    ):
+        """Test only content using jinja syntax is keyed on build-relevant config"""
+        plain = temp_dir / "plain.md"
+        plain.write_text("Plain text")
+        templated = temp_dir / "templated.md"
+        templated.write_text("Welcome to {{ site.title }}")
+
+        loader = ContentLoader(sample_config)
+        keys = {path: loader._cache_key(path) for path in (plain, templated)}
+
+        sample_config["build"]["incremental"] = True
+        assert loader._cache_key(templated) == keys[templated]
+
+        sample_config["site"]["title"] = "Renamed"
+        assert loader._cache_key(plain) == keys[plain]
+        assert loader._cache_key(templated) != keys[templated]
+
+    def test_update_posts_reparses_only_changed_files(
+        self, temp_dir, sample_config, sample_post_content
+    ):
+        """Test update_posts keeps unchanged posts and re-parses edited ones"""
+        posts_dir = temp_dir / "posts" / "music"
+        posts_dir.mkdir(parents=True)
+        for day in (1, 2):
+            (posts_dir / f"post-{day}.md").write_text(
+                sample_post_content.replace(
+                    'title: "Test Post"', f'title: "Post {day}"'
+                )
+            )
+
+        sample_config["build"]["input_dir"] = str(temp_dir)
+        loader = ContentLoader(sample_config)
+        posts = loader.load_posts()
+
+        edited = posts_dir / "post-2.md"
+        edited.write_text(edited.read_text().replace("Post 2", "Edited"))
+        (posts_dir / "post-3.md").write_text(sample_post_content)
+
+        with patch.object(loader, "_parse_post", wraps=loader._parse_post) as parse:
+            updated = loader.update_posts(
+                posts, [edited, posts_dir / "post-3.md", temp_dir / "pages" / "x.md"]
+            )
+
+        assert sorted(post.title for post in updated) == [
+            "Edited",
+            "Post 1",
+            "Test Post",
+        ]
+        assert parse.call_count == 2
+        unchanged = [post for post in posts if post.title == "Post 1"][0]
+        assert any(post is unchanged for post in updated)
+
+        (posts_dir / "post-1.md").unlink()
+        updated = loader.update_posts(updated, [posts_dir / "post-1.md"])
+        assert sorted(post.title for post in updated) == ["Edited", "Test Post"]
+
+    def test_update_ignores_other_paths(self, temp_dir, sample_config):
+        """Test paths outside the content directories are not treated as content"""
+        sample_config["build"]["input_dir"] = str(temp_dir)
+        loader = ContentLoader(sample_config)
+
+        other = [temp_dir / "templates" / "base.html"]
+        assert loader.update_posts([], other) is None
+        assert loader.update_pages([], other) is None
+
+    def test_update_pages_after_directory_change(
+        self, temp_dir, sample_config, sample_page_content
+    ):
+        """Test a change reported for the content directory reloads every page"""
+        pages_dir = temp_dir / "pages"
+        pages_dir.mkdir()
+        (pages_dir / "about.md").write_text(sample_page_content)
+
+        sample_config["build"]["input_dir"] = str(temp_dir)
+        pages = ContentLoader(sample_config).update_pages([], [temp_dir])
+
+        assert [page.file_path for page in pages] == [str(pages_dir / "about.md")]
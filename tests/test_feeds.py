@@ -0,0 +1,361 @@
+"""
+Tests for the streaming feed writer
+"""
+
+import dataclasses
+import datetime
+import json
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from core.blog.content import Post
+from core.blog.feeds import FeedChannel, FeedWriter, tag_paths, tag_slug, xml_text
+from core.blog.rss import RSSGenerator
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+CONTENT = "{http://purl.org/rss/1.0/modules/content/}"
+
+
+@pytest.fixture
+def feed_config(sample_config, tmp_path):
+    sample_config["build"]["output_dir"] = str(tmp_path / "output")
+    sample_config["rss"]["formats"] = ["rss", "atom", "json"]
+    return sample_config
+
+
+@pytest.fixture
+def posts():
+    return [
+        Post(
+            title="Tips & <Tricks>",
+            content="<p>First <em>paragraph</em> &amp; more.</p>\n\n<p>Second</p>",
+            date=datetime.datetime(2024, 1, 2, 9, 30),
+            url="/tips/",
+            file_path="tips.md",
+            slug="tips",
+            category="tools",
+            tags=["Live Music"],
+        ),
+        Post(
+            title="Song",
+            content="<p>Lyrics</p>",
+            date=datetime.datetime(2024, 1, 1),
+            url="/song/",
+            file_path="song.md",
+            slug="song",
+            category="music",
+            tags=["Live Music"],
+            author="Guest",
+            description="A described post",
+        ),
+    ]
+
+
+class TestFeedWriter:
+    def test_rss(self, feed_config, posts, tmp_path):
+        FeedWriter(feed_config).write(posts, tmp_path)
+        channel = ET.parse(tmp_path / "rss.xml").getroot().find("channel")
+
+        assert channel.findtext("title") == "Test Blog RSS"
+        assert channel.findtext("lastBuildDate") == "Tue, 02 Jan 2024 09:30:00 +0000"
+        items = channel.findall("item")
+        assert [item.findtext("title") for item in items] == ["Tips & <Tricks>", "Song"]
+        assert items[0].findtext("link") == "http://localhost:8000/tips/"
+        assert items[0].findtext("description") == "First paragraph & more. Second"
+        assert items[0].findtext("category") == "tools"
+        assert items[1].findtext("description") == "A described post"
+        assert items[1].findtext("{http://purl.org/dc/elements/1.1/}creator") == "Guest"
+        assert items[0].find(f"{CONTENT}encoded") is None
+
+    def test_full_content(self, feed_config, posts, tmp_path):
+        feed_config["rss"]["full_content"] = True
+        FeedWriter(feed_config).write(posts, tmp_path)
+
+        item = ET.parse(tmp_path / "rss.xml").getroot().find("channel/item")
+        assert item.findtext(f"{CONTENT}encoded") == posts[0].content
+
+        entry = ET.parse(tmp_path / "atom.xml").getroot().find(f"{ATOM}entry")
+        assert entry.find(f"{ATOM}content").get("type") == "html"
+        assert entry.findtext(f"{ATOM}content") == posts[0].content
+
+        feed = json.loads((tmp_path / "feed.json").read_text())
+        assert feed["items"][0]["content_html"] == posts[0].content
+
+    def test_atom(self, feed_config, posts, tmp_path):
+        FeedWriter(feed_config).write(posts, tmp_path)
+        feed = ET.parse(tmp_path / "atom.xml").getroot()
+
+        assert feed.findtext(f"{ATOM}updated") == "2024-01-02T09:30:00+00:00"
+        entries = feed.findall(f"{ATOM}entry")
+        assert len(entries) == 2
+        assert entries[0].findtext(f"{ATOM}id") == "http://localhost:8000/tips/"
+        assert entries[0].find(f"{ATOM}category").get("term") == "tools"
+        assert entries[1].findtext(f"{ATOM}author/{ATOM}name") == "Guest"
+
+    def test_json_feed(self, feed_config, posts, tmp_path):
+        FeedWriter(feed_config).write(posts, tmp_path)
+        feed = json.loads((tmp_path / "feed.json").read_text())
+
+        assert feed["version"] == "https://jsonfeed.org/version/1.1"
+        assert feed["feed_url"] == "http://localhost:8000/feed.json"
+        assert [item["id"] for item in feed["items"]] == [
+            "http://localhost:8000/tips/",
+            "http://localhost:8000/song/",
+        ]
+        assert feed["items"][0]["content_text"] == "First paragraph & more. Second"
+        assert feed["items"][0]["tags"] == ["tools", "Live Music"]
+
+    def test_empty_feed_is_valid(self, feed_config, tmp_path):
+        FeedWriter(feed_config).write([], tmp_path)
+
+        assert ET.parse(tmp_path / "rss.xml").getroot().find("channel/item") is None
+        assert json.loads((tmp_path / "feed.json").read_text())["items"] == []
+
+    def test_formats(self, feed_config, posts, tmp_path):
+        feed_config["rss"]["formats"] = ["atom", "unknown"]
+        assert FeedWriter(feed_config).write(posts, tmp_path) == ["atom.xml"]
+        assert not (tmp_path / "rss.xml").exists()
+
+    def test_xml_text_drops_invalid_characters(self):
+        assert xml_text("a\x00b\x0c<c>") == "ab&lt;c&gt;"
+
+
+class TestFeedChannels:
+    def test_groups_posts_in_one_pass(self, feed_config, posts):
+        channels = FeedWriter(feed_config).channels(posts)
+
+        assert [(c.path, c.posts) for c in channels] == [
+            ("", [0, 1]),
+            ("music", [1]),
+            ("tags/live-music", [0, 1]),
+            ("tools", [0]),
+        ]
+        assert channels[1].title == "Test Blog RSS: music"
+
+    def test_disabled_groups(self, feed_config, posts):
+        feed_config["rss"]["category_feeds"] = False
+        feed_config["rss"]["tag_feeds"] = False
+        assert [c.path for c in FeedWriter(feed_config).channels(posts)] == [""]
+
+    def test_tag_slug(self):
+        assert tag_slug(" Live Music ") == "live-music"
+        assert tag_slug("C++ / Rust") == "c-rust"
+
+    def test_tag_paths_keep_colliding_tags_apart(self, capsys):
+        paths = tag_paths(["C++", "C", "c", "Live Music", "live music "])
+
+        assert paths["c"] == "tags/c"
+        assert paths["live music"] == "tags/live-music"
+        assert paths["c++"].startswith("tags/c-")
+        assert paths["c++"] != paths["c"]
+        assert "share the feed slug 'c'" in capsys.readouterr().out
+
+    def test_tag_paths_hash_tags_without_words(self):
+        paths = tag_paths(["+++", "!!"])
+
+        assert paths["+++"].startswith("tags/tag-")
+        assert paths["!!"].startswith("tags/tag-")
+        assert paths["+++"] != paths["!!"]
+        # stable from build to build
+        assert tag_paths(["+++"]) == {"+++": paths["+++"]}
+
+    def test_colliding_tags_get_separate_feeds(self, feed_config, posts, tmp_path):
+        posts[0].tags = ["C++"]
+        posts[1].tags = ["C"]
+        writer = FeedWriter(feed_config)
+        writer.write_channels(posts, writer.channels(posts), tmp_path)
+
+        feeds = sorted(path.parent.name for path in tmp_path.glob("tags/*/rss.xml"))
+        assert len(feeds) == 2
+        assert "Song" in (tmp_path / "tags" / "c" / "rss.xml").read_text()
+        assert not (tmp_path / "tags" / "rss.xml").exists()
+
+    def test_entries_rendered_once(self, feed_config, posts, tmp_path, monkeypatch):
+        writer = FeedWriter(feed_config)
+        rendered = []
+        entry = writer.entry
+        monkeypatch.setattr(
+            writer, "entry", lambda post: rendered.append(post) or entry(post)
+        )
+
+        writer.write_channels(posts, writer.channels(posts), tmp_path)
+
+        assert rendered == posts
+        site = (tmp_path / "rss.xml").read_text()
+        tag = (tmp_path / "tags" / "live-music" / "rss.xml").read_text()
+        assert site.split("<item>", 1)[1] == tag.split("<item>", 1)[1]
+
+    def test_channel_links(self, feed_config, posts, tmp_path):
+        writer = FeedWriter(feed_config)
+        writer.write_channels(posts, writer.channels(posts), tmp_path)
+
+        channel = ET.parse(tmp_path / "music" / "rss.xml").getroot().find("channel")
+        assert channel.findtext("link") == "http://localhost:8000/music/"
+        assert channel.find(f"{ATOM}link").get("href") == (
+            "http://localhost:8000/music/rss.xml"
+        )
+        assert [item.findtext("title") for item in channel.findall("item")] == ["Song"]
+
+        feed = ET.parse(tmp_path / "music" / "atom.xml").getroot()
+        assert feed.findtext(f"{ATOM}id") == "http://localhost:8000/music/"
+
+        feed = json.loads((tmp_path / "tools" / "feed.json").read_text())
+        assert feed["feed_url"] == "http://localhost:8000/tools/feed.json"
+
+
+def make_posts(count):
+    """Posts numbered from the oldest, returned newest first like ContentLoader"""
+    return [
+        Post(
+            title=f"Post {n}",
+            content=f"<p>Body {n}</p>",
+            date=datetime.datetime(2024, 1, 1) + datetime.timedelta(days=n),
+            url=f"/post-{n}/",
+            file_path=f"post-{n}.md",
+            slug=f"post-{n}",
+        )
+        for n in reversed(range(count))
+    ]
+
+
+@pytest.fixture
+def archive_config(feed_config):
+    feed_config["rss"].update({"max_items": 3, "archive": True, "archive_size": 2})
+    return feed_config
+
+
+class TestFeedArchive:
+    def test_pages(self, archive_config):
+        writer = FeedWriter(archive_config)
+        pages = writer.pages(FeedChannel("", "t", "d", list(range(5))))
+
+        # post 0 is the newest; full pages are counted from the oldest
+        assert [(p.number, p.posts, p.prev_archive) for p in pages] == [
+            (0, [0, 1, 2], 2),
+            (1, [3, 4], None),
+            (2, [1, 2], 1),
+        ]
+        assert pages[2].file_name("json") == "archive/feed-2.json"
+
+    def test_max_items_without_archive(self, feed_config):
+        feed_config["rss"]["max_items"] = 2
+        pages = FeedWriter(feed_config).pages(FeedChannel("", "t", "d", [0, 1, 2]))
+        assert [(p.number, p.posts, p.prev_archive) for p in pages] == [
+            (0, [0, 1], None)
+        ]
+
+    def test_archive_size_capped_by_max_items(self, archive_config):
+        archive_config["rss"]["archive_size"] = 10
+        assert FeedWriter(archive_config).archive_size == 3
+
+    def test_archive_links(self, archive_config, tmp_path):
+        FeedWriter(archive_config).write(make_posts(5), tmp_path)
+        history = "{http://purl.org/syndication/history/1.0}"
+
+        channel = ET.parse(tmp_path / "rss.xml").getroot().find("channel")
+        assert channel.find(f"{history}archive") is None
+        links = {
+            link.get("rel"): link.get("href") for link in channel.findall(f"{ATOM}link")
+        }
+        assert links["prev-archive"] == "http://localhost:8000/archive/rss-2.xml"
+
+        channel = ET.parse(tmp_path / "archive" / "rss-1.xml").getroot().find("channel")
+        assert channel.find(f"{history}archive") is not None
+        links = {
+            link.get("rel"): link.get("href") for link in channel.findall(f"{ATOM}link")
+        }
+        assert links == {
+            "self": "http://localhost:8000/archive/rss-1.xml",
+            "current": "http://localhost:8000/rss.xml",
+        }
+        assert [i.findtext("title") for i in channel.findall("item")] == [
+            "Post 1",
+            "Post 0",
+        ]
+
+        feed = ET.parse(tmp_path / "archive" / "atom-2.xml").getroot()
+        links = {
+            link.get("rel"): link.get("href") for link in feed.findall(f"{ATOM}link")
+        }
+        assert links["prev-archive"] == "http://localhost:8000/archive/atom-1.xml"
+        assert links["current"] == "http://localhost:8000/atom.xml"
+
+        feed = json.loads((tmp_path / "feed.json").read_text())
+        assert feed["next_url"] == "http://localhost:8000/archive/feed-2.json"
+        feed = json.loads((tmp_path / "archive" / "feed-1.json").read_text())
+        assert "next_url" not in feed
+
+    def test_full_pages_are_byte_stable(self, archive_config, tmp_path):
+        FeedWriter(archive_config).write(make_posts(4), tmp_path)
+        first = (tmp_path / "archive" / "rss-1.xml").read_bytes()
+        assert not (tmp_path / "archive" / "rss-3.xml").exists()
+
+        FeedWriter(archive_config).write(make_posts(7), tmp_path)
+        assert (tmp_path / "archive" / "rss-1.xml").read_bytes() == first
+        assert (tmp_path / "archive" / "rss-3.xml").exists()
+
+    def test_unchanged_pages_are_skipped(self, archive_config, tmp_path, monkeypatch):
+        archive_config["cache"] = {"enabled": True, "dir": str(tmp_path / "cache")}
+        posts = make_posts(5)
+        FeedWriter(archive_config).write(posts, tmp_path / "out")
+
+        writer = FeedWriter(archive_config)
+        rendered = []
+        entry = writer.entry
+        monkeypatch.setattr(
+            writer, "entry", lambda post: rendered.append(post) or entry(post)
+        )
+        # loaded posts are never modified; an edit loads a new Post
+        posts[4] = dataclasses.replace(posts[4], title="Edited")
+        writer.write(posts, tmp_path / "out")
+
+        assert (writer.archive_pages, writer.archive_skipped) == (2, 1)
+        # the subscription feed and page 1, which holds the edited post
+        assert [post.title for post in rendered] == [
+            "Post 4",
+            "Post 3",
+            "Post 2",
+            "Post 1",
+            "Edited",
+        ]
+
+    def test_stale_pages_are_removed(self, archive_config, tmp_path):
+        FeedWriter(archive_config).write(make_posts(6), tmp_path)
+        FeedWriter(archive_config).write(make_posts(3), tmp_path)
+
+        assert sorted(p.name for p in (tmp_path / "archive").iterdir()) == [
+            "atom-1.xml",
+            "feed-1.json",
+            "rss-1.xml",
+        ]
+
+
+class TestRSSGenerator:
+    def test_generate(self, feed_config, posts, tmp_path, capsys):
+        feed_config["rss"].update({"max_items": 1, "archive": True})
+        RSSGenerator(feed_config).generate(posts)
+        output_dir = tmp_path / "output"
+
+        assert (
+            len(ET.parse(output_dir / "rss.xml").getroot().findall("channel/item")) == 1
+        )
+        assert (output_dir / "atom.xml").exists()
+        assert (output_dir / "feed.json").exists()
+        assert (output_dir / "music" / "rss.xml").exists()
+        assert (output_dir / "tags" / "live-music" / "atom.xml").exists()
+        assert (output_dir / "archive" / "rss-1.xml").exists()
+        assert (
+            "Generated feeds: rss.xml, atom.xml, feed.json" in capsys.readouterr().out
+        )
+
+    def test_disabled(self, feed_config, posts, tmp_path):
+        feed_config["rss"]["enabled"] = False
+        RSSGenerator(feed_config).generate(posts)
+        assert not (tmp_path / "output").exists()
+
+    def test_does_not_import_feedgen(self, feed_config, posts, monkeypatch):
+        monkeypatch.setitem(sys.modules, "feedgen", None)
+        monkeypatch.setitem(sys.modules, "feedgen.feed", None)
+        RSSGenerator(feed_config).generate(posts)
@@ -2,9 +2,12 @@
 Tests for BlogGenerator
 """
 
+import gzip
+import json
 from pathlib import Path
 
 import pytest
+import yaml
 
 from core.blog.generator import BlogGenerator
 
@@ -92,3 +95,242 @@ class TestBlogGenerator:
         output_dir = Path(sample_config["build"]["output_dir"])
         assert output_dir.exists()
         assert (output_dir / "index.html").exists()
+
+
+@pytest.fixture
+def site_config_file(temp_dir, sample_config, sample_post_content):
+    """Create a small site with three posts and minimal templates"""
+    content_dir = temp_dir / "content"
+    posts_dir = content_dir / "posts"
+    posts_dir.mkdir(parents=True)
+    (content_dir / "pages").mkdir()
+
+    for day in (1, 2, 3):
+        (posts_dir / f"post-{day}.md").write_text(
+            sample_post_content.replace(
+                'title: "Test Post"', f'title: "Post {day}"'
+            ).replace('date: "2024-10-14"', f'date: "2024-10-0{day}"')
+        )
+
+    templates_dir = content_dir / "templates"
+    templates_dir.mkdir()
+    (templates_dir / "base.html").write_text(
+        "<html>{% block content %}{% endblock %}</html>"
+    )
+    (templates_dir / "post.html").write_text(
+        "{% extends 'base.html' %}{% block content %}{{ post.title }}"
+        "{% if prev_post %}{{ prev_post.title }}{% endif %}{% endblock %}"
+    )
+    (templates_dir / "page.html").write_text("{% extends 'base.html' %}")
+    (templates_dir / "index.html").write_text(
+        "{% extends 'base.html' %}{% block content %}"
+        "{% for post in posts %}{{ post.title }}{% endfor %}{% endblock %}"
+    )
+    (content_dir / "static").mkdir()
+
+    sample_config["build"]["input_dir"] = str(content_dir)
+    sample_config["build"]["output_dir"] = str(temp_dir / "output")
+    sample_config["build"]["template_dir"] = str(templates_dir)
+    sample_config["build"]["static_dir"] = str(content_dir / "static")
+    sample_config["cache"] = {"enabled": True, "dir": str(temp_dir / ".cache")}
+
+    config_file = temp_dir / "config.yaml"
+    with open(config_file, "w") as f:
+        yaml.dump(sample_config, f)
+    return config_file
+
+
+class TestIncrementalBuild:
+    """Test incremental builds driven by the build manifest"""
+
+    def test_unchanged_build_writes_nothing(self, site_config_file):
+        """Test a second incremental build skips every page"""
+        BlogGenerator(str(site_config_file)).build(incremental=True)
+
+        generator = BlogGenerator(str(site_config_file))
+        generator.build(incremental=True)
+
+        assert generator.build_manifest.written == []
+
+    def test_edit_rebuilds_post_neighbours_and_index(self, site_config_file, temp_dir):
+        """Test editing one post rebuilds it, its neighbours and listing pages"""
+        BlogGenerator(str(site_config_file)).build(incremental=True)
+
+        posts_dir = temp_dir / "content" / "posts"
+        post_file = posts_dir / "post-3.md"
+        post_file.write_text(post_file.read_text().replace("Post 3", "Post Three"))
+
+        generator = BlogGenerator(str(site_config_file))
+        generator.build(incremental=True)
+
+        assert sorted(generator.build_manifest.written) == [
+            "index.html",
+            "post-2/index.html",
+            "post-three/index.html",
+        ]
+        output_dir = temp_dir / "output"
+        assert "Post Three" in (output_dir / "post-2" / "index.html").read_text()
+        assert not (output_dir / "post-3").exists()
+
+    def test_full_build_invalidates_manifest(self, site_config_file, temp_dir):
+        """Test an incremental build after a full build does not keep its output"""
+        BlogGenerator(str(site_config_file)).build(incremental=True)
+
+        post_file = temp_dir / "content" / "posts" / "post-2.md"
+        original = post_file.read_text()
+        post_file.write_text(original.replace("Post 2", "Post Two"))
+        BlogGenerator(str(site_config_file)).build(clean=False)
+
+        post_file.write_text(original)
+        BlogGenerator(str(site_config_file)).build(incremental=True)
+
+        output_dir = temp_dir / "output"
+        assert "Post Two" not in (output_dir / "index.html").read_text()
+        assert "Post Two" not in (output_dir / "rss.xml").read_text()
+
+    def test_feed_config_change_keeps_search_index(self, site_config_file, monkeypatch):
+        """Test site-wide outputs are only regenerated when their own inputs change"""
+        BlogGenerator(str(site_config_file)).build(incremental=True)
+        config = yaml.safe_load(site_config_file.read_text())
+        config["rss"] = {"title": "Renamed feed"}
+        site_config_file.write_text(yaml.dump(config))
+
+        generator = BlogGenerator(str(site_config_file))
+        monkeypatch.setattr(generator.search_indexer, "generate", pytest.fail)
+        monkeypatch.setattr(generator.robots_generator, "generate", pytest.fail)
+        generator.build(incremental=True)
+
+        output_dir = Path(config["build"]["output_dir"])
+        assert "Renamed feed" in (output_dir / "rss.xml").read_text()
+
+
+class TestRebuild:
+    """Test watch mode rebuilds of changed sources"""
+
+    @pytest.fixture
+    def generator(self, site_config_file):
+        generator = BlogGenerator(str(site_config_file))
+        generator.build(incremental=True)
+        return generator
+
+    def test_edit_rebuilds_affected_pages(self, generator, temp_dir):
+        """Test editing a post rewrites only the pages showing it"""
+        post_file = temp_dir / "content" / "posts" / "post-3.md"
+        post_file.write_text(post_file.read_text().replace("Post 3", "Post Three"))
+
+        written = generator.rebuild([post_file])
+
+        assert sorted(written) == [
+            "index.html",
+            "post-2/index.html",
+            "post-three/index.html",
+        ]
+        assert not (temp_dir / "output" / "post-3").exists()
+        assert "Post Three" in (temp_dir / "output" / "rss.xml").read_text()
+
+    def test_page_edit_keeps_feeds(self, site_config_file, temp_dir, monkeypatch):
+        """Test editing a page regenerates the search index but not the feeds"""
+        page_file = temp_dir / "content" / "pages" / "about.md"
+        page_file.write_text("---\ntitle: About\n---\n\nHello.\n")
+        generator = BlogGenerator(str(site_config_file))
+        generator.build(incremental=True)
+        monkeypatch.setattr(generator.rss_generator, "generate", pytest.fail)
+        monkeypatch.setattr(generator.robots_generator, "generate", pytest.fail)
+
+        page_file.write_text("---\ntitle: About\n---\n\nGoodbye.\n")
+        generator.rebuild([page_file])
+
+        bodies = temp_dir / "output" / "search" / "bodies" / "0.json"
+        assert "Goodbye" in bodies.read_text()
+
+    def test_edit_updates_search_index(self, generator, temp_dir, capsys):
+        """Test an edit patches the search index instead of regenerating it"""
+        post_file = temp_dir / "content" / "posts" / "post-2.md"
+        post_file.write_text(post_file.read_text().replace("Post 2", "Post Two"))
+
+        capsys.readouterr()
+        generator.rebuild([post_file])
+
+        assert "Updated search index: 1 document(s)" in capsys.readouterr().out
+        index = json.loads((temp_dir / "output" / "search" / "index.json").read_text())
+        assert [doc["title"] for doc in index["docs"]] == [
+            "Post 3",
+            "Post Two",
+            "Post 1",
+        ]
+
+    def test_deleted_post_is_removed(self, generator, temp_dir):
+        """Test deleting a post removes its page"""
+        post_file = temp_dir / "content" / "posts" / "post-1.md"
+        post_file.unlink()
+
+        written = generator.rebuild([post_file])
+
+        assert [post.title for post in generator.posts] == ["Post 3", "Post 2"]
+        assert "post-2/index.html" in written
+        assert not (temp_dir / "output" / "post-1").exists()
+
+    def test_template_edit_rerenders_users(self, generator, temp_dir):
+        """Test editing a template re-renders only the pages using it"""
+        template = temp_dir / "content" / "templates" / "post.html"
+        template.write_text(template.read_text().replace("{{ post.title }}", "!"))
+
+        written = generator.rebuild([template])
+
+        assert sorted(written) == [f"post-{day}/index.html" for day in (1, 2, 3)]
+        assert "!" in (temp_dir / "output" / "post-1" / "index.html").read_text()
+
+    def test_unrelated_change_does_nothing(self, generator, temp_dir):
+        """Test changes outside the sources do not rebuild"""
+        assert generator.rebuild([temp_dir / "notes.txt"]) == []
+
+    def test_config_change_rebuilds_everything(self, generator, site_config_file):
+        """Test a config edit reloads the config and rebuilds every page"""
+        config = yaml.safe_load(site_config_file.read_text())
+        config["site"]["title"] = "Renamed"
+        site_config_file.write_text(yaml.dump(config))
+
+        written = generator.rebuild([site_config_file])
+
+        assert generator.config["site"]["title"] == "Renamed"
+        assert "index.html" in written
+
+    def test_config_change_keeps_overrides(self, generator, site_config_file):
+        """Test command line overrides survive a config reload"""
+        generator.override("build", "workers", 1)
+        generator.override("dev", "watch", False)
+        config = yaml.safe_load(site_config_file.read_text())
+        config["build"]["workers"] = 8
+        site_config_file.write_text(yaml.dump(config))
+
+        generator.rebuild([site_config_file])
+
+        assert generator.config["build"]["workers"] == 1
+        assert generator.config["dev"]["watch"] is False
+        assert generator.template_renderer.config is generator.config
+
+    def test_rebuild_refreshes_compressed_copies(self, site_config_file, temp_dir):
+        """Test compressed copies are written by builds and follow rebuilds"""
+        config = yaml.safe_load(site_config_file.read_text())
+        config["compress"] = {"enabled": True, "brotli": False, "min_size": 0}
+        site_config_file.write_text(yaml.dump(config))
+        # pages long enough for gzip to pay off
+        (temp_dir / "content" / "templates" / "post.html").write_text(
+            "{% extends 'base.html' %}{% block content %}"
+            "{% for _ in range(50) %}<h1>{{ post.title }}</h1>{% endfor %}{% endblock %}"
+        )
+        generator = BlogGenerator(str(site_config_file))
+        generator.build(incremental=True)
+
+        output_dir = temp_dir / "output"
+        assert (output_dir / "post-2" / "index.html.gz").exists()
+
+        post_file = temp_dir / "content" / "posts" / "post-2.md"
+        post_file.write_text(post_file.read_text().replace("Post 2", "Post Two"))
+        written = generator.rebuild([post_file])
+
+        # copies are not reported as rebuilt pages
+        assert not any(name.endswith(".gz") for name in written)
+        with gzip.open(output_dir / "post-two" / "index.html.gz") as f:
+            assert b"Post Two" in f.read()
+        assert not (output_dir / "post-2").exists()
@@ -0,0 +1,152 @@
+"""
+Tests for live reload over Server-Sent Events
+"""
+
+import http.client
+import threading
+from functools import partial
+
+import pytest
+
+from core.dev.livereload import (
+    LIVERELOAD_PATH,
+    LiveReload,
+    inject_client,
+    page_digest,
+    page_url,
+)
+from core.dev.server import DevHTTPServer, DevRequestHandler
+
+
+def page(body, css="/_sync/css/main-0123abcd.css"):
+    """a rendered page linking a stylesheet"""
+    return f'<html><head><link rel="stylesheet" href="{css}"></head><body>{body}</body></html>'
+
+
+@pytest.fixture
+def livereload(tmp_path):
+    (tmp_path / "post").mkdir()
+    (tmp_path / "post" / "index.html").write_text(page("post"))
+    (tmp_path / "index.html").write_text(page("home"))
+    return LiveReload(str(tmp_path))
+
+
+def sent(events):
+    """messages queued for one subscriber"""
+    messages = []
+    while not events.empty():
+        messages.append(events.get_nowait().decode())
+    return messages
+
+
+class TestHelpers:
+    def test_inject_client_before_body_end(self):
+        html = inject_client(b"<html><body><p>x</p></body></html>")
+        assert html.startswith(b"<html><body><p>x</p><script>")
+        assert html.endswith(b"</script></body></html>")
+        assert LIVERELOAD_PATH.encode() in html
+
+    def test_inject_client_without_body(self):
+        html = inject_client(b"<p>fragment</p>")
+        assert html.startswith(b"<p>fragment</p><script>")
+
+    def test_page_url(self):
+        assert page_url("index.html") == "/"
+        assert page_url("music/song/index.html") == "/music/song/"
+        assert page_url("/about/") == "/about/"
+        assert page_url("404.html") == "/404.html"
+
+    def test_page_digest_ignores_stylesheet_hash(self):
+        first = page_digest(page("x").encode())
+        assert page_digest(page("x", "/_sync/css/main-89abcdef.css").encode()) == first
+        assert page_digest(page("y").encode()) != first
+
+
+class TestLiveReload:
+    def test_css_change_is_swapped(self, livereload):
+        events = livereload.subscribe()
+        livereload.notify(["_sync/css/main-89abcdef.css"])
+        assert sent(events) == [
+            'event: css\ndata: ["/_sync/css/main-89abcdef.css"]\n\n'
+        ]
+
+    def test_reloads_only_served_pages_that_changed(self, livereload, tmp_path):
+        livereload.served("/", (tmp_path / "index.html").read_bytes())
+        livereload.served("/post/", (tmp_path / "post" / "index.html").read_bytes())
+        events = livereload.subscribe()
+
+        # new stylesheet hash everywhere, new content on the post only
+        new_css = "/_sync/css/main-89abcdef.css"
+        (tmp_path / "index.html").write_text(page("home", new_css))
+        (tmp_path / "post" / "index.html").write_text(page("edited", new_css))
+        livereload.notify(
+            ["index.html", "post/index.html", "_sync/css/main-89abcdef.css"]
+        )
+
+        assert sent(events) == [
+            f'event: css\ndata: ["{new_css}"]\n\n',
+            'event: reload\ndata: ["/post/"]\n\n',
+        ]
+
+    def test_unserved_pages_are_not_reloaded(self, livereload, tmp_path):
+        events = livereload.subscribe()
+        (tmp_path / "post" / "index.html").write_text(page("edited"))
+        livereload.notify(["post/index.html"])
+        assert sent(events) == []
+
+    @pytest.mark.parametrize("asset", ["_sync/js/main-1.js", "_sync/images/a.webp"])
+    def test_other_assets_reload_every_page(self, livereload, asset):
+        events = livereload.subscribe()
+        livereload.notify([asset])
+        assert sent(events) == ['event: reload\ndata: ["*"]\n\n']
+
+    def test_close_ends_streams(self, livereload):
+        events = livereload.subscribe()
+        livereload.close()
+        assert events.get_nowait() is None
+
+
+@pytest.fixture
+def http_server(livereload, tmp_path):
+    """a dev server with live reload on a free port"""
+    handler = partial(DevRequestHandler, directory=str(tmp_path), livereload=livereload)
+    httpd = DevHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    livereload.close()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestDevRequestHandler:
+    def test_html_gets_client(self, http_server):
+        conn = http.client.HTTPConnection("127.0.0.1", http_server, timeout=5)
+        conn.request("GET", "/post/")
+        body = conn.getresponse().read()
+        assert b"new EventSource" in body
+
+    def test_event_stream(self, http_server, livereload):
+        conn = http.client.HTTPConnection("127.0.0.1", http_server, timeout=5)
+        conn.request("GET", LIVERELOAD_PATH)
+        response = conn.getresponse()
+        assert response.getheader("Content-Type") == "text/event-stream"
+        assert response.fp.readline() == b"retry: 1000\n"
+        response.fp.readline()
+
+        livereload.notify(["_sync/css/main-89abcdef.css"])
+        assert response.fp.readline() == b"event: css\n"
+        assert response.fp.readline() == b'data: ["/_sync/css/main-89abcdef.css"]\n'
+
+    def test_no_client_when_disabled(self, tmp_path):
+        (tmp_path / "index.html").write_text(page("home"))
+        handler = partial(DevRequestHandler, directory=str(tmp_path), livereload=None)
+        httpd = DevHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", httpd.server_address[1])
+            conn.request("GET", "/")
+            assert conn.getresponse().read() == page("home").encode()
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
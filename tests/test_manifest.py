@@ -0,0 +1,143 @@
+"""
+Tests for BuildManifest
+"""
+
+import pytest
+
+from core.blog.content import Page
+from core.blog.manifest import (
+    BuildManifest,
+    config_fingerprint,
+    fingerprint,
+)
+
+
+@pytest.fixture
+def manifest_config(temp_dir):
+    return {
+        "build": {"output_dir": str(temp_dir / "output"), "workers": 1},
+        "cache": {"dir": str(temp_dir / ".cache")},
+    }
+
+
+class TestBuildManifest:
+    """Test BuildManifest functionality"""
+
+    def test_fingerprint_is_stable(self):
+        """Test fingerprints depend only on the value"""
+        assert fingerprint({"a": 1, "b": 2}) == fingerprint({"b": 2, "a": 1})
+        assert fingerprint(b"x") != fingerprint(b"y")
+
+    def test_config_fingerprint_ignores_dev_settings(self, manifest_config):
+        """Test dev/cache/worker settings do not invalidate outputs"""
+        before = config_fingerprint(manifest_config)
+        manifest_config["build"]["workers"] = 8
+        manifest_config["dev"] = {"port": 9000}
+        assert config_fingerprint(manifest_config) == before
+
+    def test_outputs_fresh_after_save(self, manifest_config, temp_dir):
+        """Test recorded outputs are fresh in the next build"""
+        output_file = temp_dir / "output" / "post" / "index.html"
+        output_file.parent.mkdir(parents=True)
+        output_file.write_text("html")
+
+        manifest = BuildManifest(manifest_config)
+        assert not manifest.is_fresh(output_file, {"source:a.md": "1"})
+        manifest.record(output_file, {"source:a.md": "1"})
+        manifest.save()
+
+        manifest = BuildManifest(manifest_config)
+        assert manifest.is_fresh(output_file, {"source:a.md": "1"})
+        assert not manifest.is_fresh(output_file, {"source:a.md": "2"})
+
+    def test_missing_output_is_not_fresh(self, manifest_config, temp_dir):
+        """Test deleted outputs are rebuilt"""
+        output_file = temp_dir / "output" / "index.html"
+        manifest = BuildManifest(manifest_config)
+        manifest.record(output_file, {"a": "1"})
+        manifest.save()
+
+        assert not BuildManifest(manifest_config).is_fresh(output_file, {"a": "1"})
+
+    def test_remove_stale_outputs(self, manifest_config, temp_dir):
+        """Test outputs not produced by the current build are deleted"""
+        kept = temp_dir / "output" / "kept" / "index.html"
+        stale = temp_dir / "output" / "old" / "post" / "index.html"
+        for path in (kept, stale):
+            path.parent.mkdir(parents=True)
+            path.write_text("html")
+
+        manifest = BuildManifest(manifest_config)
+        manifest.record(kept, {})
+        manifest.record(stale, {})
+        manifest.save()
+
+        manifest = BuildManifest(manifest_config)
+        manifest.is_fresh(kept, {})
+        assert manifest.remove_stale_outputs() == ["old/post/index.html"]
+        assert kept.exists()
+        assert not (temp_dir / "output" / "old").exists()
+
+    def test_stage_is_fresh(self, manifest_config, temp_dir):
+        """Test whole stages are skipped when inputs match"""
+        marker = temp_dir / "output" / "robots.txt"
+        marker.parent.mkdir(parents=True)
+        marker.write_text("robots")
+
+        manifest = BuildManifest(manifest_config)
+        assert not manifest.stage_is_fresh("feeds", {"a": "1"}, marker)
+        manifest.save()
+
+        manifest = BuildManifest(manifest_config)
+        assert manifest.stage_is_fresh("feeds", {"a": "1"}, marker)
+
+    def test_reset_builds_on_previous_build(self, manifest_config, temp_dir):
+        """Test a reset manifest compares with its own last build"""
+        output_file = temp_dir / "output" / "index.html"
+        marker = temp_dir / "output" / "robots.txt"
+        output_file.parent.mkdir(parents=True)
+        output_file.write_text("html")
+        marker.write_text("robots")
+
+        manifest = BuildManifest(manifest_config)
+        manifest.is_fresh(output_file, {"a": "1"})
+        manifest.stage_is_fresh("feeds", {"a": "1"}, marker)
+        manifest.reset()
+
+        assert manifest.is_fresh(output_file, {"a": "1"})
+        assert manifest.written == []
+        # stages skipped by the next build keep their inputs
+        assert manifest.stages == {"feeds": {"a": "1"}}
+
+    def test_source_fingerprint_is_memoized_per_build(self, manifest_config):
+        """Test an item is fingerprinted once per build and again after reset"""
+        manifest = BuildManifest(manifest_config)
+        page = Page(title="A", content="", url="/a/", file_path="a.md", slug="a")
+        first = manifest.source_fingerprint(page)
+        assert first == fingerprint(page)
+
+        page.title = "changed in place"
+        assert manifest.source_fingerprint(page) == first
+
+        manifest.reset()
+        assert manifest.source_fingerprint(page) == fingerprint(page) != first
+
+        copy = Page(title="A", content="", url="/a/", file_path="a.md", slug="a")
+        assert manifest.source_fingerprint(copy) == first
+
+    def test_reset_can_keep_source_fingerprints(self, manifest_config, monkeypatch):
+        """Test a reset that keeps fingerprints reuses those of loaded items"""
+        manifest = BuildManifest(manifest_config)
+        kept = Page(title="A", content="", url="/a/", file_path="a.md", slug="a")
+        dropped = Page(title="B", content="", url="/b/", file_path="b.md", slug="b")
+        digest = manifest.source_fingerprint(kept)
+        manifest.source_fingerprint(dropped)
+
+        manifest.reset(keep_sources=True)
+        manifest.source_fingerprint(kept)
+        manifest.reset(keep_sources=True)
+        monkeypatch.setattr("core.blog.manifest.fingerprint", lambda item: "new")
+
+        assert manifest.source_fingerprint(kept) == digest
+        # items the previous build did not use are fingerprinted again
+        assert manifest.source_fingerprint(dropped) == "new"
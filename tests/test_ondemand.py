@@ -0,0 +1,273 @@
+"""
+Tests for on-demand rendering in the development server
+"""
+
+import filecmp
+import http.client
+import threading
+from functools import partial
+
+import pytest
+import yaml
+
+from core.blog.generator import BlogGenerator
+from core.dev.ondemand import OnDemandSite
+from core.dev.server import DevHTTPServer, DevRequestHandler, DevServer
+
+
+def post(title, date, published=True, body="Body text."):
+    """markdown source of a post"""
+    return (
+        f'---\ntitle: "{title}"\ndate: "{date}"\n'
+        f"published: {str(published).lower()}\n---\n\n{body}\n"
+    )
+
+
+@pytest.fixture
+def site_config_file(temp_dir, sample_config):
+    """a site with posts in two categories, a page, a draft and a stylesheet"""
+    content_dir = temp_dir / "content"
+    posts_dir = content_dir / "posts"
+    (posts_dir / "music").mkdir(parents=True)
+    (posts_dir / "film").mkdir()
+    (content_dir / "pages").mkdir()
+
+    (posts_dir / "intro.md").write_text(post("Intro", "2024-10-01"))
+    (posts_dir / "music" / "song.md").write_text(post("Song", "2024-10-02"))
+    (posts_dir / "music" / "album.md").write_text(post("Album", "2024-10-03"))
+    (posts_dir / "film" / "movie.md").write_text(post("Movie", "2024-10-04"))
+    (posts_dir / "draft.md").write_text(post("Draft", "2024-10-05", published=False))
+    (content_dir / "pages" / "about.md").write_text("---\ntitle: About\n---\n\nHi.\n")
+
+    templates_dir = temp_dir / "templates"
+    templates_dir.mkdir()
+    (templates_dir / "base.html").write_text(
+        "<html><link href=\"{{ 'css/main.css' | asset }}\">"
+        "{% block content %}{% endblock %}</html>"
+    )
+    (templates_dir / "post.html").write_text(
+        "{% extends 'base.html' %}{% block content %}{{ post.title }}"
+        "{% if prev_post %} prev:{{ prev_post.title }}{% endif %}"
+        "{% if next_post %} next:{{ next_post.title }}{% endif %}{% endblock %}"
+    )
+    (templates_dir / "page.html").write_text(
+        "{% extends 'base.html' %}{% block content %}{{ page.title }}{% endblock %}"
+    )
+    (templates_dir / "index.html").write_text(
+        "{% extends 'base.html' %}{% block content %}{{ config.site.title }}:"
+        "{% for post in posts %} {{ post.title }}{% endfor %}"
+        "{% if pagination %} {{ pagination.next_url }}{% endif %}{% endblock %}"
+    )
+    static_dir = temp_dir / "static"
+    (static_dir / "scss").mkdir(parents=True)
+    (static_dir / "scss" / "main.scss").write_text("body { margin: 0; }")
+
+    sample_config["build"]["input_dir"] = str(content_dir)
+    sample_config["build"]["output_dir"] = str(temp_dir / "output")
+    sample_config["build"]["template_dir"] = str(templates_dir)
+    sample_config["build"]["static_dir"] = str(static_dir)
+    sample_config["build"]["posts_per_page"] = 3
+    sample_config["cache"] = {"enabled": True, "dir": str(temp_dir / ".cache")}
+
+    config_file = temp_dir / "config.yaml"
+    config_file.write_text(yaml.dump(sample_config))
+    return config_file
+
+
+@pytest.fixture
+def site(site_config_file):
+    return OnDemandSite(BlogGenerator(str(site_config_file)))
+
+
+def rendered_pages(output_dir):
+    """html outputs under the output directory, relative to it"""
+    return sorted(
+        path.relative_to(output_dir).as_posix()
+        for path in output_dir.rglob("index.html")
+    )
+
+
+class TestSourceIndex:
+    """Test the front matter index behind URL resolution"""
+
+    def test_scan_locates_published_content(self, site):
+        """Test the index holds every published post and page, newest first"""
+        assert site.index.scan() == 6
+
+        assert [entry.url for entry in site.index.posts] == [
+            "/film/movie/",
+            "/music/album/",
+            "/music/song/",
+            "/intro/",
+        ]
+        assert [entry.url for entry in site.index.pages] == ["/about/"]
+        assert site.index.categories() == ["film", "music"]
+
+    def test_warm_start_reads_only_edited_files(self, site_config_file, temp_dir):
+        """Test a later start stats the sources instead of reading them"""
+        OnDemandSite(BlogGenerator(str(site_config_file))).index.scan()
+
+        intro = temp_dir / "content" / "posts" / "intro.md"
+        intro.write_text(post("Welcome", "2024-10-01"))
+
+        index = OnDemandSite(BlogGenerator(str(site_config_file))).index
+        assert index.scan() == 1
+        assert "/welcome/" in index.urls
+        assert "/intro/" not in index.urls
+
+
+class TestOnDemandSite:
+    """Test rendering single pages from source"""
+
+    def test_renders_only_the_requested_post(self, site, temp_dir):
+        """Test a post request writes that post and the assets it links"""
+        written = site.render("/music/album/")
+
+        assert "music/album/index.html" in written
+        assert any(rel.startswith("_sync/css/main") for rel in written)
+        output_dir = temp_dir / "output"
+        assert rendered_pages(output_dir) == ["music/album/index.html"]
+        html = (output_dir / "music" / "album" / "index.html").read_text()
+        assert "Album prev:Movie next:Song" in html
+        assert "/_sync/css/main" in html
+
+    def test_rendered_page_is_reused(self, site):
+        """Test a second request for a page does not render it again"""
+        site.render("/about/")
+        assert site.render("/about/") == []
+        assert site.render("/about/index.html") == []
+
+    def test_index_category_and_pagination(self, site, temp_dir):
+        """Test index pages and category pages resolve like a full build"""
+        site.render("/")
+        site.render("/page/2/")
+        site.render("/music/")
+
+        output_dir = temp_dir / "output"
+        assert (
+            "Test Blog: Movie Album Song /page/2/"
+            in (output_dir / "index.html").read_text()
+        )
+        assert "Test Blog: Intro" in (output_dir / "page/2/index.html").read_text()
+        assert "music: Album Song" in (output_dir / "music/index.html").read_text()
+
+    def test_unknown_urls_render_nothing(self, site, temp_dir):
+        """Test URLs without a source are left to the output directory"""
+        assert site.render("/draft/") == []
+        assert site.render("/page/3/") == []
+        assert site.render("/page/1/") == []
+        assert site.render("/rss.xml") == []
+        assert rendered_pages(temp_dir / "output") == []
+
+    def test_asset_request_processes_assets(self, site, temp_dir):
+        """Test assets are processed on their first request, once"""
+        written = site.render("/_sync/css/main.css")
+
+        assert (temp_dir / "output" / "_sync" / "manifest.json").exists()
+        assert any(rel.startswith("_sync/css/main") for rel in written)
+        assert site.render("/_sync/css/main.css") == []
+
+    def test_matches_full_build(self, site_config_file, temp_dir):
+        """Test every page renders to the same bytes as a full build"""
+        BlogGenerator(str(site_config_file)).build()
+        built = temp_dir / "built"
+        (temp_dir / "output").rename(built)
+
+        site = OnDemandSite(BlogGenerator(str(site_config_file)))
+        for rel in rendered_pages(built):
+            site.render("/" + rel)
+
+        output_dir = temp_dir / "output"
+        assert rendered_pages(output_dir) == rendered_pages(built)
+        for rel in rendered_pages(built):
+            assert filecmp.cmp(output_dir / rel, built / rel, shallow=False), rel
+
+    def test_refresh_rerenders_rendered_pages(self, site, temp_dir):
+        """Test an edit re-renders the pages rendered so far"""
+        site.render("/")
+        site.render("/music/song/")
+        source = temp_dir / "content" / "posts" / "music" / "album.md"
+        source.write_text(post("Record", "2024-10-03"))
+
+        written = site.refresh([source])
+
+        assert sorted(written) == ["index.html", "music/song/index.html"]
+        output_dir = temp_dir / "output"
+        assert "prev:Record" in (output_dir / "music/song/index.html").read_text()
+        assert rendered_pages(output_dir) == ["index.html", "music/song/index.html"]
+
+    def test_refresh_removes_renamed_pages(self, site, temp_dir):
+        """Test a page whose URL changed is deleted from the output"""
+        site.render("/intro/")
+        source = temp_dir / "content" / "posts" / "intro.md"
+        source.write_text(post("Welcome", "2024-10-01"))
+
+        assert site.refresh([source]) == ["intro/index.html"]
+        assert not (temp_dir / "output" / "intro" / "index.html").exists()
+
+    def test_refresh_reloads_templates(self, site, temp_dir):
+        """Test a template edit shows up in the re-rendered pages"""
+        site.render("/about/")
+        template = temp_dir / "templates" / "page.html"
+        template.write_text(template.read_text().replace("{{ page.title }}", "!"))
+
+        assert site.refresh([template]) == ["about/index.html"]
+        assert "!" in (temp_dir / "output" / "about" / "index.html").read_text()
+
+    def test_unrelated_change_does_nothing(self, site, temp_dir):
+        """Test changes outside the sources do not re-render"""
+        site.render("/about/")
+        assert site.refresh([temp_dir / "notes.txt"]) == []
+
+
+@pytest.fixture
+def http_server(site):
+    """a dev server rendering on demand on a free port"""
+    handler = partial(
+        DevRequestHandler, directory=str(site.output_dir), livereload=None, site=site
+    )
+    httpd = DevHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestOnDemandServer:
+    """Test the server renders pages before serving them"""
+
+    def test_serves_rendered_page(self, http_server):
+        conn = http.client.HTTPConnection("127.0.0.1", http_server, timeout=5)
+        conn.request("GET", "/music/song/")
+        response = conn.getresponse()
+        assert response.status == 200
+        assert b"Song prev:Album next:Intro" in response.read()
+
+    def test_redirects_to_trailing_slash(self, http_server):
+        conn = http.client.HTTPConnection("127.0.0.1", http_server, timeout=5)
+        conn.request("GET", "/about")
+        response = conn.getresponse()
+        assert response.status == 301
+        assert response.getheader("Location") == "/about/"
+
+    def test_render_error_is_reported(self, http_server, temp_dir):
+        (temp_dir / "templates" / "page.html").write_text("{% broken %}")
+        conn = http.client.HTTPConnection("127.0.0.1", http_server, timeout=5)
+        conn.request("GET", "/about/")
+        response = conn.getresponse()
+        assert response.status == 500
+        assert b"broken" in response.read()
+
+
+def test_build_and_serve_skips_build(site_config_file, monkeypatch):
+    """Test on-demand mode serves without building first"""
+    generator = BlogGenerator(str(site_config_file))
+    generator.config["dev"] = {"on_demand": True}
+    monkeypatch.setattr(generator, "build", pytest.fail)
+    served = []
+    server = DevServer(generator.config)
+    monkeypatch.setattr(server, "serve", lambda generator: served.append(generator))
+
+    server.build_and_serve(generator)
+
+    assert served == [generator]
@@ -0,0 +1,278 @@
+"""
+Tests for search index generation
+"""
+
+import dataclasses
+import datetime
+import json
+
+import pytest
+
+from core.blog.content import Page, Post
+from core.blog.search import (
+    SearchIndexer,
+    headings,
+    shard_name,
+    strip_tags,
+    tokenize,
+    trigrams,
+)
+
+
+@pytest.fixture
+def search_config(tmp_path):
+    return {"build": {"output_dir": str(tmp_path / "output")}}
+
+
+@pytest.fixture
+def posts():
+    return [
+        Post(
+            title="Hello World",
+            content="<p>Writing <code>hello</code> programs &amp; more</p>",
+            date=datetime.datetime(2024, 1, 2),
+            url="/hello-world/",
+            file_path="hello.md",
+            slug="hello-world",
+        ),
+        Post(
+            title="Green Day",
+            content="<p>Notes on a song by Green Day. Hello again.</p>",
+            date=datetime.datetime(2024, 1, 1),
+            url="/green-day/",
+            file_path="green.md",
+            slug="green-day",
+        ),
+    ]
+
+
+@pytest.fixture
+def pages():
+    return [
+        Page(
+            title="Über",
+            content="<p>Café notes</p>",
+            url="/about/",
+            file_path="about.md",
+            slug="about",
+        )
+    ]
+
+
+class TestTokenizer:
+    def test_strip_tags(self):
+        assert strip_tags("<p>a &amp; <b>b</b></p>\n<p>c</p>") == "a & b c"
+        assert strip_tags("<p>see <code>x</code>.</p><p>y</p>") == "see x. y"
+
+    def test_tokenize(self):
+        assert tokenize("Hello, World! it's 2024_x Café") == [
+            "hello",
+            "world",
+            "it",
+            "s",
+            "2024",
+            "x",
+            "café",
+        ]
+
+    def test_trigrams(self):
+        assert trigrams("Day") == {"  d", " da", "day", "ay "}
+        assert trigrams("a b") == {"  a", " a ", "  b", " b "}
+        assert trigrams("") == set()
+
+    def test_headings(self):
+        html = '<h2 id="intro">Intro <code>x</code></h2><p>t</p><h3>Next</h3><h4></h4>'
+        assert headings(html) == [("Intro x", "intro"), ("Next", "")]
+
+    def test_shard_name(self):
+        assert shard_name("hello", 2) == "he"
+        assert shard_name("a", 2) == "a"
+        assert shard_name("über", 2) == "_c3bc62"
+
+
+class TestSearchIndexer:
+    def test_generate(self, search_config, posts, pages, tmp_path):
+        SearchIndexer(search_config).generate(posts, pages)
+        search_dir = tmp_path / "output" / "search"
+
+        manifest = json.loads((search_dir / "index.json").read_text())
+        assert manifest["doc_count"] == 3
+        assert manifest["docs"][0] == {
+            "title": "Hello World",
+            "url": "/hello-world/",
+            "date": "2024-01-02",
+            "type": "post",
+            "summary": "Writing hello programs & more",
+        }
+        assert manifest["docs"][2]["type"] == "page"
+        assert (
+            sorted(p.stem for p in (search_dir / "terms").iterdir())
+            == manifest["shards"]
+        )
+
+        shard = json.loads((search_dir / "terms" / "he.json").read_text())
+        postings = shard["hello"]
+        docs = postings[0::3]
+        tfs = postings[1::3]
+        weights = postings[2::3]
+        assert docs == [0, 1]
+        # title occurrences are boosted
+        assert tfs == [4, 1]
+        assert weights[0] > weights[1] > 0
+
+        assert "über" in json.loads((search_dir / "terms" / "_c3bc62.json").read_text())
+        assert not (tmp_path / "output" / "search.json").exists()
+
+    def test_generate_removes_stale_shards(self, search_config, posts, tmp_path):
+        indexer = SearchIndexer(search_config)
+        indexer.generate(posts, [])
+        indexer.generate(posts[1:], [])
+
+        assert not (tmp_path / "output" / "search" / "terms" / "wr.json").exists()
+
+    def test_rare_terms_weigh_more(self, search_config):
+        indexer = SearchIndexer(search_config)
+        index = indexer.build_index(
+            [
+                indexer._document_terms("", "common rare"),
+                indexer._document_terms("", "common"),
+            ]
+        )
+
+        assert index["rare"][2] > index["common"][2]
+
+    def test_empty_documents(self, search_config):
+        indexer = SearchIndexer(search_config)
+        assert indexer.build_index([indexer._document_terms("", "")]) == {}
+
+    def test_body_shards(self, search_config, posts, pages, tmp_path):
+        search_config["search"] = {"body_shard_size": 2}
+        SearchIndexer(search_config).generate(posts, pages)
+        bodies_dir = tmp_path / "output" / "search" / "bodies"
+
+        assert json.loads((bodies_dir / "0.json").read_text()) == [
+            "Writing hello programs & more",
+            "Notes on a song by Green Day. Hello again.",
+        ]
+        assert json.loads((bodies_dir / "1.json").read_text()) == ["Café notes"]
+
+    def test_summary(self, search_config):
+        search_config["search"] = {"summary_length": 15}
+        indexer = SearchIndexer(search_config)
+
+        assert indexer._summary("<p>short</p>") == "short"
+        assert indexer._summary("one two three, four five six") == "one two three..."
+
+    def test_reports_tier_sizes(self, search_config, posts, pages, capsys):
+        SearchIndexer(search_config).generate(posts, pages)
+        out = capsys.readouterr().out
+
+        assert "Search payload: manifest " in out
+        assert "bodies " in out
+
+    def test_trigram_index(self, search_config, posts, tmp_path):
+        search_config["search"] = {"trigrams": True}
+        posts[0].content = '<h2 id="setup">Setup</h2><p>Writing hello</p>'
+        SearchIndexer(search_config).generate(posts, [])
+        search_dir = tmp_path / "output" / "search"
+
+        assert json.loads((search_dir / "index.json").read_text())["trigrams"] is True
+        index = json.loads((search_dir / "trigrams.json").read_text())
+        assert index["entries"] == [
+            [0, "Hello World", ""],
+            [0, "Setup", "setup"],
+            [1, "Green Day", ""],
+        ]
+        assert index["sizes"][1] == len(trigrams("Setup"))
+
+        # postings are delta-encoded entry ids
+        assert index["grams"]["  s"] == [1]
+        assert index["grams"]["  d"] == [2]
+
+    def test_trigram_postings_delta_encoded(self, search_config):
+        index = SearchIndexer(search_config).build_trigram_index(
+            [(0, "alpha", ""), (1, "beta", ""), (2, "alpha", ""), (3, "alps", "")]
+        )
+        assert index["grams"]["  a"] == [0, 2, 1]
+
+    def test_trigrams_disabled_by_default(self, search_config, posts, tmp_path):
+        SearchIndexer(search_config).generate(posts, [])
+        assert not (tmp_path / "output" / "search" / "trigrams.json").exists()
+
+
+def search_files(search_dir):
+    """relative path -> parsed JSON of every index file"""
+    return {
+        path.relative_to(search_dir).as_posix(): json.loads(path.read_text())
+        for path in search_dir.rglob("*.json")
+    }
+
+
+class TestSearchIndexUpdate:
+    @pytest.fixture
+    def search_config(self, search_config):
+        search_config["search"] = {"trigrams": True, "body_shard_size": 1}
+        return search_config
+
+    def test_update_matches_generate(self, search_config, posts, pages, tmp_path):
+        indexer = SearchIndexer(search_config)
+        indexer.generate(posts, pages)
+        search_dir = tmp_path / "output" / "search"
+        # shards without terms of the edited post are left alone
+        (search_dir / "terms" / "gr.json").write_text("{}")
+        (search_dir / "bodies" / "1.json").write_text("[]")
+
+        posts[0] = dataclasses.replace(
+            posts[0],
+            title="Hello Again",
+            content='<h2 id="x">Intro</h2><p>Writing <code>hello</code> code</p>',
+        )
+        indexer.update(posts, pages)
+
+        full_config = {"build": {"output_dir": str(tmp_path / "full")}}
+        full_config["search"] = search_config["search"]
+        SearchIndexer(full_config).generate(posts, pages)
+        updated = search_files(search_dir)
+        expected = search_files(tmp_path / "full" / "search")
+
+        assert updated.pop("terms/gr.json") == {}
+        assert updated.pop("bodies/1.json") == []
+        expected_shard = expected.pop("terms/gr.json")
+        assert expected_shard and expected.pop("bodies/1.json")
+        assert not (search_dir / "terms" / "pr.json").exists()
+
+        assert updated.pop("terms/co.json") == expected.pop("terms/co.json")
+        assert updated.keys() == expected.keys()
+        for name, data in updated.items():
+            if not name.startswith("terms/"):
+                assert data == expected[name], name
+                continue
+            # weights of unchanged documents keep the previous average length
+            assert data.keys() == expected[name].keys()
+            for term, postings in data.items():
+                assert postings[0::3] == expected[name][term][0::3]
+                assert postings[1::3] == expected[name][term][1::3]
+
+    def test_update_without_changes_writes_nothing(
+        self, search_config, posts, pages, tmp_path
+    ):
+        indexer = SearchIndexer(search_config)
+        indexer.generate(posts, pages)
+        index_file = tmp_path / "output" / "search" / "index.json"
+        index_file.write_text("{}")
+
+        indexer.update(posts, pages)
+
+        assert index_file.read_text() == "{}"
+
+    def test_added_document_regenerates(self, search_config, posts, pages, tmp_path):
+        indexer = SearchIndexer(search_config)
+        indexer.generate(posts[1:], pages)
+        indexer.update(posts, pages)
+
+        SearchIndexer(
+            {**search_config, "build": {"output_dir": str(tmp_path / "full")}}
+        ).generate(posts, pages)
+        assert search_files(tmp_path / "output" / "search") == search_files(
+            tmp_path / "full" / "search"
+        )
@@ -0,0 +1,103 @@
+"""
+Tests for the offline search query engine
+"""
+
+import datetime
+
+import pytest
+
+from core.blog.content import Page, Post
+from core.blog.search import SearchIndexer
+from core.blog.search_query import SearchIndex
+
+
+@pytest.fixture
+def search_index(tmp_path):
+    config = {
+        "build": {"output_dir": str(tmp_path / "output")},
+        "search": {"trigrams": True},
+    }
+    posts = [
+        Post(
+            title="Hello World",
+            content="<p>Writing hello programs</p>",
+            date=datetime.datetime(2024, 1, 2),
+            url="/hello-world/",
+            file_path="hello.md",
+            slug="hello-world",
+        ),
+        Post(
+            title="Green Day",
+            content='<h2 id="lyrics">Lyrics</h2><p>Notes on a song by Green Day. '
+            "Hello again.</p>",
+            date=datetime.datetime(2024, 1, 1),
+            url="/green-day/",
+            file_path="green.md",
+            slug="green-day",
+        ),
+    ]
+    pages = [
+        Page(
+            title="About",
+            content="<p>Programming notes</p>",
+            url="/about/",
+            file_path="about.md",
+            slug="about",
+        )
+    ]
+    SearchIndexer(config).generate(posts, pages)
+    return SearchIndex.from_config(config)
+
+
+class TestSearchIndex:
+    def test_ranks_title_matches_first(self, search_index):
+        results = search_index.search("hello")
+
+        assert [r.url for r in results] == ["/hello-world/", "/green-day/"]
+        assert results[0].score > results[1].score
+        assert results[0].date == "2024-01-02"
+
+    def test_last_term_matches_as_prefix(self, search_index):
+        assert {r.url for r in search_index.search("progr")} == {
+            "/hello-world/",
+            "/about/",
+        }
+        # earlier terms must match exactly
+        assert search_index.search("gre xyz") == []
+        assert search_index.search("progr notes")[0].url == "/about/"
+
+    def test_multiple_terms_add_up(self, search_index):
+        results = search_index.search("green hello")
+        assert results[0].url == "/green-day/"
+
+    def test_limit_and_no_match(self, search_index):
+        assert len(search_index.search("hello", limit=1)) == 1
+        assert search_index.search("zzz") == []
+        assert search_index.search("") == []
+
+    def test_shards_load_on_demand(self, search_index):
+        assert search_index.shards == {}
+        search_index.search("hello")
+        assert list(search_index.shards) == ["he"]
+
+        search_index.load_all()
+        assert set(search_index.shards) == search_index.shard_names
+        assert search_index.term_count > 0
+
+    def test_fuzzy_search_tolerates_typos(self, search_index):
+        assert search_index.ranked_search("grean dai") == []
+
+        results = search_index.fuzzy_search("grean dai")
+        assert [r.url for r in results] == ["/green-day/"]
+        assert 0.5 <= results[0].score < 1
+
+    def test_fuzzy_search_links_headings(self, search_index):
+        assert search_index.fuzzy_search("lyrcs")[0].url == "/green-day/#lyrics"
+
+    def test_search_fills_with_fuzzy_matches(self, search_index):
+        assert [r.url for r in search_index.search("helo")] == ["/hello-world/"]
+        assert search_index.search("helo", fuzzy=False) == []
+
+        # exact matches come first and are not repeated
+        urls = [r.url for r in search_index.search("hello")]
+        assert urls == ["/hello-world/", "/green-day/"]
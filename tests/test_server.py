@@ -1,8 +1,20 @@
-from unittest.mock import MagicMock, patch
+import gzip
+import http.client
+import os
+import socket
+import threading
+import time
+from functools import partial
+from unittest.mock import ANY, MagicMock, patch
 
 import pytest
 
-from core.dev.server import DevServer
+from core.dev.server import (
+    DevHTTPServer,
+    DevRequestHandler,
+    DevServer,
+    ResponseCache,
+)
 
 
 @pytest.fixture
@@ -35,9 +47,8 @@ class TestDevServer:
             ip = server._get_local_ip()
             assert ip == ""
 
-    @patch("socketserver.TCPServer")
-    @patch("os.chdir")
-    def test_serve(self, mock_chdir, mock_tcp_server, server):
+    @patch("core.dev.server.DevHTTPServer")
+    def test_serve(self, mock_tcp_server, server):
         mock_httpd = MagicMock()
         mock_tcp_server.return_value.__enter__.return_value = mock_httpd
 
@@ -48,18 +59,87 @@ class TestDevServer:
         with patch("threading.Thread"):  # prevent browser opening
             server.serve()
 
-        mock_chdir.assert_called_with(server.config["build"]["output_dir"])
+        # the output directory is served without changing directory
+        handler = mock_tcp_server.call_args[0][1]
+        assert handler.keywords["directory"] == server.config["build"]["output_dir"]
         mock_httpd.serve_forever.assert_called_once()
 
+    @patch("core.dev.server.DevHTTPServer")
+    def test_serve_uses_configured_workers(self, mock_tcp_server, server):
+        server.config["dev"]["workers"] = 4
+        with patch("threading.Thread"):
+            server.serve()
+        assert mock_tcp_server.call_args.kwargs["workers"] == 4
+
     def test_build_and_serve(self, server):
         mock_generator = MagicMock()
         with patch.object(server, "serve") as mock_serve:
             server.build_and_serve(mock_generator)
 
             mock_generator.build.assert_called_once()
-            mock_serve.assert_called_once()
+            mock_serve.assert_called_once_with(generator=mock_generator)
+
+    @patch("core.dev.server.DevHTTPServer")
+    @patch("core.dev.server.Watcher")
+    def test_serve_watches_when_enabled(self, mock_watcher, mock_tcp, server):
+        server.config["dev"]["watch"] = True
+        generator = MagicMock()
+        generator.watch_paths.return_value = ["content"]
+
+        with patch("threading.Thread"):
+            server.serve(generator=generator)
+
+        mock_watcher.assert_called_once_with(["content"], ANY)
+        mock_watcher.return_value.start.assert_called_once()
+        mock_watcher.return_value.stop.assert_called_once()
+
+        # the watcher callback runs the generator's rebuild
+        callback = mock_watcher.call_args[0][1]
+        callback(["content/posts/a.md"])
+        generator.rebuild.assert_called_once_with(["content/posts/a.md"])
+
+    @patch("core.dev.server.DevHTTPServer")
+    @patch("core.dev.server.Watcher")
+    def test_rebuilds_invalidate_cache(self, mock_watcher, mock_tcp, server, tmp_path):
+        server.config["dev"]["watch"] = True
+        generator = MagicMock()
+        generator.rebuild.return_value = ["index.html"]
+
+        with patch("threading.Thread"):
+            server.serve(generator=generator)
+
+        cache = mock_tcp.call_args[0][1].keywords["cache"]
+        with patch.object(cache, "invalidate") as invalidate:
+            mock_watcher.call_args[0][1](["content/posts/a.md"])
+        assert list(invalidate.call_args[0][0]) == [str(tmp_path / "index.html")]
+
+    @patch("core.dev.server.DevHTTPServer")
+    @patch("core.dev.server.LiveReload")
+    @patch("core.dev.server.Watcher")
+    def test_rebuilds_notify_livereload(
+        self, mock_watcher, mock_livereload, mock_tcp, server
+    ):
+        server.config["dev"].update(watch=True, livereload=True)
+        generator = MagicMock()
+        generator.rebuild.return_value = ["index.html"]
+
+        with patch("threading.Thread"):
+            server.serve(generator=generator)
+
+        callback = mock_watcher.call_args[0][1]
+        callback(["content/posts/a.md"])
+        mock_livereload.return_value.notify.assert_called_once_with(["index.html"])
+        mock_livereload.return_value.close.assert_called_once()
+
+    @patch("core.dev.server.DevHTTPServer")
+    @patch("core.dev.server.Watcher")
+    def test_serve_without_watch(self, mock_watcher, mock_tcp, server):
+        server.config["dev"]["watch"] = False
+        with patch("threading.Thread"):
+            server.serve(generator=MagicMock())
+        mock_watcher.assert_not_called()
 
-    @patch("socketserver.TCPServer")
+    @patch("core.dev.server.DevHTTPServer")
     @patch("os.chdir")
     def test_serve_with_port(self, mock_chdir, mock_tcp, server):
         # Prevent actual serve
@@ -68,7 +148,7 @@ class TestDevServer:
             server.serve(port=9000)
         assert server.port == 9000
 
-    @patch("socketserver.TCPServer")
+    @patch("core.dev.server.DevHTTPServer")
     @patch("os.chdir")
     def test_serve_interrupt(self, mock_chdir, mock_tcp, server):
         mock_httpd = MagicMock()
@@ -79,7 +159,7 @@ class TestDevServer:
             # Should catch interrupt and not raise
             server.serve()
 
-    @patch("socketserver.TCPServer")
+    @patch("core.dev.server.DevHTTPServer")
     @patch("os.chdir")
     def test_serve_opens_browser(self, mock_chdir, mock_tcp, server):
         mock_tcp.return_value.__enter__.return_value.serve_forever.return_value = None
@@ -98,3 +178,290 @@ class TestDevServer:
                     target()
 
                     mock_web.assert_called()
+
+
+class QuietHandler(DevRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    """start DevHTTPServer instances on free ports over a small site"""
+    (tmp_path / "index.html").write_text("<html><body>home</body></html>")
+    (tmp_path / "style.css").write_text("body{margin:0}")
+    servers = []
+
+    def start(workers=4, cache=None):
+        handler = partial(QuietHandler, directory=str(tmp_path), cache=cache)
+        httpd = DevHTTPServer(("127.0.0.1", 0), handler, workers=workers)
+        thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        servers.append(httpd)
+        return httpd
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def connect(httpd):
+    return http.client.HTTPConnection("127.0.0.1", httpd.server_address[1], timeout=5)
+
+
+class TestDevHTTPServer:
+    def test_keep_alive(self, start_server):
+        conn = connect(start_server())
+        conn.request("GET", "/")
+        response = conn.getresponse()
+        assert response.version == 11
+        assert response.read() == b"<html><body>home</body></html>"
+        sock = conn.sock
+
+        conn.request("GET", "/style.css")
+        assert conn.getresponse().read() == b"body{margin:0}"
+        # both requests used the same connection
+        assert conn.sock is sock
+
+    def test_idle_connection_does_not_block_others(self, start_server):
+        httpd = start_server(workers=2)
+        # a client that connects and sends nothing holds one worker
+        idle = socket.create_connection(httpd.server_address)
+        try:
+            start = time.perf_counter()
+            conn = connect(httpd)
+            conn.request("GET", "/")
+            assert conn.getresponse().status == 200
+            assert time.perf_counter() - start < 1
+        finally:
+            idle.close()
+
+    def test_closes_keep_alive_while_connections_wait(self, start_server):
+        httpd = start_server(workers=1)
+        first = connect(httpd)
+        first.request("GET", "/")
+        first.getresponse().read()
+
+        # the only worker is busy with the first connection
+        second = socket.create_connection(httpd.server_address)
+        try:
+            while httpd.waiting == 0:
+                time.sleep(0.01)
+            first.request("GET", "/style.css")
+            response = first.getresponse()
+            assert response.getheader("Connection") == "close"
+            response.read()
+
+            second.sendall(b"GET / HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+            assert second.recv(1024).startswith(b"HTTP/1.1 200")
+        finally:
+            second.close()
+
+    def test_close_ends_kept_alive_connections(self, start_server):
+        httpd = start_server()
+        conn = connect(httpd)
+        conn.request("GET", "/")
+        conn.getresponse().read()
+
+        httpd.shutdown()
+        httpd.server_close()
+        assert conn.sock.recv(1) == b""
+
+
+class TestResponseCache:
+    def test_hit_until_file_changes(self, tmp_path):
+        page = tmp_path / "index.html"
+        page.write_text("one")
+        cache = ResponseCache(1024)
+
+        first = cache.get(str(page))
+        assert first.body == b"one"
+        assert cache.get(str(page)) is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        page.write_text("three")
+        assert cache.get(str(page)).body == b"three"
+        assert cache.misses == 2
+
+    def test_invalidate(self, tmp_path):
+        page = tmp_path / "index.html"
+        page.write_text("one")
+        cache = ResponseCache(1024)
+        first = cache.get(str(page))
+
+        cache.invalidate([str(page)])
+        assert cache.get(str(page)) is not first
+
+    def test_strong_etag_follows_content(self, tmp_path):
+        cache = ResponseCache(1024)
+        (tmp_path / "a.css").write_text("body{}")
+        (tmp_path / "b.css").write_text("body{}")
+        (tmp_path / "c.css").write_text("main{}")
+        a, b, c = (
+            cache.get(str(tmp_path / name)) for name in ("a.css", "b.css", "c.css")
+        )
+        assert a.etag == b.etag != c.etag
+        assert a.etag.startswith('"') and a.etag.endswith('"')
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ResponseCache(20, max_file_bytes=10)
+        for name in "abc":
+            (tmp_path / name).write_bytes(b"x" * 8)
+        a = cache.get(str(tmp_path / "a"))
+        cache.get(str(tmp_path / "b"))
+        cache.get(str(tmp_path / "a"))
+        cache.get(str(tmp_path / "c"))
+
+        assert cache.get(str(tmp_path / "a")) is a
+        assert cache.misses == 3
+
+    def test_skips_large_missing_and_directories(self, tmp_path):
+        (tmp_path / "big.jpg").write_bytes(b"x" * 101)
+        cache = ResponseCache(800)
+        assert cache.get(str(tmp_path / "big.jpg")) is None
+        assert cache.get(str(tmp_path / "missing.html")) is None
+        assert cache.get(str(tmp_path)) is None
+
+
+class TestConditionalRequests:
+    @pytest.fixture
+    def httpd(self, start_server):
+        return start_server(cache=ResponseCache(1024 * 1024))
+
+    def test_etag_and_304(self, httpd):
+        conn = connect(httpd)
+        conn.request("GET", "/style.css")
+        response = conn.getresponse()
+        response.read()
+        etag = response.getheader("ETag")
+        assert response.getheader("Last-Modified")
+        assert response.getheader("Cache-Control") == "no-cache"
+
+        conn.request("GET", "/style.css", headers={"If-None-Match": etag})
+        response = conn.getresponse()
+        assert response.status == 304
+        assert response.read() == b""
+        assert response.getheader("ETag") == etag
+
+        conn.request("GET", "/style.css", headers={"If-None-Match": '"other"'})
+        assert conn.getresponse().read() == b"body{margin:0}"
+
+    def test_if_modified_since(self, httpd):
+        conn = connect(httpd)
+        conn.request("GET", "/")
+        response = conn.getresponse()
+        response.read()
+
+        last_modified = response.getheader("Last-Modified")
+        conn.request("GET", "/", headers={"If-Modified-Since": last_modified})
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 304
+
+        old = "Mon, 01 Jan 2001 00:00:00 GMT"
+        conn.request("GET", "/", headers={"If-Modified-Since": old})
+        assert conn.getresponse().status == 200
+
+    def test_head(self, httpd):
+        conn = connect(httpd)
+        conn.request("HEAD", "/style.css")
+        response = conn.getresponse()
+        assert response.getheader("Content-Length") == "14"
+        assert response.read() == b""
+
+    def test_changed_file_gets_new_etag(self, httpd, tmp_path):
+        conn = connect(httpd)
+        conn.request("GET", "/style.css")
+        response = conn.getresponse()
+        response.read()
+
+        (tmp_path / "style.css").write_text("body{margin:1px}")
+        conn.request(
+            "GET", "/style.css", headers={"If-None-Match": response.getheader("ETag")}
+        )
+        assert conn.getresponse().read() == b"body{margin:1px}"
+
+    def test_missing_and_redirects_fall_through(self, httpd, tmp_path):
+        (tmp_path / "about").mkdir()
+        (tmp_path / "about" / "index.html").write_text("about")
+        conn = connect(httpd)
+        conn.request("GET", "/missing.html")
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 404
+
+        conn.request("GET", "/about")
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 301
+        conn.request("GET", "/about/")
+        assert conn.getresponse().read() == b"about"
+
+
+class TestPrecompressed:
+    @pytest.fixture
+    def site(self, start_server, tmp_path):
+        """a stylesheet with a gzip copy sharing its mtime"""
+        style = tmp_path / "style.css"
+        copy = tmp_path / "style.css.gz"
+        copy.write_bytes(gzip.compress(style.read_bytes(), mtime=0))
+        mtime = style.stat().st_mtime_ns
+        os.utime(copy, ns=(mtime, mtime))
+        return tmp_path
+
+    @pytest.fixture(params=[True, False], ids=["cache", "no-cache"])
+    def httpd(self, request, start_server, site):
+        return start_server(cache=ResponseCache(1024 * 1024) if request.param else None)
+
+    def get(self, httpd, path, accept=None):
+        conn = connect(httpd)
+        conn.request("GET", path, headers={"Accept-Encoding": accept} if accept else {})
+        response = conn.getresponse()
+        return response, response.read()
+
+    def test_serves_gzip_copy(self, httpd):
+        response, body = self.get(httpd, "/style.css", "gzip, deflate, br")
+        assert response.getheader("Content-Encoding") == "gzip"
+        assert response.getheader("Vary") == "Accept-Encoding"
+        assert response.getheader("Content-Type") == "text/css"
+        assert gzip.decompress(body) == b"body{margin:0}"
+
+    def test_identity_without_accept_encoding(self, httpd):
+        response, body = self.get(httpd, "/style.css")
+        assert response.getheader("Content-Encoding") is None
+        assert body == b"body{margin:0}"
+
+    def test_refused_encoding(self, httpd):
+        response, body = self.get(httpd, "/style.css", "br, gzip;q=0")
+        assert response.getheader("Content-Encoding") is None
+        assert body == b"body{margin:0}"
+
+    def test_outdated_copy_is_ignored(self, httpd, site):
+        (site / "style.css").write_text("body{margin:1px}")
+        response, body = self.get(httpd, "/style.css", "gzip")
+        assert response.getheader("Content-Encoding") is None
+        assert body == b"body{margin:1px}"
+
+    def test_encodings_get_their_own_etag(self, httpd):
+        gzipped, _ = self.get(httpd, "/style.css", "gzip")
+        plain, _ = self.get(httpd, "/style.css")
+        assert gzipped.getheader("ETag") != plain.getheader("ETag")
+
+
+class TestAcceptEncoding:
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            (None, []),
+            ("gzip", ["gzip"]),
+            ("gzip, deflate, br", ["br", "gzip"]),
+            ("gzip;q=1.0, br;q=0.5", ["gzip", "br"]),
+            ("br;q=0, *", ["gzip"]),
+            ("identity", []),
+        ],
+    )
+    def test_accepted_encodings(self, header, expected):
+        handler = DevRequestHandler.__new__(DevRequestHandler)
+        handler.headers = {"Accept-Encoding": header} if header else {}
+        assert handler._accepted_encodings() == expected
@@ -0,0 +1,228 @@
+"""
+Tests for sitemap and robots.txt generation
+"""
+
+import datetime
+import gzip
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from core.blog.content import Page, Post
+from core.blog.robots import RobotsGenerator
+from core.blog.sitemap import SitemapGenerator, SitemapHistory, content_fingerprint
+
+NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+@pytest.fixture
+def sitemap_config(sample_config, tmp_path):
+    sample_config["build"]["output_dir"] = str(tmp_path)
+    return sample_config
+
+
+@pytest.fixture
+def posts():
+    return [
+        Post(
+            title=f"Post {n}",
+            content="<p>Body</p>",
+            date=datetime.datetime(2024, 1, n + 1),
+            url=f"/post-{n}/?a=1&b=2",
+            file_path=f"post-{n}.md",
+            slug=f"post-{n}",
+        )
+        for n in range(5)
+    ]
+
+
+def locs(path):
+    """loc values of a sitemap or sitemap index"""
+    return [loc.text for loc in ET.parse(path).getroot().iter(f"{NS}loc")]
+
+
+def urls(count):
+    """synthetic sitemap entries"""
+    return [
+        (
+            f"https://example.com/{n}/",
+            datetime.datetime(2024, 1, 1 + n),
+            "weekly",
+            "0.8",
+        )
+        for n in range(count)
+    ]
+
+
+class TestSitemapGenerator:
+    def test_generate(self, sitemap_config, posts, tmp_path, capsys):
+        pages = [
+            Page(title="About", content="", url="/about/", file_path="a", slug="a")
+        ]
+        SitemapGenerator(sitemap_config).generate(posts, pages)
+
+        entries = locs(tmp_path / "sitemap-1.xml")
+        assert entries[0] == "http://localhost:8000/"
+        assert entries[1] == "http://localhost:8000/post-0/?a=1&b=2"
+        assert entries[-1] == "http://localhost:8000/about/"
+        assert locs(tmp_path / "sitemap_index.xml") == [
+            "http://localhost:8000/sitemap-1.xml"
+        ]
+        assert "7 url(s) in 1 sitemap(s)" in capsys.readouterr().out
+
+    def test_splits_at_max_urls(self, sitemap_config, tmp_path):
+        sitemap_config["sitemap"] = {"max_urls": 2}
+        sitemaps = SitemapGenerator(sitemap_config).write(urls(5), tmp_path)
+
+        assert sitemaps == [
+            ("sitemap-1.xml", "2024-01-02", 2),
+            ("sitemap-2.xml", "2024-01-04", 2),
+            ("sitemap-3.xml", "2024-01-05", 1),
+        ]
+        assert locs(tmp_path / "sitemap-3.xml") == ["https://example.com/4/"]
+
+    def test_splits_at_max_bytes(self, sitemap_config, tmp_path):
+        sitemap_config["sitemap"] = {"max_bytes": 600}
+        sitemaps = SitemapGenerator(sitemap_config).write(urls(10), tmp_path)
+
+        assert len(sitemaps) > 1
+        assert sum(count for _, _, count in sitemaps) == 10
+        for name, _, _ in sitemaps:
+            assert (tmp_path / name).stat().st_size <= 600
+            ET.parse(tmp_path / name)
+
+    def test_limits_capped_by_protocol(self, sitemap_config):
+        sitemap_config["sitemap"] = {"max_urls": 100000}
+        assert SitemapGenerator(sitemap_config).max_urls == 50000
+
+    def test_gzip(self, sitemap_config, posts, tmp_path):
+        sitemap_config["sitemap"] = {"gzip": True}
+        SitemapGenerator(sitemap_config).generate(posts, [])
+        first = (tmp_path / "sitemap-1.xml.gz").read_bytes()
+
+        with gzip.open(tmp_path / "sitemap-1.xml.gz") as f:
+            assert len(locs(f)) == 6
+        assert locs(tmp_path / "sitemap_index.xml") == [
+            "http://localhost:8000/sitemap-1.xml.gz"
+        ]
+
+        # compressed output does not depend on the build time
+        SitemapGenerator(sitemap_config).generate(posts[1:], [])
+        SitemapGenerator(sitemap_config).generate(posts, [])
+        assert (tmp_path / "sitemap-1.xml.gz").read_bytes() == first
+
+    def test_removes_stale_sitemaps(self, sitemap_config, posts, tmp_path):
+        (tmp_path / "sitemap.xml").write_text("old")
+        sitemap_config["sitemap"] = {"max_urls": 2}
+        generator = SitemapGenerator(sitemap_config)
+        generator.generate(posts, [])
+        assert (tmp_path / "sitemap-3.xml").exists()
+
+        generator.generate(posts[:1], [])
+        assert sorted(p.name for p in tmp_path.glob("sitemap*")) == [
+            "sitemap-1.xml",
+            "sitemap_index.xml",
+        ]
+
+    def test_removes_sitemaps_after_gzip_toggle(self, sitemap_config, posts, tmp_path):
+        SitemapGenerator(sitemap_config).generate(posts, [])
+        sitemap_config["sitemap"] = {"gzip": True}
+        SitemapGenerator(sitemap_config).generate(posts, [])
+        assert not (tmp_path / "sitemap-1.xml").exists()
+
+        sitemap_config["sitemap"] = {"gzip": False}
+        SitemapGenerator(sitemap_config).generate(posts, [])
+        assert sorted(p.name for p in tmp_path.glob("sitemap*")) == [
+            "sitemap-1.xml",
+            "sitemap_index.xml",
+        ]
+
+
+@pytest.fixture
+def history_config(sitemap_config, tmp_path):
+    sitemap_config["cache"] = {"enabled": True, "dir": str(tmp_path / "cache")}
+    return sitemap_config
+
+
+def render(path, main, footer="2024"):
+    """write a rendered page with a main element and a footer"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"<html><main>{main}</main><footer>{footer}</footer></html>")
+
+
+class TestSitemapHistory:
+    def test_content_fingerprint_uses_main(self):
+        assert content_fingerprint(b"<main>a</main><footer>1</footer>") == (
+            content_fingerprint(b"<main>a</main><footer>2</footer>")
+        )
+        assert content_fingerprint(b"<p>a</p>") != content_fingerprint(b"<p>b</p>")
+
+    def test_lastmod_changes_only_with_content(self, history_config, tmp_path):
+        page = tmp_path / "post" / "index.html"
+        render(page, "hello")
+        first_seen = datetime.date(2024, 1, 1)
+
+        history = SitemapHistory(history_config, today=datetime.date(2024, 2, 1))
+        assert history.lastmod("/post/", page, first_seen) == first_seen
+        history.save()
+
+        # re-rendered with the same content and a different footer
+        render(page, "hello", footer="2025")
+        history = SitemapHistory(history_config, today=datetime.date(2024, 3, 1))
+        assert history.lastmod("/post/", page, first_seen) == first_seen
+        history.save()
+
+        render(page, "edited")
+        history = SitemapHistory(history_config, today=datetime.date(2024, 4, 1))
+        assert history.lastmod("/post/", page, first_seen) == datetime.date(2024, 4, 1)
+        assert history.changed == 1
+        history.save()
+
+        history = SitemapHistory(history_config, today=datetime.date(2024, 5, 1))
+        assert history.lastmod("/post/", page, first_seen) == datetime.date(2024, 4, 1)
+
+    def test_unchanged_files_are_not_read(self, history_config, tmp_path, monkeypatch):
+        page = tmp_path / "index.html"
+        render(page, "hello")
+        history = SitemapHistory(history_config)
+        history.lastmod("/", page, datetime.date(2024, 1, 1))
+        history.save()
+
+        monkeypatch.setattr("pathlib.Path.read_bytes", lambda self: pytest.fail("read"))
+        SitemapHistory(history_config).lastmod("/", page, datetime.date(2024, 1, 1))
+
+    def test_first_seen_not_in_future(self, history_config, tmp_path):
+        history = SitemapHistory(history_config, today=datetime.date(2024, 1, 1))
+        render(tmp_path / "index.html", "x")
+        lastmod = history.lastmod(
+            "/", tmp_path / "index.html", datetime.date(2030, 1, 1)
+        )
+        assert lastmod == datetime.date(2024, 1, 1)
+
+    def test_disabled_without_cache(self, sitemap_config, tmp_path):
+        render(tmp_path / "index.html", "x")
+        history = SitemapHistory(sitemap_config)
+        history.lastmod("/", tmp_path / "index.html", datetime.date(2024, 1, 1))
+        history.save()
+        assert not history.path.exists()
+
+    def test_generate_uses_history(self, history_config, posts, tmp_path):
+        render(tmp_path / "index.html", "home")
+        render(tmp_path / "post-0" / "index.html", "post")
+        posts[0].url = "/post-0/"
+        SitemapGenerator(history_config).generate(posts[:1], [])
+
+        root = ET.parse(tmp_path / "sitemap-1.xml").getroot()
+        assert [e.text for e in root.iter(f"{NS}lastmod")] == [
+            "2024-01-01",
+            "2024-01-01",
+        ]
+        saved = SitemapHistory(history_config).previous
+        assert set(saved) == {"/", "/post-0/"}
+
+
+class TestRobotsGenerator:
+    def test_points_to_sitemap_index(self, sitemap_config, tmp_path):
+        RobotsGenerator(sitemap_config).generate()
+        robots = (tmp_path / "robots.txt").read_text()
+        assert "Sitemap: http://localhost:8000/sitemap_index.xml" in robots
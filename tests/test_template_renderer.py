@@ -75,6 +75,47 @@ class TestTemplateRenderer:
         assert 'width="100"' in tag
         assert 'height="200"' in tag
 
+    def test_generate_img_tag_with_variants(self, renderer):
+        renderer.asset_manifest = {"images/pic.jpg": "images/pic.webp"}
+        renderer.image_dimensions = {
+            "images/pic.webp": {
+                "width": 1000,
+                "height": 500,
+                "variants": ["images/pic-480w.webp"],
+            },
+            "images/pic-480w.webp": {"width": 480, "height": 240},
+        }
+        tag = renderer._generate_img_tag("pic.jpg", alt="Alt")
+
+        assert tag.startswith("<img ")
+        assert (
+            'srcset="/_sync/images/pic-480w.webp 480w, /_sync/images/pic.webp 1000w"'
+            in tag
+        )
+        assert 'sizes="100vw"' in tag
+        assert 'width="1000"' in tag
+
+    def test_generate_img_tag_with_avif_picture(self, renderer):
+        renderer.config["assets"]["image_sizes"] = "800px"
+        renderer.asset_manifest = {"images/pic.jpg": "images/pic.webp"}
+        renderer.image_dimensions = {
+            "images/pic.webp": {
+                "width": 1000,
+                "height": 500,
+                "variants": ["images/pic-480w.webp", "images/pic.avif"],
+            },
+            "images/pic-480w.webp": {"width": 480, "height": 240},
+            "images/pic.avif": {"width": 1000, "height": 500},
+        }
+        tag = renderer._generate_img_tag("pic.jpg", alt="Alt")
+
+        assert tag.startswith(
+            '<picture><source type="image/avif" '
+            'srcset="/_sync/images/pic.avif 1000w" sizes="800px"><img '
+        )
+        assert tag.endswith("></picture>")
+        assert 'src="/_sync/images/pic.webp"' in tag
+
     def test_minify_html(self, renderer):
         html = """
         <div>
@@ -171,3 +212,152 @@ class TestTemplateRenderer:
             "var x = 1; // comment" in minified
             or "var x = 1; // comment" in minified.replace("  ", " ")
         )
+
+    def test_minify_html_keeps_protected_blocks(self, renderer):
+        html = (
+            "<div>\n  <pre><code>a  =  1\n\tb</code></pre>\n"
+            "  <p>x   <code> y  </code>  z</p>\n"
+            "<style>\n  a { }\n</style>\n</div>"
+        )
+        minified = renderer._minify_html(html)
+        assert minified == (
+            "<div><pre><code>a  =  1\n\tb</code></pre>"
+            "<p>x <code> y  </code> z</p>"
+            "<style>\n  a { }\n</style></div>"
+        )
+
+    def test_minify_html_comments(self, renderer):
+        html = "<p>a <!-- note --> b</p>\n<!--[if IE]><p>ie</p><![endif]-->"
+        minified = renderer._minify_html(html)
+        assert minified == "<p>a b</p><!--[if IE]><p>ie</p><![endif]-->"
+
+    def test_minify_html_disabled(self, renderer):
+        renderer.config["assets"]["minify_html"] = False
+        html = "<div>\n  <p>x</p>\n</div>"
+        assert renderer._minify_html(html) == html
+
+    def test_parallel_rendering_matches_serial(self, mock_config, tmp_path):
+        import datetime
+
+        template_dir = tmp_path / "templates"
+        (template_dir / "post.html").write_text(
+            "{% extends 'base.html' %}{% block content %}{{ post.title }}"
+            "{% if prev_post %} prev:{{ prev_post.url }}{% endif %}"
+            "{% if next_post %} next:{{ next_post.url }}{% endif %}{% endblock %}"
+        )
+        (template_dir / "index.html").write_text(
+            "{% extends 'base.html' %}{% block content %}"
+            "{% for post in posts %}{{ post.title }} {% endfor %}"
+            "{% if pagination %}{{ pagination.next_url }}{% endif %}{% endblock %}"
+        )
+
+        posts = [
+            Post(
+                title=f"Post {i}",
+                content=f"<p>Body {i}</p>",
+                date=datetime.datetime(2024, 1, i + 1),
+                url=f"/post-{i}/",
+                file_path=f"post-{i}.md",
+                slug=f"post-{i}",
+            )
+            for i in range(12)
+        ]
+
+        outputs = {}
+        for workers in (1, 2):
+            mock_config["build"]["workers"] = workers
+            mock_config["build"]["output_dir"] = str(tmp_path / f"out-{workers}")
+            renderer = TemplateRenderer(mock_config)
+            try:
+                renderer.render_posts(posts)
+                renderer.render_index(posts)
+            finally:
+                renderer.shutdown_workers()
+
+            out_dir = tmp_path / f"out-{workers}"
+            outputs[workers] = {
+                path.relative_to(out_dir).as_posix(): path.read_text()
+                for path in out_dir.rglob("*.html")
+            }
+
+        assert outputs[1] == outputs[2]
+        assert "next:/post-2/" in outputs[2]["post-1/index.html"]
+        assert "/page/2/" in outputs[2]["index.html"]
+
+    def test_build_constants_are_globals(self, renderer, mock_config):
+        import datetime
+
+        assert renderer.jinja_env.globals["config"] is mock_config
+        assert (
+            renderer.jinja_env.globals["current_year"] == datetime.datetime.now().year
+        )
+        assert renderer.jinja_env.globals["metadata"] is renderer.metadata_generator
+
+    def test_bytecode_cache(self, mock_config, tmp_path):
+        mock_config["cache"] = {"enabled": True, "dir": str(tmp_path / "cache")}
+        renderer = TemplateRenderer(mock_config)
+        renderer.jinja_env.get_template("index.html")
+
+        assert any((tmp_path / "cache" / "jinja").iterdir())
+
+    def test_precompiled_templates(self, mock_config, tmp_path, capsys):
+        from jinja2 import ChoiceLoader
+
+        mock_config["cache"] = {
+            "enabled": True,
+            "dir": str(tmp_path / "cache"),
+            "precompiled_templates": True,
+        }
+        renderer = TemplateRenderer(mock_config)
+        assert not isinstance(renderer.jinja_env.loader, ChoiceLoader)
+
+        target = renderer.compile_templates()
+        assert (target / "templates.json").exists()
+        assert isinstance(renderer.jinja_env.loader, ChoiceLoader)
+        assert renderer._render_page("index.html", {}) == (
+            "<html><body>Index</body></html>"
+        )
+
+        # editing a template falls back to the sources
+        (tmp_path / "templates" / "index.html").write_text(
+            "{% extends 'base.html' %}{% block content %}Edited{% endblock %}"
+        )
+        renderer = TemplateRenderer(mock_config)
+        assert not isinstance(renderer.jinja_env.loader, ChoiceLoader)
+        assert "out of date" in capsys.readouterr().out
+        assert "Edited" in renderer._render_page("index.html", {})
+
+    def test_precompiled_templates_need_cache(self, mock_config, tmp_path):
+        mock_config["cache"] = {"enabled": False, "dir": str(tmp_path / "cache")}
+        renderer = TemplateRenderer(mock_config)
+
+        with pytest.raises(ValueError, match="cache.enabled"):
+            renderer.compile_templates()
+        assert not (tmp_path / "cache").exists()
+
+    def test_precompiled_flag_set_after_construction(self, mock_config, tmp_path):
+        from jinja2 import ChoiceLoader
+
+        mock_config["cache"] = {"enabled": True, "dir": str(tmp_path / "cache")}
+        renderer = TemplateRenderer(mock_config)
+
+        # what scripts/build.py --compile-templates does
+        mock_config["cache"]["precompiled_templates"] = True
+        renderer.compile_templates()
+
+        assert isinstance(renderer.jinja_env.loader, ChoiceLoader)
+
+    def test_asset_filter_not_folded_into_cached_templates(self, mock_config, tmp_path):
+        (tmp_path / "templates" / "index.html").write_text(
+            "{{ 'css/main.css' | asset }}"
+        )
+        mock_config["cache"] = {"enabled": True, "dir": str(tmp_path / "cache")}
+
+        renderer = TemplateRenderer(mock_config)
+        renderer.set_asset_manifest({"css/main.css": "css/main-aaaa.css"})
+        assert renderer._render_page("index.html", {}) == "/_sync/css/main-aaaa.css"
+
+        # a later build loads the same bytecode with a new manifest
+        renderer = TemplateRenderer(mock_config)
+        renderer.set_asset_manifest({"css/main.css": "css/main-bbbb.css"})
+        assert renderer._render_page("index.html", {}) == "/_sync/css/main-bbbb.css"
@@ -0,0 +1,119 @@
+"""
+Tests for the development file watcher
+"""
+
+import queue
+import sys
+from pathlib import Path
+
+import pytest
+
+from core.dev.watcher import PollingBackend, Watcher, is_ignored
+
+BACKENDS = [True]
+if sys.platform.startswith("linux"):
+    BACKENDS.append(False)
+
+
+@pytest.fixture(
+    params=BACKENDS, ids=lambda polling: "polling" if polling else "inotify"
+)
+def watched(request, tmp_path):
+    """a started watcher over a content directory and a config file"""
+    content = tmp_path / "content"
+    (content / "posts").mkdir(parents=True)
+    config = tmp_path / "config" / "config.yaml"
+    config.parent.mkdir()
+    config.write_text("site: {}")
+
+    batches = queue.Queue()
+    watcher = Watcher(
+        [content, config], batches.put, interval=0.05, polling=request.param
+    )
+    watcher.start()
+    yield content, config, batches
+    watcher.stop()
+
+
+def next_batch(batches: queue.Queue) -> list:
+    """wait for the next batch of changes"""
+    return batches.get(timeout=5)
+
+
+class TestWatcher:
+    def test_reports_changed_file(self, watched):
+        content, _, batches = watched
+        post = content / "posts" / "hello.md"
+        post.write_text("hello")
+
+        assert post.resolve() in next_batch(batches)
+
+    def test_burst_is_one_batch(self, watched):
+        content, _, batches = watched
+        for n in range(5):
+            (content / "posts" / f"{n}.md").write_text("x")
+
+        changed = set(next_batch(batches))
+        # a slow burst may split, but every file is reported
+        while len(changed) < 5:
+            changed.update(next_batch(batches))
+        assert changed == {(content / "posts" / f"{n}.md").resolve() for n in range(5)}
+
+    def test_watches_single_file(self, watched):
+        _, config, batches = watched
+        (config.parent / "other.yaml").write_text("x")
+        config.write_text("site: {title: x}")
+
+        assert next_batch(batches) == [config.resolve()]
+
+    def test_new_directories_are_watched(self, watched):
+        content, _, batches = watched
+        category = content / "posts" / "music"
+        category.mkdir()
+        (category / "song.md").write_text("x")
+        changed = set(next_batch(batches))
+        while (category / "song.md").resolve() not in changed:
+            changed.update(next_batch(batches))
+
+    def test_ignores_editor_files(self, watched):
+        content, _, batches = watched
+        (content / "posts" / ".hello.md.swp").write_text("x")
+        (content / "posts" / "hello.md~").write_text("x")
+        (content / "posts" / "real.md").write_text("x")
+
+        assert next_batch(batches) == [(content / "posts" / "real.md").resolve()]
+
+    def test_callback_errors_do_not_stop_watching(self, tmp_path, capsys):
+        batches = queue.Queue()
+
+        def rebuild(changed):
+            batches.put(changed)
+            raise ValueError("bad template")
+
+        watcher = Watcher([tmp_path], rebuild, interval=0.05, polling=True)
+        watcher.start()
+        try:
+            (tmp_path / "a.md").write_text("x")
+            next_batch(batches)
+            (tmp_path / "b.md").write_text("x")
+            next_batch(batches)
+        finally:
+            watcher.stop()
+        assert "Rebuild failed: bad template" in capsys.readouterr().out
+
+
+class TestPollingBackend:
+    def test_detects_deleted_files(self, tmp_path):
+        (tmp_path / "a.md").write_text("x")
+        backend = PollingBackend([tmp_path], set(), interval=0)
+
+        (tmp_path / "a.md").unlink()
+        assert backend.wait(0) == {tmp_path / "a.md"}
+        assert backend.wait(0) == set()
+
+
+def test_is_ignored():
+    assert is_ignored(Path("posts/.hello.md.swp"))
+    assert is_ignored(Path("posts/hello.md~"))
+    assert is_ignored(Path("posts/4913"))
+    assert not is_ignored(Path("posts/hello.md"))
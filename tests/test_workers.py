@@ -0,0 +1,24 @@
+"""
+Tests for worker pool sizing
+"""
+
+import os
+
+from core.utils.workers import resolve_workers
+
+
+class TestResolveWorkers:
+    def test_build_workers(self):
+        assert resolve_workers({"build": {"workers": 3}}) == 3
+        assert resolve_workers({"build": {}}) == 1
+
+    def test_zero_means_all_cpus(self):
+        cpus = os.cpu_count() or 1
+        assert resolve_workers({"build": {"workers": 0}}) == cpus
+        assert resolve_workers({"build": {"workers": None}}) == cpus
+
+    def test_override_takes_precedence(self):
+        config = {"build": {"workers": 3}}
+        assert resolve_workers(config, 2) == 2
+        assert resolve_workers(config, 0) == (os.cpu_count() or 1)
+        assert resolve_workers(config, None) == 3